@@ -29,8 +29,18 @@ from kvdeveloper.config import (
     console,
 )
 from kvdeveloper.internals.firebase import clone_p4a, read_gradle_json
-from kvdeveloper.internals.server import LocalFileServer, local_ip
-from kvdeveloper.internals.sorting import sort_modules
+from kvdeveloper.internals.index import template_index
+from kvdeveloper.internals.scaffold import ScaffoldPlan
+from kvdeveloper.internals.server import (
+    DEFAULT_DEBOUNCE,
+    DEFAULT_WORKERS,
+    LocalFileServer,
+    local_ip,
+)
+from kvdeveloper.internals.sorting import (
+    DEFAULT_WORKERS as SORT_WORKERS,
+    sort_modules,
+)
 from kvdeveloper.libs import add_from_libs
 from kvdeveloper.module import (
     add_from_default,
@@ -39,6 +49,7 @@ from kvdeveloper.module import (
     apply_layout,
     create_from_structure,
     create_from_template,
+    install_requirements,
     project_info,
     remove_from_default,
     remove_from_structure,
@@ -54,6 +65,9 @@ def create(
     project_name: Optional[str] = typer.Argument(
         "NewProject", help="Name of the project."
     ),
+    dry_run: bool = typer.Option(
+        False, help="Show the planned changes without making them."
+    ),
 ) -> None:
     """
     Create a new project with the specified template and structure.
@@ -63,6 +77,8 @@ def create(
     :param template: The name of the template folder.
 
     :param structure: The name of the structure folder.
+
+    :param dry_run: Show the planned changes without making them.
     """
 
     destination = os.path.join(os.getcwd(), project_name)
@@ -93,10 +109,11 @@ def create(
     variables = {
         "project_name": project_name,
     }
+    plan = ScaffoldPlan(dry_run=dry_run)
     funcs = {
-        "none": lambda: create_from_template(template, destination, variables),
+        "none": lambda: create_from_template(template, destination, variables, plan),
         "MVC": lambda: create_from_structure(
-            template, structure, destination, variables
+            template, structure, destination, variables, plan
         ),
     }
     task = funcs.get(structure)()
@@ -104,7 +121,13 @@ def create(
         "project_name": project_name,
         "project_package_name": project_name.lower(),
     }
-    setup_build(project_name, destination, build_variables)
+    setup_build(project_name, destination, build_variables, plan)
+    if plan.apply(destination):
+        raise typer.Exit(code=1)
+    if dry_run:
+        return
+    if structure == "MVC":
+        install_requirements(project_name, destination)
     project_info(project_name, template, structure, destination)
 
 
@@ -119,6 +142,9 @@ def add_screen(
     ),
     layout: str = typer.Option(None, help="Layout of the screens."),
     structure: str = typer.Option(DEFAULT_STRUCTURE, help="Structure of the project."),
+    dry_run: bool = typer.Option(
+        False, help="Show the planned changes without making them."
+    ),
 ) -> None:
     """
     Create screens with specified template and structure.
@@ -130,23 +156,29 @@ def add_screen(
     :param layout: The name of the layout.
 
     :param structure: The name of the structure folder.
+
+    :param dry_run: Show the planned changes without making them.
     """
     destination = os.path.join(os.getcwd(), "View")
     if not os.path.isdir(destination):
         typer.secho("\n'View' directory not found.", err=True)
         raise typer.Exit(code=0)
 
+    plan = ScaffoldPlan(dry_run=dry_run)
     if structure == "none":
         if layout != None:
-            add_from_layout(name_screen, layout, destination)
+            add_from_layout(name_screen, layout, destination, plan)
         elif layout == None:
-            add_from_default(name_screen, use_template, destination)
+            add_from_default(name_screen, use_template, destination, plan)
     elif structure == "MVC":
-        add_from_structure(name_screen, use_template, layout, destination)
+        add_from_structure(name_screen, use_template, layout, destination, plan)
     else:
         console.print("\nStructure for name [green]{structure}[/green] not found.")
         raise typer.Exit(code=0)
 
+    if plan.apply(destination):
+        raise typer.Exit(code=1)
+
 
 @app.command()
 def remove_screen(
@@ -154,6 +186,9 @@ def remove_screen(
         help="List containing the name of the screens."
     ),
     structure: str = typer.Option(DEFAULT_STRUCTURE, help="Structure of the project."),
+    dry_run: bool = typer.Option(
+        False, help="Show the planned changes without making them."
+    ),
 ) -> None:
     """
     Remove screen-specific directories and files associated with specified structure.
@@ -161,14 +196,20 @@ def remove_screen(
     :param name_screen: List containing the name of the screens.
 
     :param structure: The name of the structure folder.
+
+    :param dry_run: Show the planned changes without making them.
     """
     destination = os.path.join(os.getcwd(), "View")
     if not os.path.isdir(destination):
         raise typer.Exit("\n'View' directory not found.", code=1)
 
-    remove_from_default(name_screen, destination)
+    plan = ScaffoldPlan(dry_run=dry_run)
+    remove_from_default(name_screen, destination, plan)
     if structure != "none":
-        remove_from_structure(name_screen, destination, structure)
+        remove_from_structure(name_screen, destination, structure, plan)
+
+    if plan.apply(os.getcwd()):
+        raise typer.Exit(code=1)
 
 
 @app.command()
@@ -177,6 +218,9 @@ def add_layout(
         help="List containig the name of the screens."
     ),
     layout: str = typer.Argument(None, help="The name of the layout for the screens."),
+    dry_run: bool = typer.Option(
+        False, help="Show the planned changes without making them."
+    ),
 ) -> None:
     """
     Apply layout to a screen with specified layout type.
@@ -186,10 +230,16 @@ def add_layout(
     :param layout: The name of the layout for the screens.
 
     :param destination: The destination path where the files will be created and updated.
+
+    :param dry_run: Show the planned changes without making them.
     """
     destination = os.path.join(os.getcwd(), "View")
 
-    apply_layout(name_screen, layout, destination)
+    plan = ScaffoldPlan(dry_run=dry_run)
+    apply_layout(name_screen, layout, destination, plan)
+
+    if plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
 @app.command()
@@ -197,51 +247,40 @@ def add_component(
     name_component: List[str] = typer.Argument(
         help="List containing the names of the components."
     ),
+    dry_run: bool = typer.Option(
+        False, help="Show the planned changes without making them."
+    ),
 ) -> None:
     """
     Add Components to the project using the existing ones.
 
     :param name_component: List containing the names of the components. (Case Sensitive Names)
+
+    :param dry_run: Show the planned changes without making them.
     """
+    package_index = template_index()
     list_component_path = []
     for components in name_component:
         component_path = os.path.join(COMPONENTS_DIR, components)
-        if not os.path.isdir(component_path):
+        if not package_index.isdir(component_path):
             typer.secho(f"\nComponent '{components}' does not exists.")
             continue
         list_component_path.append(component_path)
 
     destination = os.path.join(os.getcwd(), "components")
-    if not os.path.isdir(destination):
-        os.makedirs("components", exist_ok=True)
-
+    plan = ScaffoldPlan(dry_run=dry_run)
+    plan.add_directory(destination)
     for component_path in list_component_path:
-        for root, _, files in os.walk(component_path):
-            relative_path = os.path.relpath(root, COMPONENTS_DIR)
-            target_dir = os.path.join(destination, relative_path)
-            if not "__pycache__" in target_dir:
-                os.makedirs(target_dir, exist_ok=True)
-
-            console.print(
-                f"\nCreating Component [bold cyan]{os.path.basename(component_path)}[/bold cyan]."
-            )
-
-            for file_name in files:
-                # Skip .pyc and .pyo files
-                if file_name.endswith((".pyc", ".pyo")):
-                    continue
-                template_file_path = os.path.join(root, file_name)
-                target_file_path = os.path.join(target_dir, file_name)
-
-                with open(template_file_path, "r", encoding="utf-8") as template_file:
-                    content = template_file.read()
-
-                with open(target_file_path, "w", encoding="utf-8") as target_file:
-                    target_file.write(content)
+        console.print(
+            f"\nCreating Component [bold cyan]{os.path.basename(component_path)}[/bold cyan]."
+        )
+        plan.add_tree(
+            component_path,
+            os.path.join(destination, os.path.relpath(component_path, COMPONENTS_DIR)),
+        )
 
-                console.print(
-                    f"\nCreated file: [bright_white]{target_file_path}[/bright_white]"
-                )
+    if plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
 @app.command()
@@ -731,6 +770,33 @@ def sort(
     destination: Optional[str] = typer.Option(
         None, help="Destination of the sorted module."
     ),
+    force: bool = typer.Option(
+        False,
+        help="Resolve the sort map and copy every selected file again instead of only the changed ones.",
+    ),
+    workers: Optional[int] = typer.Option(
+        SORT_WORKERS, help="Number of threads copying files."
+    ),
+    shake: bool = typer.Option(
+        False,
+        help="Only copy the modules, kv files and resources the app can reach through its imports and kv rules.",
+    ),
+    app_dir: Optional[str] = typer.Option(
+        ".", help="Directory of the app analysed when shaking."
+    ),
+    dry_run: bool = typer.Option(
+        False, help="List the files to copy and remove without changing anything."
+    ),
+    zip_modules: bool = typer.Option(
+        False,
+        "--zip",
+        help="Write the modules into one zip archive imported through zipimport, copying only the kv files and resources.",
+    ),
+    compile_modules: bool = typer.Option(
+        False,
+        "--compile",
+        help="Store the modules of the zip archive as .pyc, compiled for the running Python version.",
+    ),
 ):
     if not sortmapfile:
         if module_name in AVAILABLE_SORTMAPPINGS:
@@ -754,39 +820,96 @@ def sort(
     if not destination:
         destination = os.path.join(os.getcwd(), module_name)
 
-    sort_modules(module_name, sortmapping, sortfile, destination)
+    sort_modules(
+        module_name,
+        sortmapping,
+        sortfile,
+        destination,
+        force=force,
+        workers=workers,
+        app_dir=app_dir if shake else None,
+        dry_run=dry_run,
+        archive=zip_modules,
+        compiled=compile_modules,
+    )
 
 
 @app.command()
 def serve(
-    directory: Optional[str] = typer.Argument(
-        ".", help="App directory to serve containing the entrypoint."
+    directory: Optional[List[str]] = typer.Argument(
+        None,
+        help="App directories to serve containing the entrypoint. Several directories are each mounted under their name.",
     ),
     port: Optional[int] = typer.Option(8000, help="Port for the sever."),
+    workers: Optional[int] = typer.Option(
+        DEFAULT_WORKERS, help="Number of worker threads serving requests."
+    ),
+    debounce: Optional[float] = typer.Option(
+        DEFAULT_DEBOUNCE,
+        help="Quiet window in seconds used to coalesce file changes into one reload.",
+    ),
+    cache_size: Optional[int] = typer.Option(
+        64, help="Size in MB of the in-memory cache of served files."
+    ),
+    dashboard: Optional[bool] = typer.Option(
+        False, help="Show live server metrics instead of the request log."
+    ),
+    precompile: Optional[bool] = typer.Option(
+        False,
+        help="Serve .py files compiled to .pyc and hold back reloads of files with syntax errors.",
+    ),
 ) -> None:
     """
     Start a development server in the specified directory for serving files in a private network.
 
-    :param directory: App directory to serve containing the entrypoint.
+    :param directory: App directories to serve containing the entrypoint. Several directories are each mounted under their name.
 
     :param port: Port for the sever.
+
+    :param workers: Number of worker threads serving requests.
+
+    :param debounce: Quiet window in seconds used to coalesce file changes into one reload.
+
+    :param cache_size: Size in MB of the in-memory cache of served files.
+
+    :param dashboard: Show live server metrics instead of the request log.
+
+    :param precompile: Serve .py files compiled to .pyc and hold back reloads of files with syntax errors.
     """
 
+    directories = directory or ["."]
     project_name = "MyApp"
     variables = {
         "project_name": project_name,
         "project_package_name": project_name.strip("App").lower(),
     }
-    setup_build(project_name=project_name, destination=directory, variables=variables)
-
-    config_file_path = os.path.join(directory, "config.toml")
-    config = toml_parser(config_file_path)
 
     import qrcode
 
     server = LocalFileServer(
-        directory=directory, port=port, extensions=config["app"]["include_exts"]
+        directory=None,
+        port=port,
+        workers=workers,
+        debounce=debounce,
+        cache_size=cache_size * 1024 * 1024,
+        dashboard=dashboard,
+        precompile=precompile,
     )
+    for app_directory in directories:
+        setup_build(
+            project_name=project_name, destination=app_directory, variables=variables
+        )
+        config_file_path = os.path.join(app_directory, "config.toml")
+        config = toml_parser(config_file_path)
+        server.add_mount(
+            app_directory,
+            # A single app keeps being served from the root.
+            prefix="/" if len(directories) == 1 else None,
+            extensions=config["app"]["include_exts"],
+            ignore_files=config["app"].get("ignore_files", []),
+            ignore_dirs=config["app"].get("ignore_dirs", []),
+            noreload_files=config["app"].get("noreload_files", []),
+        )
     console.print(
         "[bright_cyan]Scan below QRCode using the client application to start the development server.[/bright_cyan]"
     )
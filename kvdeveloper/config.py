@@ -56,3 +56,14 @@ p4a_version = "2024.01.21"
 P4A_URL = f"https://github.com/kivy/python-for-android/archive/refs/tags/v{p4a_version}.tar.gz"
 
 AVAILABLE_SORTMAPPINGS = ["carbonkivy", "kivymd"]
+
+# Per-user cache of data derived from the installed package.
+CACHE_DIR = os.environ.get(
+    "KVDEVELOPER_CACHE_DIR",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME")
+        or os.environ.get("LOCALAPPDATA")
+        or os.path.join(os.path.expanduser("~"), ".cache"),
+        "kvdeveloper",
+    ),
+)
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from kvdeveloper import __version__
+from kvdeveloper.config import (
+    CACHE_DIR,
+    COMPONENTS_DIR,
+    LAYOUTS_DIR,
+    LIBS_DIR,
+    STRUCTURES_DIR,
+    TEMPLATES_DIR,
+    VIEW_BASE,
+    def_dir,
+)
+
+# Package directories whose files are packed into the index.
+INDEX_ROOTS = (
+    TEMPLATES_DIR,
+    LAYOUTS_DIR,
+    STRUCTURES_DIR,
+    COMPONENTS_DIR,
+    LIBS_DIR,
+    VIEW_BASE,
+)
+
+_MAGIC = b"KVDIDX01"
+_HEADER = struct.Struct("<8sQ")
+_SKIPPED_DIRS = ("__pycache__",)
+_SKIPPED_EXTENSIONS = (".pyc", ".pyo")
+_INSTALL_DIRS = ("site-packages", "dist-packages")
+
+
+def index_path() -> str:
+    """
+    Return the location of the index of the installed package. It is keyed
+    by version and installation directory, so an upgrade or a second
+    installation builds its own.
+    """
+    location = hashlib.sha1(str(def_dir).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(CACHE_DIR, f"templates-{__version__}-{location}.idx")
+
+
+def source_stamp() -> str:
+    """
+    Return a cheap fingerprint of the indexed files, stored in the index so
+    an outdated one gets rebuilt. An installed package only changes when it
+    is reinstalled, which rewrites its `__init__.py`. A source checkout
+    (including editable installs) is edited in place, so the stamp covers
+    the count, sizes and modification times of the files and directories
+    of the `INDEX_ROOTS`, which takes a few stats instead of reads.
+    """
+    if any(part in _INSTALL_DIRS for part in def_dir.parts):
+        return str(os.stat(os.path.join(def_dir, "__init__.py")).st_mtime_ns)
+    count = size = latest = 0
+    for root_dir in INDEX_ROOTS:
+        for root, dir_names, file_names in os.walk(root_dir):
+            dir_names[:] = [name for name in dir_names if name not in _SKIPPED_DIRS]
+            latest = max(latest, os.stat(root).st_mtime_ns)
+            for file_name in file_names:
+                if file_name.endswith(_SKIPPED_EXTENSIONS):
+                    continue
+                stat = os.stat(os.path.join(root, file_name))
+                count += 1
+                size += stat.st_size
+                latest = max(latest, stat.st_mtime_ns)
+    return f"{count}-{size}-{latest}"
+
+
+def pack_index(stamp: Optional[str] = None) -> bytes:
+    """
+    Walk the `INDEX_ROOTS` once and pack them into the index format: a
+    header, a JSON manifest of the directories and files, then the file
+    contents back to back. `stamp` is taken before reading the files by
+    default, so files changed while packing make the index outdated rather
+    than look current.
+    """
+    if stamp is None:
+        stamp = source_stamp()
+    dirs: Dict[str, Tuple[List[str], List[str]]] = {}
+    files: Dict[str, Tuple[int, int]] = {}
+    blobs: List[bytes] = []
+    offset = 0
+    for root_dir in INDEX_ROOTS:
+        for root, dir_names, file_names in os.walk(root_dir):
+            dir_names[:] = sorted(
+                name for name in dir_names if name not in _SKIPPED_DIRS
+            )
+            file_names = sorted(
+                name for name in file_names if not name.endswith(_SKIPPED_EXTENSIONS)
+            )
+            key = _relative(root)
+            dirs[key] = (dir_names, file_names)
+            for file_name in file_names:
+                with open(os.path.join(root, file_name), "rb") as file:
+                    data = file.read()
+                files[f"{key}/{file_name}"] = (offset, len(data))
+                blobs.append(data)
+                offset += len(data)
+
+    manifest = json.dumps(
+        {"version": __version__, "stamp": stamp, "dirs": dirs, "files": files},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return _HEADER.pack(_MAGIC, len(manifest)) + manifest + b"".join(blobs)
+
+
+def build_index(path: Optional[str] = None, stamp: Optional[str] = None) -> str:
+    """
+    Write a fresh index to `path` (the cached location by default) and
+    return the path. The file is replaced atomically, so concurrent
+    commands never see a partial index.
+    """
+    path = path or index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(pack_index(stamp))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return path
+
+
+def _relative(path: str) -> str:
+    return os.path.relpath(path, def_dir).replace(os.sep, "/")
+
+
+class TemplateIndex:
+    """
+    Read-only view of the packaged templates, layouts, structures,
+    components, libs and view base files, loaded from a single packed
+    (and memory-mapped) file instead of walking and opening every file of
+    the installed package.
+
+    The methods take regular filesystem paths. Paths outside of the
+    indexed directories are answered from the filesystem, so callers can
+    use the index for any path. When a `stamp` is given, an index packed
+    from other package files is rejected.
+    """
+
+    def __init__(
+        self, data: Union[bytes, mmap.mmap], stamp: Optional[str] = None
+    ) -> None:
+        magic, length = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("Not a kvdeveloper template index.")
+        manifest = json.loads(bytes(data[_HEADER.size : _HEADER.size + length]))
+        if manifest["version"] != __version__:
+            raise ValueError("Template index of another kvdeveloper version.")
+        if stamp is not None and manifest.get("stamp") != stamp:
+            raise ValueError("Template index of outdated package files.")
+        self._data = data
+        self._base = _HEADER.size + length
+        self._dirs: Dict[str, List[List[str]]] = manifest["dirs"]
+        self._files: Dict[str, List[int]] = manifest["files"]
+        self._roots = frozenset(_relative(root) for root in INDEX_ROOTS)
+
+    @classmethod
+    def open(cls, path: str, stamp: Optional[str] = None) -> "TemplateIndex":
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(data, stamp)
+        except BaseException:
+            data.close()
+            raise
+
+    def _key(self, path: str) -> Optional[str]:
+        try:
+            key = _relative(os.path.abspath(path))
+        except ValueError:  # Another drive on Windows.
+            return None
+        if key.split("/", 1)[0] not in self._roots:
+            return None
+        return key
+
+    def covers(self, path: str) -> bool:
+        """
+        Whether `path` lies in one of the indexed package directories.
+        """
+        return self._key(path) is not None
+
+    def isdir(self, path: str) -> bool:
+        key = self._key(path)
+        if key is None:
+            return os.path.isdir(path)
+        return key in self._dirs
+
+    def isfile(self, path: str) -> bool:
+        key = self._key(path)
+        if key is None:
+            return os.path.isfile(path)
+        return key in self._files
+
+    def listdir(self, path: str) -> List[str]:
+        key = self._key(path)
+        if key is None:
+            return os.listdir(path)
+        if key not in self._dirs:
+            raise FileNotFoundError(path)
+        dir_names, file_names = self._dirs[key]
+        return dir_names + file_names
+
+    def walk(self, path: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        Like `os.walk` (top-down, pruning through the yielded directory
+        list), without touching the filesystem for indexed paths.
+        """
+        key = self._key(path)
+        if key is None:
+            yield from os.walk(path)
+            return
+        if key not in self._dirs:
+            return
+        dir_names, file_names = self._dirs[key]
+        dir_names = list(dir_names)
+        yield path, dir_names, list(file_names)
+        for name in dir_names:
+            yield from self.walk(os.path.join(path, name))
+
+    def read_bytes(self, path: str) -> bytes:
+        key = self._key(path)
+        if key is None:
+            with open(path, "rb") as file:
+                return file.read()
+        if key not in self._files:
+            raise FileNotFoundError(path)
+        offset, size = self._files[key]
+        start = self._base + offset
+        return bytes(self._data[start : start + size])
+
+    def read_text(self, path: str) -> str:
+        # Same newline handling as reading the file in text mode.
+        text = self.read_bytes(path).decode("utf-8")
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+_index: Optional[TemplateIndex] = None
+_index_lock = threading.Lock()
+
+
+def template_index() -> TemplateIndex:
+    """
+    Return the index of the installed package, building it on first use
+    and rebuilding it when the `source_stamp` of the package files changed.
+    When the cache directory is not writable the index is built in memory
+    for the current process. Setting `KVDEVELOPER_NO_INDEX=1` always builds
+    it fresh in memory.
+    """
+    global _index
+    with _index_lock:
+        if _index is not None:
+            return _index
+        if os.environ.get("KVDEVELOPER_NO_INDEX"):
+            _index = TemplateIndex(pack_index())
+            return _index
+        path = index_path()
+        stamp = source_stamp()
+        try:
+            _index = TemplateIndex.open(path, stamp)
+        except (OSError, ValueError, struct.error):
+            try:
+                _index = TemplateIndex.open(build_index(path, stamp), stamp)
+            except (OSError, ValueError, struct.error):
+                _index = TemplateIndex(pack_index(stamp))
+        return _index
@@ -0,0 +1,434 @@
+import difflib
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from rich.markup import escape
+from rich.panel import Panel
+from rich.syntax import Syntax
+
+from kvdeveloper.config import console
+from kvdeveloper.internals.index import template_index
+from kvdeveloper.utils import compile_template, load_template
+
+# Template files that are never copied into a project.
+SKIPPED_EXTENSIONS = (".pyc", ".pyo")
+SKIPPED_DIRS = ("__pycache__",)
+
+ACTION_STYLES = {
+    "Created": "green",
+    "Updated": "yellow",
+    "Edited": "cyan",
+    "Deleted": "red",
+}
+
+PLURALS = {"file": "files", "directory": "directories"}
+
+
+class PlannedFile(NamedTuple):
+    target: str
+    source: Optional[str]
+    content: Optional[str]
+    variables: Optional[Dict[str, str]]
+    action: str
+
+
+class RenderedFile(NamedTuple):
+    target: str
+    action: str
+    old: Optional[str]
+    new: str
+    missing: List[str]
+
+
+class ScaffoldPlan:
+    """
+    The changes a scaffolding command makes to a project, collected up
+    front and applied in one batch by `apply`.
+
+    - Files either come from a template `source`, read and rendered with
+      `variables` when the plan is applied, or from literal `content`. They
+      are keyed by target path, so planning a target twice keeps the last
+      version.
+    - Edits are functions from the current content of a file to its new
+      content. All the edits of a target are chained, so a file such as
+      `screens.py` is read and written once however many screens are added.
+      Edits of a planned file apply to its rendered content.
+    - Deletions remove files or directories once everything else is written.
+
+    Files are rendered on a thread pool, the work being dominated by file
+    I/O, and nothing is written unless every file rendered. Each file is
+    then staged next to its target and moved into place, so a failure
+    leaves no half-written file behind. With `dry_run` the plan is printed
+    instead, with the directories to create or delete and a diff of the
+    files that already exist.
+    """
+
+    def __init__(self, workers: Optional[int] = None, dry_run: bool = False) -> None:
+        self.workers = workers
+        self.dry_run = dry_run
+        self.files: Dict[str, PlannedFile] = {}
+        self.edits: Dict[str, List[Callable[[str], str]]] = {}
+        self.deletions: Set[str] = set()
+        self.directories: Set[str] = set()
+
+    def add_directory(self, path: str) -> None:
+        self.directories.add(os.path.normpath(path))
+
+    def add_file(
+        self,
+        target: str,
+        source: Optional[str] = None,
+        content: Optional[str] = None,
+        variables: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Plan writing `target` from `source` or `content`, replacing the
+        placeholders of `variables` in either.
+        """
+        if (source is None) == (content is None):
+            raise ValueError("Exactly one of 'source' and 'content' is required.")
+        target = os.path.normpath(target)
+        action = "Updated" if os.path.exists(target) else "Created"
+        self.files[target] = PlannedFile(target, source, content, variables, action)
+        self.add_directory(os.path.dirname(target) or ".")
+
+    def add_edit(self, target: str, edit: Callable[[str], str]) -> None:
+        """
+        Plan changing the content of `target` with `edit`, after the edits
+        already planned for it.
+        """
+        self.edits.setdefault(os.path.normpath(target), []).append(edit)
+
+    def add_deletion(self, path: str) -> None:
+        """
+        Plan removing the file or directory `path`.
+        """
+        self.deletions.add(os.path.normpath(path))
+
+    def add_tree(
+        self,
+        source_dir: str,
+        destination: str,
+        variables: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Plan copying every file below `source_dir` to the same relative
+        path in `destination`. Packaged directories are listed from the
+        template index.
+        """
+        for root, dirs, files in template_index().walk(source_dir):
+            dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+            target_dir = os.path.join(destination, os.path.relpath(root, source_dir))
+            self.add_directory(target_dir)
+            for file_name in files:
+                if file_name.endswith(SKIPPED_EXTENSIONS):
+                    continue
+                self.add_file(
+                    os.path.join(target_dir, file_name),
+                    source=os.path.join(root, file_name),
+                    variables=variables,
+                )
+
+    def exists(self, path: str) -> bool:
+        """
+        Whether `path` exists once the plan is applied, so planning code
+        sees the files and directories planned before it.
+        """
+        path = os.path.normpath(path)
+        if any(
+            path == deleted or path.startswith(deleted + os.sep)
+            for deleted in self.deletions
+        ):
+            return False
+        return path in self.files or path in self.directories or os.path.exists(path)
+
+    def apply(self, destination: str) -> Dict[str, str]:
+        """
+        Render the plan and write it, or print it when `dry_run` is set,
+        then print one summary for `destination`. Returns the error message
+        of every target that could not be rendered or written, keyed by
+        target path.
+
+        Only the plan itself is applied as a batch. Changes made while
+        planning are not undone: the MVC structures run KivyMD's
+        `create_project` script before planning the files that override
+        its output, so a failed render leaves the files that script
+        created behind.
+        """
+        started = time.perf_counter()
+        directories = self._directory_actions()
+        rendered, errors = self._render()
+        if self.dry_run:
+            self._print_plan(destination, rendered, directories, errors)
+            return errors
+
+        if not errors:
+            errors = self._write(rendered)
+        if not errors:
+            for path in sorted(self.deletions, reverse=True):
+                try:
+                    if _is_directory(path):
+                        shutil.rmtree(path)
+                    elif os.path.lexists(path):
+                        os.remove(path)
+                except OSError as e:
+                    errors[path] = str(e)
+
+        self._print_summary(
+            destination, rendered, directories, errors, time.perf_counter() - started
+        )
+        return errors
+
+    def diff(self, destination: str) -> str:
+        """
+        Return the unified diff of the plan against the files on disk,
+        with paths relative to `destination`.
+        """
+        rendered, _ = self._render()
+        return self._diff(destination, rendered)
+
+    def _render(self) -> Tuple[Dict[str, RenderedFile], Dict[str, str]]:
+        targets = list(self.files)
+        targets.extend(target for target in self.edits if target not in self.files)
+        rendered: Dict[str, RenderedFile] = {}
+        errors: Dict[str, str] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="kvd-scaffold"
+        ) as executor:
+            futures = {
+                target: executor.submit(self._render_file, target) for target in targets
+            }
+            for target, future in futures.items():
+                error = future.exception()
+                if error is not None:
+                    errors[target] = str(error)
+                else:
+                    rendered[target] = future.result()
+        return rendered, errors
+
+    def _render_file(self, target: str) -> RenderedFile:
+        """
+        Render one target: the planned file if any, then its edits.
+        """
+        old = None
+        if os.path.isfile(target):
+            with open(target, encoding="utf-8") as file:
+                old = file.read()
+
+        planned = self.files.get(target)
+        missing: List[str] = []
+        if planned is not None:
+            if planned.source is not None:
+                template = load_template(planned.source)
+            else:
+                template = compile_template(planned.content)
+            variables = planned.variables or {}
+            new = template.render(variables)
+            if planned.variables:
+                missing = template.missing(variables)
+            action = planned.action
+        elif old is None:
+            raise FileNotFoundError(f"Cannot edit missing file '{target}'.")
+        else:
+            new = old
+            action = "Edited"
+
+        for edit in self.edits.get(target, ()):
+            new = edit(new)
+        return RenderedFile(target, action, old, new, missing)
+
+    def _write(self, rendered: Dict[str, RenderedFile]) -> Dict[str, str]:
+        """
+        Stage every file next to its target, then move them all into
+        place. Nothing is moved if staging fails.
+        """
+        # Sorted so parents come first and are never created concurrently.
+        for directory in sorted(self.directories):
+            os.makedirs(directory, exist_ok=True)
+
+        umask = os.umask(0)
+        os.umask(umask)
+        errors: Dict[str, str] = {}
+        staged: Dict[str, str] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="kvd-scaffold"
+        ) as executor:
+            futures = {
+                target: executor.submit(_stage, result, umask)
+                for target, result in rendered.items()
+                if result.new != result.old
+            }
+            for target, future in futures.items():
+                error = future.exception()
+                if error is not None:
+                    errors[target] = str(error)
+                else:
+                    staged[target] = future.result()
+
+        if errors:
+            for temp_path in staged.values():
+                os.remove(temp_path)
+            return errors
+
+        for target, temp_path in staged.items():
+            os.replace(temp_path, target)
+        return errors
+
+    def _actions(
+        self,
+        rendered: Dict[str, RenderedFile],
+        directories: List[Tuple[str, str]],
+    ) -> List[Tuple[str, str]]:
+        """
+        Return the actions on files, given the `_directory_actions` taken
+        before the plan was applied.
+        """
+        actions = [(target, result.action) for target, result in rendered.items()]
+        deleted_directories = {
+            path for path, action in directories if action == "Deleted"
+        }
+        actions.extend(
+            (path, "Deleted")
+            for path in self.deletions
+            if path not in deleted_directories
+        )
+        return sorted(actions)
+
+    def _directory_actions(self) -> List[Tuple[str, str]]:
+        """
+        Return the planned directories that don't exist yet and the deleted
+        ones, taken before the plan is applied.
+        """
+        actions = [
+            (path, "Created")
+            for path in self.directories
+            if not os.path.isdir(path)
+            and not any(
+                path == deleted or path.startswith(deleted + os.sep)
+                for deleted in self.deletions
+            )
+        ]
+        actions.extend(
+            (path, "Deleted") for path in self.deletions if _is_directory(path)
+        )
+        return sorted(actions)
+
+    def _diff(self, destination: str, rendered: Dict[str, RenderedFile]) -> str:
+        chunks = []
+        for target, result in sorted(rendered.items()):
+            if result.old is None or result.old == result.new:
+                continue
+            name = os.path.relpath(target, destination)
+            chunks.extend(
+                difflib.unified_diff(
+                    result.old.splitlines(keepends=True),
+                    result.new.splitlines(keepends=True),
+                    fromfile=f"a/{name}",
+                    tofile=f"b/{name}",
+                )
+            )
+            if not chunks[-1].endswith("\n"):
+                chunks[-1] += "\n"
+        return "".join(chunks)
+
+    def _print_plan(
+        self,
+        destination: str,
+        rendered: Dict[str, RenderedFile],
+        directories: List[Tuple[str, str]],
+        errors: Dict[str, str],
+    ) -> None:
+        lines = []
+        actions = [(path, action, "/") for path, action in directories]
+        actions.extend(
+            (path, action, "") for path, action in self._actions(rendered, directories)
+        )
+        for target, action, suffix in sorted(actions):
+            style = ACTION_STYLES[action]
+            name = escape(os.path.relpath(target, destination) + suffix)
+            lines.append(f"[{style}]{action.lower():<8}[/{style}] {name}")
+        lines.extend(
+            f"[red]Failed[/red] {escape(target)}: {escape(error)}"
+            for target, error in sorted(errors.items())
+        )
+        console.print(
+            Panel(
+                "\n".join(lines) or "Nothing to do.",
+                title=f"Dry run: {escape(destination)}",
+                border_style="red" if errors else "bright_blue",
+                expand=False,
+            )
+        )
+        diff = self._diff(destination, rendered)
+        if diff:
+            console.print(Syntax(diff, "diff", background_color="default"))
+
+    def _print_summary(
+        self,
+        destination: str,
+        rendered: Dict[str, RenderedFile],
+        directories: List[Tuple[str, str]],
+        errors: Dict[str, str],
+        elapsed: float,
+    ) -> None:
+        counts: Dict[Tuple[str, str], int] = {}
+        if not errors:
+            for _, action in self._actions(rendered, directories):
+                counts[action, "file"] = counts.get((action, "file"), 0) + 1
+            for _, action in directories:
+                counts[action, "directory"] = counts.get((action, "directory"), 0) + 1
+        written = ", ".join(
+            f"{action.lower()} {count} {kind if count == 1 else PLURALS[kind]}"
+            for (action, kind), count in sorted(counts.items())
+        )
+        lines = [
+            f"{(written or 'no files written').capitalize()} in "
+            f"[bright_white]{destination}[/bright_white] ({elapsed:.2f}s)."
+        ]
+        lines.extend(
+            f"[yellow]Unreplaced[/yellow] {target}: "
+            + ", ".join(f"{{{{{name}}}}}" for name in result.missing)
+            for target, result in sorted(rendered.items())
+            if result.missing
+        )
+        lines.extend(
+            f"[red]Failed[/red] {target}: {error}"
+            for target, error in sorted(errors.items())
+        )
+        console.print(
+            Panel(
+                "\n".join(lines),
+                title="Scaffold",
+                border_style="red" if errors else "bright_green",
+                expand=False,
+            )
+        )
+
+
+def _is_directory(path: str) -> bool:
+    return os.path.isdir(path) and not os.path.islink(path)
+
+
+def _stage(result: RenderedFile, umask: int) -> str:
+    """
+    Write the new content of a target to a temporary file in its directory
+    and return its path. The file gets the mode of the target, or the mode
+    a new file would get.
+    """
+    directory, name = os.path.split(result.target)
+    fd, temp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(result.new)
+        if result.old is not None:
+            shutil.copymode(result.target, temp_path)
+        else:
+            os.chmod(temp_path, 0o666 & ~umask)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
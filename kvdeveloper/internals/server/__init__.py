@@ -1,84 +1,1087 @@
+import email.utils
+import functools
+import gzip
+import hashlib
 import http.server
+import io
+import json
 import os
+import selectors
+import signal
 import socket
 import socketserver
+import sys
 import threading
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
 
+from rich.live import Live
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 from watchdog.observers import Observer
+from watchdog.observers.api import ObservedWatch
 
 from kvdeveloper.config import console
+from kvdeveloper.internals.server.bundle import (
+    ChunkedWriter,
+    normalize_path,
+    write_bundle,
+)
+from kvdeveloper.internals.server.cache import ByteLRUCache
+from kvdeveloper.internals.server.changelog import ChangeLog
+from kvdeveloper.internals.server.debounce import Debouncer
+from kvdeveloper.internals.server.filters import PathFilter
+from kvdeveloper.internals.server.manifest import HASH_ALGORITHM, FileIndex
+from kvdeveloper.internals.server.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    CountingWriter,
+    MetricsPanel,
+    ServerMetrics,
+)
+from kvdeveloper.internals.server.precompile import (
+    PYTHON_MAGIC,
+    PYTHON_VERSION,
+    Precompiler,
+)
 
-changed_files = set()
+DEFAULT_WORKERS = 16
+KEEPALIVE_TIMEOUT = 15
+MAX_LONGPOLL_WAIT = 60.0
+SSE_HEARTBEAT = 15.0
+DEFAULT_DEBOUNCE = 0.2
+
+# Metric labels of the endpoints; other paths of a mount are files.
+SERVER_ROUTES = {
+    "/stats.json": "stats",
+    "/mounts.json": "mounts",
+    "/metrics": "metrics",
+}
+MOUNT_ROUTES = {
+    "/changes.json": "changes",
+    "/events": "events",
+    "/manifest.json": "manifest",
+    "/bundle.tar.gz": "bundle",
+    "/precompile.json": "precompile",
+}
+
+# Text formats worth compressing on the fly; images are already compressed.
+COMPRESSIBLE_EXTENSIONS = {
+    ".atlas",
+    ".css",
+    ".csv",
+    ".html",
+    ".js",
+    ".json",
+    ".kv",
+    ".md",
+    ".py",
+    ".svg",
+    ".toml",
+    ".txt",
+    ".xml",
+}
+GZIP_MIN_SIZE = 256
+GZIP_CACHE_SIZE = 16 * 1024 * 1024
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+MAX_CACHED_FILE_SIZE = 1024 * 1024
 
 
 class ChangeTrackerHandler(FileSystemEventHandler):
-    def __init__(self, allowed_exts: List[str]) -> None:
-        self.allowed_exts = allowed_exts
+    """
+    Feeds events of servable files into a `Debouncer`, which records each
+    logical save as one batch in the change log. Directories that appear or
+    go away are reported to `on_directory_created` and
+    `on_directory_removed`, so their watches can follow.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        path_filter: PathFilter,
+        debouncer: Debouncer,
+        on_directory_created: Callable[[str], None] | None = None,
+        on_directory_removed: Callable[[str], None] | None = None,
+        on_event: Callable[[str], None] | None = None,
+    ) -> None:
+        self.directory = directory
+        self.path_filter = path_filter
+        self.debouncer = debouncer
+        self.on_directory_created = on_directory_created
+        self.on_directory_removed = on_directory_removed
+        self.on_event = on_event
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        if event.is_directory:
+            self.directory_created(event.src_path)
+            return
+        self.track(event.src_path, "created", event.is_directory)
 
     def on_modified(self, event: FileSystemEvent) -> None:
-        if not event.is_directory and any(
-            event.src_path.endswith(ext) for ext in self.allowed_exts
-        ):
-            rel_path = os.path.relpath(event.src_path, os.getcwd()).replace(
-                "\\", os.sep
-            )
-            changed_files.add(rel_path)
+        self.track(event.src_path, "modified", event.is_directory)
+
+    def on_deleted(self, event: FileSystemEvent) -> None:
+        if event.is_directory:
+            self.directory_removed(event.src_path)
+            return
+        self.track(event.src_path, "deleted", event.is_directory)
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        if event.is_directory:
+            self.directory_removed(event.src_path)
+            self.directory_created(event.dest_path)
+            return
+        self.track(event.src_path, "deleted", event.is_directory)
+        self.track(event.dest_path, "created", event.is_directory)
+
+    def directory_created(self, path: str) -> None:
+        if self.on_directory_created is not None:
+            self.on_directory_created(path)
+
+    def directory_removed(self, path: str) -> None:
+        if self.on_directory_removed is not None:
+            self.on_directory_removed(path)
+
+    def track(self, src_path: str, kind: str, is_directory: bool) -> None:
+        if is_directory:
+            return
+        rel_path = os.path.relpath(src_path, self.directory).replace(os.sep, "/")
+        if self.path_filter.is_servable(rel_path):
+            if self.on_event is not None:
+                self.on_event(kind)
+            self.debouncer.push(rel_path, kind)
 
 
 class ExtensionFilterHandler(http.server.SimpleHTTPRequestHandler):
-    """Serves only files with allowed extensions."""
+    """
+    Serves only files with allowed extensions.
+
+    Each request is routed to the `Mount` whose URL prefix matches its path;
+    the endpoints below are relative to that prefix, except `/stats.json`,
+    `/mounts.json` and `/metrics` which are server wide.
+    """
+
+    mount: Optional["Mount"] = None
+    send_range: Optional[Tuple[int, int]] = None
+    route = "other"
+    status = 0
+    request_started: Optional[float] = None
+    request_sent = 0
+    # Set while the response waits for an event, see `suspend`.
+    wait_until: Optional[float] = None
+    _ready: Optional[Callable[[], bool]] = None
+    _then: Optional[Callable[[], None]] = None
+
+    # Keep connections open between requests. The server parks them while
+    # idle, `timeout` only bounds reading a request that started arriving.
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+
+    def __init__(self, *args: Any, file_server: "LocalFileServer", **kwargs: Any):
+        # Set before the base class handles the request in its __init__.
+        self.file_server = file_server
+        super().__init__(*args, **kwargs)
+
+    def setup(self) -> None:
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+
+    def handle(self) -> None:
+        """
+        Handle the first request only; `ThreadPoolHTTPServer` parks the
+        connection and calls `resume` for the next one.
+        """
+        self.handle_one_request()
+
+    def resume(self) -> None:
+        """
+        Carry on with a suspended response, or handle the next request of a
+        parked connection.
+        """
+        then = self._then
+        if then is None:
+            self.handle_one_request()
+            return
+        self._then = self._ready = self.wait_until = None
+        try:
+            then()
+        except ConnectionError:
+            self.close_connection = True
+        if self.wait_until is None:
+            self.observe_request()
+
+    def suspend(
+        self, ready: Callable[[], bool], deadline: float, then: Callable[[], None]
+    ) -> None:
+        """
+        Finish the current response later without holding a worker: once
+        the handler returns, the server waits until `ready()` is true or
+        the `time.monotonic()` `deadline` passed, then calls `then` in a
+        worker. `then` may suspend again.
+        """
+        self.wait_until = deadline
+        self._ready = ready
+        self._then = then
+
+    def is_ready(self) -> bool:
+        return self._ready is not None and self._ready()
+
+    def has_buffered_request(self) -> bool:
+        """
+        Whether the next request was already read into the input buffer,
+        as with pipelining, where the socket won't signal it again.
+        """
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
 
-    allowed_extensions: List[str] = []
+    def finish(self) -> None:
+        # The connection outlives the handling of a request, the server
+        # calls `close` once it is done with it.
+        pass
+
+    def close(self) -> None:
+        super().finish()
+
+    def handle_one_request(self) -> None:
+        """
+        Handle a request and record its latency, status and size. Timing
+        starts once the request line arrived, so idle keep-alive time is
+        not counted.
+        """
+        self.mount = None
+        self.route = "other"
+        self.status = 0
+        self.request_started = None
+        self.request_sent = self.wfile.count
+        # Left over by a ranged HEAD, which never reaches `copyfile`.
+        self.send_range = None
+        super().handle_one_request()
+        if self.wait_until is None:
+            self.observe_request()
+
+    def observe_request(self) -> None:
+        """
+        Record the request once its response is complete.
+        """
+        if self.request_started is None:
+            return
+        self.file_server.metrics.observe_request(
+            self.mount.prefix if self.mount is not None else "",
+            self.route,
+            self.status,
+            time.perf_counter() - self.request_started,
+            self.wfile.count - self.request_sent,
+        )
+
+    def parse_request(self) -> bool:
+        self.request_started = time.perf_counter()
+        return super().parse_request()
+
+    def log_request(self, code: Any = "-", size: Any = "-") -> None:
+        self.status = int(getattr(code, "value", code))
+        super().log_request(code, size)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.file_server.dashboard:
+            super().log_message(format, *args)
+            return
+        self.file_server.metrics.log(
+            f"{self.log_date_time_string()} {self.address_string()} {format % args}"
+        )
 
     def do_GET(self) -> None:
-        if self.path == "/changes.json":
+        url = urlsplit(self.path)
+        if url.path in SERVER_ROUTES:
+            self.route = SERVER_ROUTES[url.path]
+            if url.path == "/stats.json":
+                self.send_json(self.file_server.stats())
+            elif url.path == "/mounts.json":
+                self.send_json(
+                    {mount.prefix: mount.directory for mount in self.file_server.mounts}
+                )
+            else:
+                self.send_metrics()
+            return
+
+        self.mount, path = self.file_server.resolve(url.path)
+        if self.mount is None:
+            self.send_error(404, "File not found")
+            return
+        self.route = MOUNT_ROUTES.get(path, "file")
+        if path == "/changes.json":
+            self.send_changes(parse_qs(url.query))
+            return
+        if path == "/events":
+            self.send_event_stream(parse_qs(url.query))
+            return
+        if path == "/manifest.json":
+            self.send_manifest()
+            return
+        if path == "/bundle.tar.gz":
+            self.send_bundle(parse_qs(url.query).get("path"))
+            return
+        if path == "/precompile.json":
+            self.send_precompile_status()
+            return
+        if path.endswith(".pyc") and self.mount.precompiler is not None:
+            self.route = "pyc"
+            self.send_bytecode(path)
+            return
+
+        if self.is_allowed(path):
+            super().do_GET()
+        else:
+            self.send_error(403, "Forbidden file type")
+
+    def do_HEAD(self) -> None:
+        self.mount, path = self.file_server.resolve(urlsplit(self.path).path)
+        if self.mount is None:
+            self.send_error(404, "File not found")
+        elif self.is_allowed(path):
+            self.route = "file"
+            super().do_HEAD()
+        else:
+            self.send_error(403, "Forbidden file type")
+
+    def is_allowed(self, path: str) -> bool:
+        """
+        Whether the mount serves `path`: directories unless ignored, files
+        only when servable.
+        """
+        rel_path = normalize_path(unquote(path))
+        path_filter = self.mount.path_filter
+        if os.path.isdir(self.translate_path(self.path)):
+            return rel_path is None or not path_filter.is_ignored_dir(rel_path)
+        return rel_path is not None and path_filter.is_servable(rel_path)
+
+    def translate_path(self, path: str) -> str:
+        """
+        Map the URL path onto the directory of the mount it belongs to.
+        """
+        mount, path = self.file_server.resolve(urlsplit(path).path)
+        if mount is None:
+            return ""
+        self.directory = mount.directory
+        return super().translate_path(path)
+
+    def send_changes(self, query: Dict[str, List[str]]) -> None:
+        """
+        Answer `/changes.json`.
+
+        Clients sending `?since=<seq>` get the events after their cursor:
+        `{"seq": <latest>, "resync": <bool>, "changes": [...]}`. When the
+        cursor fell out of the retained log `resync` is true and the client
+        should fetch everything again. Adding `&wait=<seconds>` turns the
+        request into a long-poll that returns as soon as something changes;
+        it waits suspended, without holding a worker. Clients without a
+        cursor get the plain list of changed paths since their previous poll.
+        """
+        if "since" not in query:
+            events = self.mount.change_log.poll_events(self.client_address[0])
+            self.file_server.metrics.delivered(
+                self.client_address[0], (event.timestamp for event in events)
+            )
+            self.send_json(list(dict.fromkeys(event.path for event in events)))
+            return
+
+        try:
+            since = int(query["since"][0])
+            wait = min(float(query.get("wait", ["0"])[0]), MAX_LONGPOLL_WAIT)
+        except ValueError:
+            self.send_error(400, "Invalid 'since' or 'wait' parameter")
+            return
+
+        change_log = self.mount.change_log
+        if wait > 0 and change_log.latest_seq == since and not change_log.closed:
+            self.suspend(
+                lambda: change_log.closed or change_log.latest_seq != since,
+                time.monotonic() + wait,
+                lambda: self.send_change_events(since),
+            )
+            return
+        self.send_change_events(since)
+
+    def send_change_events(self, since: int) -> None:
+        events = self.mount.change_log.since(since)
+        if events is None:
+            seq = self.mount.change_log.latest_seq
+        else:
+            seq = events[-1].seq if events else since
+            self.file_server.metrics.delivered(
+                self.client_address[0], (event.timestamp for event in events)
+            )
+        self.send_json(
+            {
+                "seq": seq,
+                "resync": events is None,
+                "changes": [event.to_dict() for event in events or []],
+            }
+        )
+
+    def send_event_stream(self, query: Dict[str, List[str]]) -> None:
+        """
+        Push change events as Server-Sent Events on `/events`.
+
+        The stream resumes after the `Last-Event-ID` header (or `?since=`)
+        when given, otherwise it starts at the current end of the log. Each
+        change is sent as an `event: change` with its sequence number as the
+        event id; a `resync` event tells the client its cursor was evicted.
+        Between writes the stream is suspended, so listening clients don't
+        hold a worker.
+        """
+        cursor = self.headers.get("Last-Event-ID") or query.get("since", [None])[0]
+        try:
+            seq = (
+                int(cursor) if cursor is not None else self.mount.change_log.latest_seq
+            )
+        except ValueError:
+            self.send_error(400, "Invalid event id")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.stream_events(seq, heartbeat=False)
+
+    def stream_events(self, seq: int, heartbeat: bool = True) -> None:
+        """
+        Send the events after `seq`, or a heartbeat when there are none,
+        then suspend until the next change or heartbeat.
+        """
+        change_log = self.mount.change_log
+        if change_log.closed:
+            return
+        events = change_log.since(seq)
+        if events is None:
+            seq = change_log.latest_seq
+            message = f"id: {seq}\nevent: resync\ndata: {json.dumps({'seq': seq})}\n\n"
+        elif events:
+            seq = events[-1].seq
+            message = "".join(
+                f"id: {event.seq}\nevent: change\ndata: {json.dumps(event.to_dict())}\n\n"
+                for event in events
+            )
+        elif heartbeat:
+            # Comment line keeping proxies from timing out and detecting
+            # clients that went away.
+            message = ": keep-alive\n\n"
+        else:
+            message = ""
+        if message:
+            self.wfile.write(message.encode("utf-8"))
+            self.wfile.flush()
+        if events:
+            self.file_server.metrics.delivered(
+                self.client_address[0], (event.timestamp for event in events)
+            )
+        self.suspend(
+            lambda: change_log.closed or change_log.latest_seq != seq,
+            time.monotonic() + SSE_HEARTBEAT,
+            lambda: self.stream_events(seq),
+        )
+
+    def send_head(self) -> Optional[BinaryIO]:
+        """
+        Serve regular files with a content hash ETag, answering `304 Not
+        Modified` to matching `If-None-Match` (or `If-Modified-Since`)
+        requests, and gzip compressed when the client accepts it and the
+        file is a text format. Directories are left to the base class.
+        """
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().send_head()
+
+        rel_path = os.path.relpath(path, self.directory)
+        entry = self.mount.file_index.get(rel_path)
+        if entry is None:
+            self.send_error(404, "File not found")
+            return None
+
+        if self.is_not_modified(entry.digest, entry.mtime_ns):
+            self.send_response(304)
+            self.send_header("ETag", f'"{entry.digest}"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        if self.should_compress(path, entry.size):
+            try:
+                digest, body = self.compress(path, entry.digest)
+            except OSError:
+                self.send_error(404, "File not found")
+                return None
             self.send_response(200)
-            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Encoding", "gzip")
+            self.send_file_headers(f'"{digest}-gz"', entry.mtime_ns, len(body))
+            return io.BytesIO(body)
+
+        if entry.size <= MAX_CACHED_FILE_SIZE:
+            try:
+                digest, data = self.read_cached(path, entry.digest)
+            except OSError:
+                self.send_error(404, "File not found")
+                return None
+            byte_range = self.send_entity_headers(
+                path, f'"{digest}"', entry.mtime_ns, len(data)
+            )
+            if byte_range is None:
+                return None
+            start, length = byte_range
+            return io.BytesIO(data[start : start + length])
+
+        # Large files go straight from the page cache to the socket, see
+        # `copyfile`.
+        try:
+            file = open(path, "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        byte_range = self.send_entity_headers(
+            path, f'"{entry.digest}"', entry.mtime_ns, os.fstat(file.fileno()).st_size
+        )
+        if byte_range is None:
+            file.close()
+            return None
+        self.send_range = byte_range
+        return file
+
+    def send_entity_headers(
+        self, path: str, etag: str, mtime_ns: int, size: int
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Send the status line and headers of an uncompressed response,
+        honouring a single byte `Range` so interrupted downloads can resume.
+
+        :return: The `(offset, length)` of the body to send, or None when
+            the range could not be satisfied and a 416 was sent instead.
+        """
+        byte_range = self.requested_range(etag, size)
+        if byte_range is None:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
             self.end_headers()
-            import json
+            return None
+
+        start, length = byte_range
+        if length != size:
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{start + length - 1}/{size}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_file_headers(etag, mtime_ns, length)
+        return byte_range
+
+    def requested_range(self, etag: str, size: int) -> Optional[Tuple[int, int]]:
+        """
+        Return the `(offset, length)` asked for by the `Range` header, the
+        whole body when there is no usable range (none, multiple ranges, or
+        an `If-Range` that doesn't match), or None if it is unsatisfiable.
+        """
+        header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if header is None or (if_range is not None and if_range.strip() != etag):
+            return 0, size
 
-            global changed_files
-            self.wfile.write(json.dumps(list(changed_files)).encode("utf-8"))
-            changed_files.clear()
+        unit, _, spec = header.partition("=")
+        if unit.strip().lower() != "bytes" or "," in spec:
+            return 0, size
+        first, _, last = spec.strip().partition("-")
+        try:
+            if first == "":
+                suffix = int(last)
+                if suffix <= 0:
+                    return None
+                start, end = max(size - suffix, 0), size - 1
+            else:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+        except ValueError:
+            return 0, size
+
+        if start >= size or start > end:
+            return None
+        return start, end - start + 1
+
+    def copyfile(self, source: BinaryIO, outputfile: BinaryIO) -> None:
+        """
+        Hand large files to `socket.sendfile`, which uses the zero-copy
+        `os.sendfile` where available; in-memory bodies use the base class.
+        """
+        send_range, self.send_range = self.send_range, None
+        if send_range is None:
+            super().copyfile(source, outputfile)
             return
+        offset, count = send_range
+        self.wfile.count += self.connection.sendfile(source, offset, count)
 
-        if (
-            self.path == "/"
-            or self.path.endswith("/")
-            or self.is_allowed_extension(self.path)
-        ):
-            super().do_GET()
+    def send_file_headers(self, etag: str, mtime_ns: int, length: int) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header(
+            "Last-Modified", email.utils.formatdate(mtime_ns / 1e9, usegmt=True)
+        )
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def is_not_modified(self, digest: str, mtime_ns: int) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return bool(tags & {"*", f'"{digest}"', f'"{digest}-gz"'})
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return since is not None and int(mtime_ns / 1e9) <= since.timestamp()
+        return False
+
+    def should_compress(self, path: str, size: int) -> bool:
+        if size < GZIP_MIN_SIZE:
+            return False
+        if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return False
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.partition(";")
+            if name.strip().lower() == "gzip":
+                return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+        return False
+
+    def compress(self, path: str, digest: str) -> Tuple[str, bytes]:
+        """
+        Return the content hash and gzip compressed bytes of `path`, cached
+        by content hash so every client shares one compressed copy.
+        """
+        body = self.file_server.gzip_cache.get(digest)
+        if body is not None:
+            return digest, body
+
+        digest, data = self.read_cached(path, digest)
+        body = gzip.compress(data, compresslevel=6, mtime=0)
+        self.file_server.gzip_cache.put(digest, body)
+        return digest, body
+
+    def read_cached(self, path: str, digest: str) -> Tuple[str, bytes]:
+        """
+        Return the content hash and bytes of `path` from the in-memory file
+        cache, reading the file on a miss. Entries are keyed by content hash
+        and dropped by the watcher when the file changes.
+        """
+        data = self.file_server.file_cache.get(digest)
+        if data is not None:
+            return digest, data
+
+        with open(path, "rb") as file:
+            data = file.read()
+        # The file may have changed since it was indexed; never cache new
+        # content under the old hash.
+        digest = hashlib.new(HASH_ALGORITHM, data).hexdigest()
+        self.file_server.file_cache.put(digest, data)
+        return digest, data
+
+    def do_POST(self) -> None:
+        self.mount, path = self.file_server.resolve(urlsplit(self.path).path)
+        if self.mount is None or path != "/bundle.tar.gz":
+            self.send_error(405, "Method not allowed")
+            return
+        self.route = "bundle"
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            paths = json.loads(self.rfile.read(length) or b"{}").get("paths")
+            if paths is not None and not (
+                isinstance(paths, list) and all(isinstance(p, str) for p in paths)
+            ):
+                raise ValueError
+        except (ValueError, AttributeError, TypeError):
+            self.send_error(400, 'Expected a JSON body like {"paths": [...]}')
+            return
+        self.send_bundle(paths)
+
+    def send_bundle(self, paths: List[str] | None) -> None:
+        """
+        Stream a `.tar.gz` of the requested servable files, or of the whole
+        servable tree when no paths are given, in a single response.
+
+        Paths come from repeated `?path=` parameters on GET or from a JSON
+        body `{"paths": [...]}` on POST. Unknown or forbidden paths are left
+        out of the archive. HTTP/1.0 clients, which don't know chunked
+        encoding, get a body delimited by closing the connection.
+        """
+        if paths is None:
+            selected = sorted(self.mount.file_index.snapshot())
+        else:
+            selected = []
+            for path in paths:
+                path = normalize_path(path)
+                if path is not None and self.mount.path_filter.is_servable(path):
+                    selected.append(path)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/gzip")
+        self.send_header("Content-Disposition", 'attachment; filename="bundle.tar.gz"')
+        chunked = self.request_version != "HTTP/1.0"
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
         else:
+            self.send_header("Connection", "close")
+        self.end_headers()
+
+        writer = ChunkedWriter(self.wfile) if chunked else self.wfile
+        try:
+            write_bundle(writer, self.mount.file_index.directory, selected)
+            if chunked:
+                writer.close()
+        except ConnectionError:
+            self.close_connection = True
+
+    def send_manifest(self) -> None:
+        """
+        Answer `/manifest.json` with the size, mtime and content hash of
+        every servable file, plus the change log cursor the listing is
+        current for. Clients diff it against their cache, fetch what
+        differs and then follow `/changes.json?since=<seq>`.
+        """
+        # Read the cursor first: a change racing with the snapshot is then
+        # reported again by the log rather than lost.
+        seq = self.mount.change_log.latest_seq
+        files = self.mount.file_index.snapshot()
+        self.send_json(
+            {
+                "seq": seq,
+                "algorithm": HASH_ALGORITHM,
+                "files": {
+                    path: entry.to_dict() for path, entry in sorted(files.items())
+                },
+            }
+        )
+
+    def send_bytecode(self, path: str) -> None:
+        """
+        Serve the pyc of `<file>.py` as `<file>.pyc`, or `422` with the
+        syntax error when it doesn't compile.
+        """
+        rel_path = normalize_path(unquote(path))
+        source = rel_path[:-1] if rel_path is not None else None
+        if source is None or not self.mount.path_filter.is_servable(source):
             self.send_error(403, "Forbidden file type")
+            return
+        result = self.mount.precompiler.compile(source)
+        if result is None:
+            self.send_error(404, "File not found")
+            return
+        if result.error is not None:
+            self.send_error(422, "Syntax error", result.error)
+            return
+
+        etag = f'"{result.digest}-pyc"'
+        if_none_match = self.headers.get("If-None-Match", "")
+        if etag in {tag.strip() for tag in if_none_match.split(",")}:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-python-code")
+        self.send_header("X-Python-Version", PYTHON_VERSION)
+        self.send_header("X-Python-Magic", PYTHON_MAGIC)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(result.data)))
+        self.end_headers()
+        self.wfile.write(result.data)
 
-    def is_allowed_extension(self, path: str) -> bool:
-        print(os.path.basename(path))
-        return any(
-            os.path.basename(path).endswith(ext) for ext in self.allowed_extensions
+    def send_precompile_status(self) -> None:
+        """
+        Answer `/precompile.json` with the interpreter the pycs are built
+        for (devices running another version must ignore them) and the
+        files currently failing to compile.
+        """
+        precompiler = self.mount.precompiler
+        self.send_json(
+            {
+                "enabled": precompiler is not None,
+                "python": PYTHON_VERSION,
+                "magic": PYTHON_MAGIC,
+                "errors": precompiler.errors() if precompiler is not None else {},
+            }
         )
 
+    def send_metrics(self) -> None:
+        body = self.file_server.metrics.render(self.file_server.stats()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data: Any) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
 
 class FileChangeLogger(FileSystemEventHandler):
-    """Logs file changes in the directory."""
+    """
+    Logs changes of servable files in the directory. Attached to the
+    watches of a `Mount` when the dashboard is off, next to the request log.
+    """
 
-    def __init__(self, watch_dir: str, allowed_extensions: List[str]) -> None:
+    def __init__(self, watch_dir: str, path_filter: PathFilter) -> None:
         self.watch_dir = watch_dir
-        self.allowed_extensions = allowed_extensions
+        self.path_filter = path_filter
 
     def on_modified(self, event: FileSystemEvent) -> None:
-        if any(event.src_path.endswith(ext) for ext in self.allowed_extensions):
+        if self.is_tracked(event):
             console.print(f"[MODIFIED] [bright_white]{event.src_path}[/bright_white]")
 
     def on_created(self, event: FileSystemEvent) -> None:
-        if any(event.src_path.endswith(ext) for ext in self.allowed_extensions):
+        if self.is_tracked(event):
             console.print(f"[CREATED] [bright_green]{event.src_path}[/bright_green]")
 
     def on_deleted(self, event: FileSystemEvent) -> None:
-        if any(event.src_path.endswith(ext) for ext in self.allowed_extensions):
+        if self.is_tracked(event):
             console.print(f"[DELETED] [bright_red]{event.src_path}[/bright_red]")
 
+    def on_moved(self, event: FileSystemEvent) -> None:
+        if self.is_tracked(event):
+            console.print(
+                f"[MOVED] [bright_white]{event.src_path}[/bright_white] -> "
+                f"[bright_green]{event.dest_path}[/bright_green]"
+            )
+
+    def is_tracked(self, event: FileSystemEvent) -> bool:
+        rel_path = os.path.relpath(event.src_path, self.watch_dir)
+        return not event.is_directory and self.path_filter.is_servable(
+            rel_path.replace(os.sep, "/")
+        )
+
+
+class ThreadPoolHTTPServer(http.server.HTTPServer):
+    """
+    HTTP server handing each connection to a bounded pool of worker threads,
+    so a slow download doesn't block other clients.
+
+    A worker only holds a connection while it reads and answers a request.
+    In between, keep-alive connections are parked on a selector watched by
+    a single thread, which hands a connection back to the pool once its
+    next request arrives and closes it after `keepalive_timeout` idle
+    seconds. Idle clients therefore never keep new connections waiting.
+
+    Responses waiting for an event, such as long-polls and event streams,
+    are suspended the same way: the handler sets `wait_until`, and the
+    thread resumes it once `is_ready()` or at that deadline. Call `wakeup`
+    whenever the condition may have changed.
+
+    Handlers must provide `resume` to serve the next request of a parked
+    connection or carry on with a suspended response, `wait_until`,
+    `is_ready`, `has_buffered_request` and `close`.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        handler: Callable[..., socketserver.BaseRequestHandler],
+        workers: int = DEFAULT_WORKERS,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+    ) -> None:
+        super().__init__(server_address, handler)
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="kvd-serve"
+        )
+        self.connections: Set[socket.socket] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Handlers released by workers, registered by the poller thread,
+        # which is the only one using the selector.
+        self._handoff: List[Any] = []
+        self._parked: Dict[Any, float] = {}
+        self._suspended: Dict[Any, float] = {}
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ)
+        self._poller = threading.Thread(
+            target=self._poll, name="kvd-serve-poll", daemon=True
+        )
+        self._poller.start()
+
+    def process_request(self, request: socket.socket, client_address: Any) -> None:
+        with self._lock:
+            self.connections.add(request)
+        self._submit(self._serve, request, client_address)
+
+    def _serve(self, request: socket.socket, client_address: Any) -> None:
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self._close_request(request)
+            return
+        self._release(handler)
+
+    def _resume(self, handler: Any) -> None:
+        try:
+            handler.resume()
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+            handler.close_connection = True
+        self._release(handler)
+
+    def _release(self, handler: Any) -> None:
+        """
+        Called by a worker done with a request: suspend its response, close
+        the connection, or park it until its next request arrives.
+        """
+        suspended = handler.wait_until is not None
+        if (
+            not suspended
+            and not handler.close_connection
+            and handler.has_buffered_request()
+        ):
+            self._submit(self._resume, handler)
+            return
+        with self._lock:
+            keep = (suspended or not handler.close_connection) and not self._closed
+            if keep:
+                self._handoff.append(handler)
+        if keep:
+            self.wakeup()
+        else:
+            self._close(handler)
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients going away, or being cut off at shutdown, are no errors.
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def _submit(self, function: Callable[..., None], *args: Any) -> None:
+        try:
+            self.executor.submit(function, *args)
+        except RuntimeError:  # Shut down
+            if isinstance(args[0], socket.socket):
+                self._close_request(args[0])
+            else:
+                self._close(args[0])
+
+    def wakeup(self) -> None:
+        """
+        Make the poller thread check the released and suspended handlers.
+        """
+        try:
+            self._wakeup_send.send(b"\0")
+        except OSError:  # Buffer full, the poller wakes up anyway.
+            pass
+
+    def _poll(self) -> None:
+        """
+        Park the released connections, close the ones idle for too long and
+        hand the ones with a new request or a ready response back to the
+        pool.
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                handoff, self._handoff = self._handoff, []
+            now = time.monotonic()
+            for handler in handoff:
+                if handler.wait_until is not None:
+                    self._suspended[handler] = handler.wait_until
+                    continue
+                try:
+                    self._selector.register(
+                        handler.connection, selectors.EVENT_READ, handler
+                    )
+                except (OSError, ValueError):
+                    self._close(handler)
+                    continue
+                self._parked[handler] = now + self.keepalive_timeout
+            for handler, deadline in list(self._parked.items()):
+                if deadline <= now:
+                    self._unpark(handler)
+                    self._close(handler)
+            for handler, deadline in list(self._suspended.items()):
+                if deadline <= now or handler.is_ready():
+                    del self._suspended[handler]
+                    self._submit(self._resume, handler)
+
+            deadlines = list(self._parked.values()) + list(self._suspended.values())
+            timeout = max(min(deadlines) - now, 0) if deadlines else None
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wakeup_recv:
+                    try:
+                        while self._wakeup_recv.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                self._unpark(key.data)
+                self._submit(self._resume, key.data)
+
+    def _unpark(self, handler: Any) -> None:
+        del self._parked[handler]
+        self._selector.unregister(handler.connection)
+
+    def _close(self, handler: Any) -> None:
+        try:
+            handler.close()
+        except OSError:
+            pass
+        self._close_request(handler.request)
+
+    def _close_request(self, request: socket.socket) -> None:
+        with self._lock:
+            self.connections.discard(request)
+        self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with self._lock:
+            self._closed = True
+        self.wakeup()
+        self._poller.join()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for handler in list(self._parked) + list(self._suspended) + self._handoff:
+            self._close(handler)
+        self._parked.clear()
+        self._suspended.clear()
+        self._handoff.clear()
+        # Wake up workers blocked reading a request.
+        with self._lock:
+            for request in self.connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._selector.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
+
 
 def get_ip_address() -> str:
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -96,61 +1099,385 @@ def get_ip_address() -> str:
 local_ip = get_ip_address()
 
 
+DEFAULT_EXTENSIONS = [".kv", ".py", ".txt", ".png", ".jpg", ".atlas", ".toml"]
+
+
+class Mount:
+    """
+    A project directory served under a URL prefix.
+
+    Every mount has its own file filter, file index and change log, so the
+    clients of one project only get reloaded by changes to that project.
+    The observer, the worker pool and the caches belong to the
+    `LocalFileServer` and are shared by all mounts. With `log_changes`
+    the changes of servable files are also printed as they happen.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        directory: str,
+        path_filter: PathFilter,
+        on_stale: Optional[Callable[[str], None]] = None,
+        metrics: Optional[ServerMetrics] = None,
+        precompile: bool = False,
+        log_changes: bool = False,
+    ) -> None:
+        self.prefix = prefix
+        self._prefix_parts = prefix.split("/")
+        self.metrics = metrics
+        self.directory = os.path.abspath(directory)
+        self.path_filter = path_filter
+        self.change_log = ChangeLog()
+        self.file_index = FileIndex(self.directory, path_filter, on_stale=on_stale)
+        self.precompiler = Precompiler(self.file_index) if precompile else None
+        self.debouncer = None
+        self.event_handler = None
+        self.change_logger = (
+            FileChangeLogger(self.directory, path_filter) if log_changes else None
+        )
+        self.observer = None
+        self.watches: Dict[str, ObservedWatch] = {}
+
+    def match(self, url_path: str) -> Optional[str]:
+        """
+        Return `url_path` relative to the mount (keeping its leading `/`),
+        or None if it lies outside of the prefix. The prefix is compared
+        with the decoded segments of the path, so directories named with
+        spaces or non-ASCII characters can be mounted, while the rest of
+        the path stays percent-encoded for the handler.
+        """
+        if self.prefix == "/":
+            return url_path
+        parts = url_path.split("/")
+        count = len(self._prefix_parts)
+        if [unquote(part) for part in parts[:count]] != self._prefix_parts:
+            return None
+        return "/" + "/".join(parts[count:])
+
+    def start(self, observer: Observer, debounce: float) -> None:
+        self.observer = observer
+        self.debouncer = Debouncer(self.on_changes, window=debounce)
+        self.debouncer.start()
+        self.event_handler = ChangeTrackerHandler(
+            self.directory,
+            self.path_filter,
+            self.debouncer,
+            on_directory_created=self.watch_new_directory,
+            on_directory_removed=self.unwatch_directory,
+            on_event=self.on_event,
+        )
+        self.watch_directory(self.directory)
+        # Hash the tree in the background so serving starts right away.
+        threading.Thread(
+            target=self.file_index.build, name="kvd-index", daemon=True
+        ).start()
+
+    def watch_directory(self, top: str, created: bool = False) -> None:
+        """
+        Watch `top` and every directory below it, each with a watch of its
+        own. Ignored directories are pruned from the walk, so trees like
+        .git, .buildozer or a virtualenv are never walked by the observer at
+        any depth. With `created` the files found are reported as created,
+        since they may have been written before the watch was in place.
+        """
+        for dirpath, dirnames, filenames in os.walk(top):
+            rel_dir = os.path.relpath(dirpath, self.directory).replace(os.sep, "/")
+            if rel_dir != "." and self.path_filter.is_ignored_dir(rel_dir):
+                dirnames[:] = []
+                continue
+            if dirpath not in self.watches:
+                try:
+                    watch = self.observer.schedule(
+                        self.event_handler, dirpath, recursive=False
+                    )
+                except OSError:
+                    # Removed while walking.
+                    dirnames[:] = []
+                    continue
+                self.watches[dirpath] = watch
+                if self.change_logger is not None:
+                    self.observer.add_handler_for_watch(self.change_logger, watch)
+            prefix = "" if rel_dir == "." else f"{rel_dir}/"
+            dirnames[:] = [
+                name
+                for name in dirnames
+                if not self.path_filter.is_ignored_dir(prefix + name)
+            ]
+            if created:
+                for name in filenames:
+                    self.event_handler.track(
+                        os.path.join(dirpath, name), "created", False
+                    )
+
+    def watch_new_directory(self, path: str) -> None:
+        self.watch_directory(path, created=True)
+
+    def unwatch_directory(self, path: str) -> None:
+        """
+        Drop the watches of a directory that was removed or moved away and
+        of the directories below it.
+        """
+        for watched in list(self.watches):
+            if watched == path or watched.startswith(path + os.sep):
+                watch = self.watches.pop(watched)
+                try:
+                    self.observer.unschedule(watch)
+                except KeyError:
+                    # Already dropped by the observer.
+                    pass
+
+    def on_event(self, kind: str) -> None:
+        if self.metrics is not None:
+            self.metrics.watcher_event(self.prefix, kind)
+
+    def on_changes(self, changes: List[Tuple[str, str]]) -> None:
+        """
+        Apply a debounced batch of changes: refresh the file index (which
+        drops outdated cache entries) first so clients reacting to the event
+        already see the new content. With precompilation the batch is only
+        published once compiled, without the files that failed.
+        """
+        self.file_index.update(path for path, _ in changes)
+        reloads = [
+            (path, kind)
+            for path, kind in changes
+            if self.path_filter.is_reloadable(path)
+        ]
+        if not reloads:
+            return
+        if self.precompiler is not None:
+            self.precompiler.submit(reloads, self.publish)
+        else:
+            self.publish(reloads)
+
+    def publish(self, changes: List[Tuple[str, str]]) -> None:
+        self.change_log.record_batch(changes)
+        if self.metrics is not None:
+            self.metrics.published(self.prefix, len(changes))
+
+    def stop(self) -> None:
+        self.change_log.close()
+        if self.debouncer is not None:
+            self.debouncer.stop()
+        if self.precompiler is not None:
+            self.precompiler.stop()
+
+
 class LocalFileServer:
+    """
+    Serves one or more project directories to the devices running the app.
+
+    `directory` is mounted at `/`; further projects can be mounted under
+    their own prefix with `add_mount`. Pass `directory=None` to only serve
+    explicitly added mounts. With `dashboard` the request and file change
+    logs are replaced by a live panel of the server metrics, which are also
+    served in Prometheus format at `/metrics`. With `precompile` the `.py`
+    files are also served as `.pyc` and changes are only published once
+    they compile.
+    """
+
     def __init__(
         self,
-        directory: str = ".",
+        directory: Optional[str] = ".",
         port: int = 8000,
         extensions: List[str] | None = None,
+        workers: int = DEFAULT_WORKERS,
+        debounce: float = DEFAULT_DEBOUNCE,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        ignore_files: List[str] | None = None,
+        ignore_dirs: List[str] | None = None,
+        noreload_files: List[str] | None = None,
+        dashboard: bool = False,
+        precompile: bool = False,
     ) -> None:
-        self.directory = os.path.abspath(directory)
         self.port = port
-        self.extensions = extensions or [
-            ".kv",
-            ".py",
-            ".txt",
-            ".png",
-            ".jpg",
-            ".atlas",
-            ".toml",
-        ]
+        self.workers = workers
+        self.debounce = debounce
+        self.dashboard = dashboard
+        self.precompile = precompile
+        self.extensions = extensions or DEFAULT_EXTENSIONS
+        self.metrics = ServerMetrics()
+        self.mounts: List[Mount] = []
+        self.gzip_cache = ByteLRUCache(GZIP_CACHE_SIZE)
+        self.file_cache = ByteLRUCache(cache_size)
         self.httpd = None
         self.observer = None
+        self.server_thread = None
+        self._shutdown_event = threading.Event()
+        if directory is not None:
+            self.add_mount(
+                directory,
+                prefix="/",
+                extensions=self.extensions,
+                ignore_files=ignore_files,
+                ignore_dirs=ignore_dirs,
+                noreload_files=noreload_files,
+            )
 
-    def start_server(self) -> None:
-        os.chdir(self.directory)
+    def add_mount(
+        self,
+        directory: str,
+        prefix: Optional[str] = None,
+        extensions: List[str] | None = None,
+        ignore_files: List[str] | None = None,
+        ignore_dirs: List[str] | None = None,
+        noreload_files: List[str] | None = None,
+    ) -> Mount:
+        """
+        Serve `directory` under `prefix`, which defaults to the directory
+        name (made unique with a numeric suffix). Must be called before
+        `run`.
+        """
+        directory = os.path.abspath(directory)
+        if prefix is None:
+            name = os.path.basename(directory) or "app"
+            prefix, count = f"/{name}", 1
+            while any(mount.prefix == prefix for mount in self.mounts):
+                count += 1
+                prefix = f"/{name}-{count}"
+        else:
+            prefix = "/" + prefix.strip("/")
+        if any(mount.prefix == prefix for mount in self.mounts):
+            raise ValueError(f"A directory is already mounted at {prefix!r}")
 
-        ExtensionFilterHandler.allowed_extensions = self.extensions
-        handler = ExtensionFilterHandler
-        self.httpd = socketserver.TCPServer((local_ip, self.port), handler)
+        path_filter = PathFilter(
+            extensions or self.extensions,
+            ignore_files=ignore_files or [],
+            ignore_dirs=ignore_dirs or [],
+            noreload_files=noreload_files or [],
+        )
+        mount = Mount(
+            prefix,
+            directory,
+            path_filter,
+            on_stale=self.invalidate,
+            metrics=self.metrics,
+            precompile=self.precompile,
+            log_changes=not self.dashboard,
+        )
+        self.mounts.append(mount)
+        # Longest prefix first, so `/` only catches what no other mount does.
+        self.mounts.sort(key=lambda mount: len(mount.prefix), reverse=True)
+        return mount
 
-        console.print(
-            f"Serving on [bright_white]http://{local_ip}:{self.port}[/bright_white] (only {self.extensions})\n"
+    def resolve(self, url_path: str) -> Tuple[Optional[Mount], str]:
+        """
+        Return the mount serving `url_path` and the path relative to it.
+        """
+        for mount in self.mounts:
+            path = mount.match(url_path)
+            if path is not None:
+                return mount, path
+        return None, url_path
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "file_cache": self.file_cache.stats(),
+            "gzip_cache": self.gzip_cache.stats(),
+        }
+
+    def start_server(self) -> None:
+        handler = functools.partial(ExtensionFilterHandler, file_server=self)
+        self.httpd = ThreadPoolHTTPServer(
+            (local_ip, self.port), handler, workers=self.workers
         )
-        server_thread = threading.Thread(target=self.httpd.serve_forever)
-        server_thread.daemon = True
-        server_thread.start()
+        for mount in self.mounts:
+            mount.change_log.add_listener(self.httpd.wakeup)
 
-    def start_watcher(self) -> None:
+        url = f"http://{local_ip}:{self.port}"
         console.print(
-            f"Watching [bright_white]'{self.directory}'[/bright_white] for changes..."
+            f"Serving on [bright_white]{url}[/bright_white] with {self.workers} workers"
         )
-        event_handler = ChangeTrackerHandler(self.extensions)
+        for mount in sorted(self.mounts, key=lambda mount: mount.prefix):
+            console.print(
+                f"  [bright_white]{url}{mount.prefix.rstrip('/')}/[/bright_white] -> {mount.directory} (only {list(mount.path_filter.include_exts)})"
+            )
+        if self.precompile:
+            console.print(
+                f"Precompiling .py and validating .kv files for Python {PYTHON_VERSION}"
+            )
+        console.print()
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+    def start_watcher(self) -> None:
         self.observer = Observer()
-        self.observer.schedule(event_handler, self.directory, recursive=True)
+        for mount in self.mounts:
+            console.print(
+                f"Watching [bright_white]'{mount.directory}'[/bright_white] for changes..."
+            )
+            mount.start(self.observer, self.debounce)
         self.observer.start()
 
+    def invalidate(self, digest: str) -> None:
+        self.file_cache.invalidate(digest)
+        self.gzip_cache.invalidate(digest)
+
+    def stop(self, *args) -> None:
+        """
+        Request the server to shut down. Safe to call from signal handlers
+        and other threads.
+        """
+        self._shutdown_event.set()
+
+    def _install_signal_handlers(self) -> Dict[int, Any]:
+        previous = {}
+        if threading.current_thread() is not threading.main_thread():
+            return previous
+        for name in ("SIGINT", "SIGTERM"):
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                previous[signum] = signal.signal(signum, self.stop)
+        return previous
+
+    def _shutdown(self) -> None:
+        console.print("\nShutting down server and watcher...")
+        for mount in self.mounts:
+            mount.change_log.close()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        if self.server_thread is not None:
+            self.server_thread.join()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        for mount in self.mounts:
+            mount.stop()
+
+    def wait(self) -> None:
+        # Wake up periodically so that platforms which only deliver
+        # signals between bytecodes (e.g. Windows) stay responsive.
+        while not self._shutdown_event.wait(timeout=1.0):
+            if not self.observer.is_alive() or not self.server_thread.is_alive():
+                break
+
     def run(self) -> None:
+        """
+        Start the server and the watcher, then block until a shutdown is
+        requested via Ctrl+C, SIGTERM or `stop`.
+        """
+        self._shutdown_event.clear()
+        previous_handlers = self._install_signal_handlers()
         try:
             self.start_server()
             self.start_watcher()
-            while True:
-                pass  # Keep main thread alive
+            if self.dashboard:
+                panel = MetricsPanel(
+                    self.metrics, self, f"http://{local_ip}:{self.port}"
+                )
+                with Live(panel, console=console, refresh_per_second=1):
+                    self.wait()
+            else:
+                self.wait()
         except KeyboardInterrupt:
-            print("\nShutting down server and watcher...")
-            self.httpd.shutdown()
-            self.observer.stop()
-            self.observer.join()
+            pass
+        finally:
+            self._shutdown()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
 
 
 # === Example usage ===
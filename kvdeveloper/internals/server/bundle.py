@@ -0,0 +1,66 @@
+import gzip
+import os
+import posixpath
+import tarfile
+from typing import BinaryIO, Iterable, List, Optional
+
+
+class ChunkedWriter:
+    """
+    File-like wrapper writing HTTP/1.1 chunked transfer encoding, so a
+    response of unknown length can be streamed over a keep-alive connection.
+    """
+
+    def __init__(self, wfile: BinaryIO) -> None:
+        self.wfile = wfile
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self.wfile.write(b"%x\r\n%b\r\n" % (len(data), data))
+        return len(data)
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+    def close(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def normalize_path(path: str) -> Optional[str]:
+    """
+    Return `path` as a clean relative posix path, or None if it points
+    outside of the served directory.
+    """
+    path = posixpath.normpath(path.replace("\\", "/").lstrip("/"))
+    if path in ("", ".") or path == ".." or path.startswith("../"):
+        return None
+    return path
+
+
+def write_bundle(
+    fileobj: BinaryIO, directory: str, paths: Iterable[str], compresslevel: int = 6
+) -> List[str]:
+    """
+    Stream a gzip compressed tar archive of `paths` (relative to
+    `directory`) into `fileobj` and return the paths actually written.
+
+    Files are read and compressed one block at a time, the archive is never
+    held in memory as a whole. Paths that vanished in the meantime are
+    skipped.
+    """
+    written = []
+    with gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=compresslevel) as gz:
+        with tarfile.open(fileobj=gz, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+            for rel_path in paths:
+                full_path = os.path.join(directory, rel_path)
+                try:
+                    tarinfo = tar.gettarinfo(full_path, arcname=rel_path)
+                    if not tarinfo.isfile():
+                        continue
+                    with open(full_path, "rb") as file:
+                        tar.addfile(tarinfo, file)
+                except OSError:
+                    continue
+                written.append(rel_path)
+    return written
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+
+class ChangeEvent(NamedTuple):
+    seq: int
+    timestamp: float
+    path: str
+    event: str
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"seq": self.seq, "path": self.path, "event": self.event}
+
+
+class ChangeLog:
+    """
+    Ring buffer of monotonically numbered file change events.
+
+    Every client keeps its own cursor (the last sequence number it has seen)
+    and asks for the events after it, so clients never steal each other's
+    changes. Old events are evicted once the log holds more than
+    `max_events` entries or they are older than `max_age` seconds; a client
+    whose cursor points before the retained window has to do a full resync.
+    The cursors kept for clients of `poll` are dropped the same way, once
+    there are more than `max_clients` or they were not used for `max_age`
+    seconds.
+    """
+
+    def __init__(
+        self, max_events: int = 1024, max_age: float = 600.0, max_clients: int = 256
+    ) -> None:
+        self.max_events = max_events
+        self.max_age = max_age
+        self.max_clients = max_clients
+        self._events: Deque[ChangeEvent] = deque()
+        self._seq = 0
+        # Client -> (cursor, time of its last poll), least recently used first
+        self._cursors: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._closed = False
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Call `listener` after every recorded batch and when the log is
+        closed, for waiters that can't block on `wait`.
+        """
+        self._listeners.append(listener)
+
+    @property
+    def latest_seq(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def record(self, path: str, event: str = "modified") -> int:
+        """
+        Append a change event and return its sequence number.
+        """
+        return self.record_batch([(path, event)])
+
+    def record_batch(self, changes: List[Tuple[str, str]]) -> int:
+        """
+        Append several `(path, event)` changes at once, waking waiting
+        clients a single time, and return the last sequence number.
+        """
+        with self._lock:
+            timestamp = time.time()
+            for path, event in changes:
+                self._seq += 1
+                self._events.append(ChangeEvent(self._seq, timestamp, path, event))
+            self._evict()
+            self._changed.notify_all()
+            seq = self._seq
+        self._notify()
+        return seq
+
+    def since(self, seq: int) -> Optional[List[ChangeEvent]]:
+        """
+        Return the events recorded after `seq`, or None if some of them were
+        already evicted (or `seq` is unknown) and the client must resync.
+        """
+        with self._lock:
+            return self._since(seq)
+
+    def wait(self, seq: int, timeout: float) -> Optional[List[ChangeEvent]]:
+        """
+        Like `since`, but block for up to `timeout` seconds until there is
+        something newer than `seq`. Returns an empty list on timeout or when
+        the log is closed.
+        """
+        with self._lock:
+            self._changed.wait_for(
+                lambda: self._closed or self._seq != seq, timeout=timeout
+            )
+            return self._since(seq)
+
+    def close(self) -> None:
+        """
+        Wake up every waiting client, e.g. when the server shuts down.
+        """
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+        self._notify()
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            listener()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def poll(self, client: str) -> List[str]:
+        """
+        Return the distinct paths changed since `client` last polled, for
+        clients that don't send a cursor themselves. A client seen for the
+        first time starts at the current end of the log.
+        """
+        return list(dict.fromkeys(event.path for event in self.poll_events(client)))
+
+    def poll_events(self, client: str) -> List[ChangeEvent]:
+        """
+        Return the events behind `poll`, advancing the cursor of `client`.
+        """
+        with self._lock:
+            cursor = self._cursors.pop(client, (self._seq, 0.0))[0]
+            events = self._since(cursor)
+            if events is None:
+                events = list(self._events)
+            self._cursors[client] = (self._seq, time.time())
+        return events
+
+    def _since(self, seq: int) -> Optional[List[ChangeEvent]]:
+        self._evict()
+        if seq > self._seq or seq < 0:
+            return None
+        if seq == self._seq:
+            return []
+        if not self._events or seq < self._events[0].seq - 1:
+            return None
+        # Sequence numbers are contiguous, so the offset is direct.
+        start = seq - self._events[0].seq + 1
+        return [self._events[i] for i in range(start, len(self._events))]
+
+    def _evict(self) -> None:
+        while len(self._events) > self.max_events:
+            self._events.popleft()
+        deadline = time.time() - self.max_age
+        while self._events and self._events[0].timestamp < deadline:
+            self._events.popleft()
+        while self._cursors and (
+            len(self._cursors) > self.max_clients
+            or next(iter(self._cursors.values()))[1] < deadline
+        ):
+            self._cursors.popitem(last=False)
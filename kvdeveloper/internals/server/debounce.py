@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kvdeveloper.config import console
+
+# How a second event on the same path changes the pending one. Missing
+# combinations keep the newer event; `None` drops the path altogether
+# (e.g. a temp file created and removed within the same save).
+_COALESCE: Dict[Tuple[str, str], Optional[str]] = {
+    ("created", "modified"): "created",
+    ("created", "deleted"): None,
+    ("deleted", "created"): "modified",
+    ("deleted", "modified"): "modified",
+    ("modified", "created"): "modified",
+}
+
+
+class Debouncer:
+    """
+    Coalesces bursts of file events into a single batch.
+
+    Events are merged per path and handed to `callback` as one list of
+    `(path, event)` pairs once no new event arrived for `window` seconds.
+    `max_delay` bounds how long a continuous stream of writes can postpone
+    a flush.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[Tuple[str, str]]], None],
+        window: float = 0.2,
+        max_delay: float = 2.0,
+    ) -> None:
+        self.callback = callback
+        self.window = window
+        self.max_delay = max_delay
+        self._pending: Dict[str, str] = {}
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name="kvd-debouncer", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def push(self, path: str, event: str) -> None:
+        now = time.monotonic()
+        with self._cond:
+            if not self._pending:
+                self._first_event = now
+            self._last_event = now
+
+            previous = self._pending.get(path)
+            if previous is None:
+                self._pending[path] = event
+            else:
+                merged = _COALESCE.get((previous, event), event)
+                if merged is None:
+                    del self._pending[path]
+                else:
+                    self._pending[path] = merged
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._pending)
+                if self._stopped:
+                    return
+                while not self._stopped and self._pending:
+                    deadline = min(
+                        self._last_event + self.window,
+                        self._first_event + self.max_delay,
+                    )
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                if self._stopped:
+                    return
+                batch = list(self._pending.items())
+                self._pending.clear()
+            if batch:
+                try:
+                    self.callback(batch)
+                except Exception as e:
+                    console.print(f"[bold red]Error: {e}[/bold red]")
@@ -0,0 +1,115 @@
+import fnmatch
+import re
+from typing import Iterable, Optional, Pattern
+
+# Directories that never hold app sources, ignored even when config.toml
+# doesn't list them.
+DEFAULT_IGNORE_DIRS = [
+    ".git",
+    ".hg",
+    ".svn",
+    ".buildozer",
+    "__pycache__",
+    ".venv",
+    "venv",
+]
+
+
+def _compile(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    """
+    Compile glob patterns into a single regular expression, or None when
+    there are no patterns.
+    """
+    patterns = [fnmatch.translate(pattern.strip("/")) for pattern in patterns]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+class PathFilter:
+    """
+    Compiled form of the `[app]` file selection settings of config.toml.
+
+    - `include_exts`: extensions of the files that are served and watched.
+    - `ignore_dirs`: directories that are neither served nor watched.
+    - `ignore_files`: files that are neither served nor watched.
+    - `noreload_files`: files that are served but whose changes don't
+      trigger a reload on the clients.
+
+    Patterns are globs. A pattern without a `/` matches a file or directory
+    name at any depth (`"*.log"`, `".git"`), one with a `/` matches the path
+    relative to the app directory (`"assets/raw"`, `"View/*/old.kv"`).
+    Paths given to the filter are relative and use forward slashes.
+    """
+
+    def __init__(
+        self,
+        include_exts: Iterable[str],
+        ignore_files: Iterable[str] = (),
+        ignore_dirs: Iterable[str] = (),
+        noreload_files: Iterable[str] = (),
+    ) -> None:
+        self.include_exts = tuple(include_exts)
+        self._suffixes = frozenset(
+            ext if ext.startswith(".") else f".{ext}" for ext in self.include_exts
+        )
+        ignore_dirs = list(DEFAULT_IGNORE_DIRS) + list(ignore_dirs)
+        self._ignore_dir_names = _compile(p for p in ignore_dirs if "/" not in p)
+        self._ignore_dir_paths = _compile(p for p in ignore_dirs if "/" in p)
+        self._ignore_file_names = _compile(p for p in ignore_files if "/" not in p)
+        self._ignore_file_paths = _compile(p for p in ignore_files if "/" in p)
+        self._noreload_names = _compile(p for p in noreload_files if "/" not in p)
+        self._noreload_paths = _compile(p for p in noreload_files if "/" in p)
+
+    def has_included_extension(self, path: str) -> bool:
+        """
+        Whether the file name ends with one of `include_exts`, checked with
+        set lookups of its suffixes (`.kv`, and `.tar.gz`/`.gz` for names
+        with several dots) instead of scanning every extension.
+        """
+        name = path.rsplit("/", 1)[-1]
+        dot = name.find(".", 1)
+        while dot != -1:
+            if name[dot:] in self._suffixes:
+                return True
+            dot = name.find(".", dot + 1)
+        return False
+
+    def is_ignored_dir(self, rel_dir: str) -> bool:
+        """
+        Whether the directory itself matches `ignore_dirs`. Its parents are
+        not checked, walkers are expected to prune top-down.
+        """
+        name = rel_dir.rsplit("/", 1)[-1]
+        return bool(
+            (self._ignore_dir_names and self._ignore_dir_names.match(name))
+            or (self._ignore_dir_paths and self._ignore_dir_paths.match(rel_dir))
+        )
+
+    def is_servable(self, rel_path: str) -> bool:
+        """
+        Whether the file has an included extension and neither it nor any
+        of its parent directories is ignored.
+        """
+        if not self.has_included_extension(rel_path):
+            return False
+        parts = rel_path.split("/")
+        name = parts[-1]
+        if (self._ignore_file_names and self._ignore_file_names.match(name)) or (
+            self._ignore_file_paths and self._ignore_file_paths.match(rel_path)
+        ):
+            return False
+        for depth in range(1, len(parts)):
+            if self.is_ignored_dir("/".join(parts[:depth])):
+                return False
+        return True
+
+    def is_reloadable(self, rel_path: str) -> bool:
+        """
+        Whether a change of this servable file should trigger a reload.
+        """
+        name = rel_path.rsplit("/", 1)[-1]
+        return not (
+            (self._noreload_names and self._noreload_names.match(name))
+            or (self._noreload_paths and self._noreload_paths.match(rel_path))
+        )
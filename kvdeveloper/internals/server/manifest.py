@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+from kvdeveloper.internals.server.filters import PathFilter
+
+HASH_ALGORITHM = "sha256"
+_CHUNK_SIZE = 1024 * 1024
+
+
+class FileEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    digest: str
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "size": self.size,
+            "mtime": self.mtime_ns / 1e9,
+            "hash": self.digest,
+        }
+
+
+def hash_file(path: str) -> str:
+    """
+    Return the hex content hash of the file at `path`.
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileIndex:
+    """
+    Size, mtime and content hash of every servable file in a directory.
+
+    The index is built once by `build` and then kept current through
+    `update` with the paths reported by the watcher; a file is only
+    re-hashed when its size or mtime changed. Paths looked up while the
+    build walks the tree keep their newer entry (or absence). `on_stale` is called with the
+    content hash of every entry that gets replaced or dropped. Paths are
+    relative to `directory` and use forward slashes, as they appear in URLs.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        path_filter: PathFilter,
+        on_stale: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.directory = directory
+        self.path_filter = path_filter
+        self.on_stale = on_stale
+        self._entries: Dict[str, FileEntry] = {}
+        # Paths looked up before the build finished.
+        self._touched: Set[str] = set()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def build(self) -> None:
+        entries = {}
+        for root, dirs, files in os.walk(self.directory):
+            rel_root = os.path.relpath(root, self.directory).replace(os.sep, "/")
+            rel_root = "" if rel_root == "." else f"{rel_root}/"
+            dirs[:] = [
+                name
+                for name in dirs
+                if not self.path_filter.is_ignored_dir(f"{rel_root}{name}")
+            ]
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                rel_path = f"{rel_root}{file_name}"
+                if not self.path_filter.is_servable(rel_path):
+                    continue
+                entry = self._scan(path, None)
+                if entry is not None:
+                    entries[rel_path] = entry
+        with self._lock:
+            for rel_path, entry in entries.items():
+                if rel_path not in self._touched:
+                    self._entries[rel_path] = entry
+            self._touched.clear()
+            self._ready.set()
+
+    def update(self, rel_paths: Iterable[str]) -> None:
+        """
+        Refresh the entries of the given paths, dropping deleted files.
+        """
+        for rel_path in rel_paths:
+            rel_path = rel_path.replace(os.sep, "/")
+            if self.path_filter.is_servable(rel_path):
+                self.get(rel_path)
+
+    def get(self, rel_path: str) -> Optional[FileEntry]:
+        """
+        Return the current entry for `rel_path`, hashing it on demand if the
+        file is not indexed yet or changed since it was.
+        """
+        rel_path = rel_path.replace(os.sep, "/")
+        with self._lock:
+            if not self._ready.is_set():
+                self._touched.add(rel_path)
+            previous = self._entries.get(rel_path)
+        entry = self._scan(os.path.join(self.directory, rel_path), previous)
+        if entry is previous:
+            return entry
+
+        with self._lock:
+            if entry is None:
+                self._entries.pop(rel_path, None)
+            else:
+                self._entries[rel_path] = entry
+        if previous is not None and self.on_stale is not None:
+            self.on_stale(previous.digest)
+        return entry
+
+    def snapshot(self, timeout: Optional[float] = None) -> Dict[str, FileEntry]:
+        """
+        Return a copy of the index, waiting for the initial build.
+        """
+        self._ready.wait(timeout)
+        with self._lock:
+            return dict(self._entries)
+
+    @staticmethod
+    def _scan(path: str, previous: Optional[FileEntry]) -> Optional[FileEntry]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (
+            previous is not None
+            and previous.size == stat.st_size
+            and previous.mtime_ns == stat.st_mtime_ns
+        ):
+            return previous
+        try:
+            digest = hash_file(path)
+        except OSError:
+            return None
+        return FileEntry(stat.st_size, stat.st_mtime_ns, digest)
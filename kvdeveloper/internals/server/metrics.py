@@ -0,0 +1,369 @@
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rich.console import Group
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+# Upper bounds in seconds of the histogram buckets.
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+LAG_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    Cumulative bucket counts of observed values, in the Prometheus sense.
+    Not thread safe on its own, `ServerMetrics` guards all of them.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the `q` quantile as the upper bound of the bucket holding
+        it; values beyond the last bucket report the last bound.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+
+class CountingWriter:
+    """
+    Wraps a response stream and counts the bytes written through it.
+    """
+
+    def __init__(self, wfile: Any) -> None:
+        self.wfile = wfile
+        self.count = 0
+
+    def write(self, data: bytes) -> int:
+        written = self.wfile.write(data)
+        self.count += len(data)
+        return written
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.wfile, name)
+
+
+class ServerMetrics:
+    """
+    Thread safe counters and histograms of a `LocalFileServer`.
+
+    - request latency per route, and request counts and bytes sent per
+      mount, route and status code;
+    - raw watcher events and the reload events published per mount;
+    - the lag between a change being published and a client receiving it,
+      per client address.
+
+    Cache statistics are read from the caches when rendering.
+    """
+
+    def __init__(self, recent_lines: int = 8) -> None:
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._latency: Dict[str, Histogram] = {}
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._bytes_sent: Dict[Tuple[str, str], int] = {}
+        self._watcher_events: Dict[Tuple[str, str], int] = {}
+        self._published: Dict[str, int] = {}
+        self._delivery_lag: Dict[str, Histogram] = {}
+        self._last_lag: Dict[str, float] = {}
+        self._recent: Deque[str] = deque(maxlen=recent_lines)
+
+    def observe_request(
+        self, mount: str, route: str, status: int, duration: float, sent: int
+    ) -> None:
+        with self._lock:
+            histogram = self._latency.get(route)
+            if histogram is None:
+                histogram = self._latency[route] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(duration)
+            key = (mount, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._bytes_sent[mount, route] = (
+                self._bytes_sent.get((mount, route), 0) + sent
+            )
+
+    def watcher_event(self, mount: str, event: str) -> None:
+        with self._lock:
+            key = (mount, event)
+            self._watcher_events[key] = self._watcher_events.get(key, 0) + 1
+
+    def published(self, mount: str, count: int) -> None:
+        with self._lock:
+            self._published[mount] = self._published.get(mount, 0) + count
+
+    def delivered(self, client: str, timestamps: Iterable[float]) -> None:
+        """
+        Record the delivery to `client` of changes published at the given
+        `time.time()` timestamps.
+        """
+        now = time.time()
+        with self._lock:
+            histogram = self._delivery_lag.get(client)
+            for timestamp in timestamps:
+                if histogram is None:
+                    histogram = self._delivery_lag[client] = Histogram(LAG_BUCKETS)
+                lag = max(now - timestamp, 0.0)
+                histogram.observe(lag)
+                self._last_lag[client] = lag
+
+    def log(self, line: str) -> None:
+        with self._lock:
+            self._recent.append(line)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return a consistent copy of every metric.
+        """
+        with self._lock:
+            return {
+                "latency": {k: h.copy() for k, h in self._latency.items()},
+                "requests": dict(self._requests),
+                "bytes_sent": dict(self._bytes_sent),
+                "watcher_events": dict(self._watcher_events),
+                "published": dict(self._published),
+                "delivery_lag": {k: h.copy() for k, h in self._delivery_lag.items()},
+                "last_lag": dict(self._last_lag),
+                "recent": list(self._recent),
+            }
+
+    def render(self, cache_stats: Dict[str, Dict[str, int]]) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        data = self.snapshot()
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def sample(name: str, labels: Dict[str, Any], value: float) -> None:
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        def histogram(name: str, labels: Dict[str, Any], h: Histogram) -> None:
+            total = 0
+            for bound, count in zip(h.buckets, h.counts):
+                total += count
+                sample(f"{name}_bucket", {**labels, "le": _number(bound)}, total)
+            sample(f"{name}_bucket", {**labels, "le": "+Inf"}, h.count)
+            sample(f"{name}_sum", labels, h.sum)
+            sample(f"{name}_count", labels, h.count)
+
+        family("kvd_uptime_seconds", "gauge", "Seconds since the server started.")
+        sample("kvd_uptime_seconds", {}, time.time() - self.started)
+
+        name = "kvd_http_request_duration_seconds"
+        family(name, "histogram", "Time spent handling a request.")
+        for route, h in sorted(data["latency"].items()):
+            histogram(name, {"route": route}, h)
+
+        name = "kvd_http_requests_total"
+        family(name, "counter", "Requests handled.")
+        for (mount, route, code), count in sorted(data["requests"].items()):
+            sample(name, {"mount": mount, "route": route, "code": code}, count)
+
+        name = "kvd_http_sent_bytes_total"
+        family(name, "counter", "Bytes written to clients, headers included.")
+        for (mount, route), count in sorted(data["bytes_sent"].items()):
+            sample(name, {"mount": mount, "route": route}, count)
+
+        for name, key, kind, help_text in (
+            ("kvd_cache_hits_total", "hits", "counter", "Cache lookups that hit."),
+            (
+                "kvd_cache_misses_total",
+                "misses",
+                "counter",
+                "Cache lookups that missed.",
+            ),
+            ("kvd_cache_bytes", "bytes", "gauge", "Bytes held by the cache."),
+            ("kvd_cache_entries", "entries", "gauge", "Entries held by the cache."),
+        ):
+            family(name, kind, help_text)
+            for cache, stats in sorted(cache_stats.items()):
+                sample(name, {"cache": cache}, stats[key])
+
+        name = "kvd_watcher_events_total"
+        family(name, "counter", "File system events of servable files.")
+        for (mount, event), count in sorted(data["watcher_events"].items()):
+            sample(name, {"mount": mount, "event": event}, count)
+
+        name = "kvd_changes_published_total"
+        family(name, "counter", "Debounced changes published to clients.")
+        for mount, count in sorted(data["published"].items()):
+            sample(name, {"mount": mount}, count)
+
+        name = "kvd_change_delivery_lag_seconds"
+        family(
+            name, "histogram", "Time from publishing a change to a client receiving it."
+        )
+        for client, h in sorted(data["delivery_lag"].items()):
+            histogram(name, {"client": client}, h)
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for key, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value < 1:
+        return f"{value * 1000:.0f} ms"
+    return f"{value:.1f} s"
+
+
+def _size(value: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+class MetricsPanel:
+    """
+    Live `rich` view of a `ServerMetrics`, refreshed by `rich.live.Live`.
+    Watcher event rates are computed between two consecutive renders.
+    """
+
+    def __init__(self, metrics: ServerMetrics, file_server: Any, title: str) -> None:
+        self.metrics = metrics
+        self.file_server = file_server
+        self.title = title
+        self._previous: Tuple[float, Dict[str, int]] = (time.monotonic(), {})
+
+    def __rich__(self) -> Panel:
+        data = self.metrics.snapshot()
+
+        requests = Table(title="Requests", expand=True, title_justify="left")
+        for column in ("route", "count", "p50", "p95", "sent"):
+            requests.add_column(
+                column, justify="left" if column == "route" else "right"
+            )
+        sent: Dict[str, int] = {}
+        for (_, route), count in data["bytes_sent"].items():
+            sent[route] = sent.get(route, 0) + count
+        for route, h in sorted(data["latency"].items()):
+            requests.add_row(
+                route,
+                str(h.count),
+                _seconds(h.quantile(0.5)),
+                _seconds(h.quantile(0.95)),
+                _size(sent.get(route, 0)),
+            )
+
+        caches = Table(title="Caches", expand=True, title_justify="left")
+        for column in ("cache", "hit ratio", "entries", "size"):
+            caches.add_column(column, justify="left" if column == "cache" else "right")
+        for cache, stats in sorted(self.file_server.stats().items()):
+            lookups = stats["hits"] + stats["misses"]
+            ratio = f"{stats['hits'] / lookups:.0%}" if lookups else "-"
+            caches.add_row(
+                cache,
+                ratio,
+                str(stats["entries"]),
+                f"{_size(stats['bytes'])} / {_size(stats['max_bytes'])}",
+            )
+
+        now = time.monotonic()
+        totals: Dict[str, int] = {}
+        for (mount, _), count in data["watcher_events"].items():
+            totals[mount] = totals.get(mount, 0) + count
+        then, previous = self._previous
+        self._previous = (now, totals)
+        watcher = Table(title="Watcher", expand=True, title_justify="left")
+        for column in ("mount", "events/s", "events", "reloads"):
+            watcher.add_column(column, justify="left" if column == "mount" else "right")
+        for mount in sorted(mount.prefix for mount in self.file_server.mounts):
+            rate = (totals.get(mount, 0) - previous.get(mount, 0)) / max(
+                now - then, 1e-3
+            )
+            watcher.add_row(
+                mount,
+                f"{rate:.1f}",
+                str(totals.get(mount, 0)),
+                str(data["published"].get(mount, 0)),
+            )
+
+        clients = Table(title="Clients", expand=True, title_justify="left")
+        for column in ("client", "deliveries", "last lag", "p95 lag"):
+            clients.add_column(
+                column, justify="left" if column == "client" else "right"
+            )
+        for client, h in sorted(data["delivery_lag"].items()):
+            clients.add_row(
+                client,
+                str(h.count),
+                _seconds(data["last_lag"].get(client)),
+                _seconds(h.quantile(0.95)),
+            )
+
+        recent = Text("\n".join(data["recent"]) or "No requests yet.", style="dim")
+        uptime = int(time.time() - self.metrics.started)
+        return Panel(
+            Group(requests, caches, watcher, clients, recent),
+            title=self.title,
+            subtitle=f"up {uptime // 3600:d}:{uptime // 60 % 60:02d}:{uptime % 60:02d}",
+        )
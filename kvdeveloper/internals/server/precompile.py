@@ -0,0 +1,180 @@
+import importlib.util
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from rich.markup import escape
+
+from kvdeveloper.config import console
+from kvdeveloper.internals.server.manifest import FileIndex
+
+PYTHON_VERSION = f"{sys.version_info.major}.{sys.version_info.minor}"
+PYTHON_MAGIC = importlib.util.MAGIC_NUMBER.hex()
+PRECOMPILED_EXTENSIONS = (".py", ".kv")
+
+
+class CompileResult(NamedTuple):
+    digest: str
+    data: Optional[bytes]
+    error: Optional[str]
+
+
+_kv_parser = None
+
+
+def _load_kv_parser():
+    """
+    Import the kv language parser on first use, with its directives
+    (`#:import`, `#:set`, `#:include`) disabled so validating a file never
+    imports or evaluates app code on the host. Returns None without kivy.
+    """
+    global _kv_parser
+    if _kv_parser is None:
+        os.environ.setdefault("KIVY_NO_ARGS", "1")
+        os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+        os.environ.setdefault("KIVY_NO_FILELOG", "1")
+        try:
+            from kivy.lang.parser import Parser, ParserException
+        except ImportError:
+            _kv_parser = False
+            return None
+
+        class ValidatingParser(Parser):
+            def execute_directives(self) -> None:
+                pass
+
+        _kv_parser = (ValidatingParser, ParserException)
+    return _kv_parser or None
+
+
+class Precompiler:
+    """
+    Compiles the `.py` files of a directory to bytecode and validates its
+    `.kv` files, so devices don't spend CPU on it and syntax errors show up
+    on the host.
+
+    Bytecode is built by `py_compile` for the host interpreter
+    (`PYTHON_VERSION`) as checked-hash pycs, which the device only uses
+    when its own copy of the source matches. Results are kept in memory by
+    path and content hash. Changed files are compiled on a single background
+    worker through `submit`; `compile` builds a file on demand.
+    """
+
+    def __init__(self, file_index: FileIndex) -> None:
+        self.file_index = file_index
+        self._results: Dict[str, CompileResult] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="kvd-compile"
+        )
+        self._build_dir = tempfile.mkdtemp(prefix="kvd-precompile-")
+
+    def submit(
+        self,
+        changes: List[Tuple[str, str]],
+        callback: Callable[[List[Tuple[str, str]]], None],
+    ) -> None:
+        """
+        Compile the changed files in the background, then hand `callback`
+        the changes without the files that failed to compile.
+        """
+        self._executor.submit(self._process, changes, callback)
+
+    def compile(self, rel_path: str) -> Optional[CompileResult]:
+        """
+        Return the compiled form of `rel_path`, building it if the file
+        changed since the last build, or None if the file is gone.
+        """
+        entry = self.file_index.get(rel_path)
+        if entry is None:
+            with self._lock:
+                self._results.pop(rel_path, None)
+            return None
+        with self._lock:
+            result = self._results.get(rel_path)
+        if result is not None and result.digest == entry.digest:
+            return result
+
+        full_path = os.path.join(self.file_index.directory, rel_path)
+        if rel_path.endswith(".py"):
+            result = self._compile_python(full_path, rel_path, entry.digest)
+        else:
+            result = self._check_kv(full_path, rel_path, entry.digest)
+        with self._lock:
+            self._results[rel_path] = result
+        return result
+
+    def errors(self) -> Dict[str, str]:
+        with self._lock:
+            return {
+                path: result.error
+                for path, result in sorted(self._results.items())
+                if result.error is not None
+            }
+
+    def stop(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self._build_dir, ignore_errors=True)
+
+    def _process(
+        self,
+        changes: List[Tuple[str, str]],
+        callback: Callable[[List[Tuple[str, str]]], None],
+    ) -> None:
+        valid = []
+        for path, kind in changes:
+            if kind != "deleted" and path.endswith(PRECOMPILED_EXTENSIONS):
+                result = self.compile(path)
+                if result is not None and result.error is not None:
+                    console.print(
+                        f"[bold red]Error in {escape(path)}, reload skipped:[/bold red]\n"
+                        f"{escape(result.error)}"
+                    )
+                    continue
+            elif kind == "deleted":
+                with self._lock:
+                    self._results.pop(path, None)
+            valid.append((path, kind))
+        if valid:
+            callback(valid)
+
+    def _compile_python(
+        self, full_path: str, rel_path: str, digest: str
+    ) -> CompileResult:
+        cfile = os.path.join(self._build_dir, f"{threading.get_ident()}.pyc")
+        try:
+            py_compile.compile(
+                full_path,
+                cfile=cfile,
+                dfile=rel_path,
+                doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH,
+            )
+            with open(cfile, "rb") as file:
+                return CompileResult(digest, file.read(), None)
+        except py_compile.PyCompileError as e:
+            return CompileResult(digest, None, e.msg.strip())
+        except OSError as e:
+            return CompileResult(digest, None, str(e))
+        finally:
+            if os.path.exists(cfile):
+                os.remove(cfile)
+
+    def _check_kv(self, full_path: str, rel_path: str, digest: str) -> CompileResult:
+        parser = _load_kv_parser()
+        if parser is None:
+            return CompileResult(digest, None, None)
+        parser_class, parser_exception = parser
+        try:
+            with open(full_path, encoding="utf-8") as file:
+                parser_class(content=file.read(), filename=rel_path)
+        except parser_exception as e:
+            return CompileResult(digest, None, str(e).strip())
+        except (OSError, UnicodeDecodeError) as e:
+            return CompileResult(digest, None, str(e))
+        return CompileResult(digest, None, None)
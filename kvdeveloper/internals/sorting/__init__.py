@@ -1,24 +1,67 @@
-import glob
 import importlib.util
 import os
 import shutil
-from pathlib import Path
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from rich.panel import Panel
 
 from kvdeveloper.config import console
+from kvdeveloper.internals.sorting.resolve import load_index
+from kvdeveloper.internals.sorting.shake import print_report, shake
+from kvdeveloper.internals.sorting.state import (
+    SortedFile,
+    SortState,
+    hash_file,
+    state_path,
+)
+from kvdeveloper.internals.sorting.zipout import (
+    archive_paths,
+    remove_archive,
+    sync_archive,
+)
 from kvdeveloper.utils import toml_parser
 
+# Copying is I/O bound, so this goes beyond the number of CPUs.
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
 
 def sort_modules(
-    module_name: str, sortmapping: str, sortfile: str, destination: str
+    module_name: str,
+    sortmapping: str,
+    sortfile: str,
+    destination: str,
+    force: bool = False,
+    workers: Optional[int] = None,
+    app_dir: Optional[str] = None,
+    dry_run: bool = False,
+    archive: bool = False,
+    compiled: bool = False,
 ) -> None:
     """
     Collect and copy selected module files based on a mapping and user-defined configuration.
 
+    The copy is incremental: files whose source did not change since the
+    last sort into `destination` are skipped, and files copied by a previous
+    sort that are no longer selected are removed.
+
+    With `archive`, the modules go into one zip archive next to
+    `destination` instead, imported through `zipimport` by a generated
+    loader, and only the other files are copied (see `sync_archive`).
+
     Args:
         module_name (str): The root Python package name (e.g., 'carbonkivy').
         sortmapping (str): Path to the TOML file defining available modules and their paths.
         sortfile (str): Path to the TOML file with user selections for modules to include.
         destination (str): Destination directory to copy sorted files into.
+        force (bool): Resolve the sort map and copy every selected file again, ignoring the previous sort.
+        workers (int, optional): Number of copying threads.
+        app_dir (str, optional): Directory of the app using the module. When given, only the
+            selected files the app can reach are copied (see `shake`).
+        dry_run (bool): List the changes to the destination without making them.
+        archive (bool): Write the modules into a zip archive instead of copying them.
+        compiled (bool): Store the modules of the archive compiled to `.pyc`.
     """
     spec = importlib.util.find_spec(module_name)
     if spec is None or spec.origin is None:
@@ -26,7 +69,6 @@ def sort_modules(
 
     root = os.path.dirname(spec.origin).rstrip(module_name)
 
-    source = toml_parser(sortmapping)
     user_config = toml_parser(sortfile)
 
     if not user_config.get(module_name.upper()):
@@ -35,38 +77,246 @@ def sort_modules(
 
     included_members = user_config[module_name.upper()]["members"]
 
-    sorted_modules = []
+    # Sources keyed by their path relative to the package root
+    members = load_index(module_name, root, sortmapping, refresh=force)
+    files: Dict[str, str] = {}
     for member in included_members:
-        sorted_modules.extend(source[member]["modules"])
-
-    sorted_files = []
-    glob_patterns = []
-
-    for module in sorted_modules:
-        dirs, exts = os.path.splitext(module)
-        if exts in [
-            extensions.lstrip("*") for extensions in source["CORE"]["extensions"]
-        ]:
-            file_path = os.path.join(root, f"{dirs.replace('.', os.sep)}{exts}")
-            sorted_files.extend(file_path)
+        if member not in members:
+            console.print(
+                f"\nNo member [bright_red]{member}[/bright_red] in {sortmapping}."
+            )
             continue
-        module_path = module.replace(".", os.sep)
-        for ext in source["CORE"]["extensions"]:
-            pattern = os.path.join(root, module_path, ext)
-            glob_patterns.append(pattern)
+        for rel_path in members[member]:
+            files.setdefault(rel_path, os.path.join(root, rel_path))
+
+    if app_dir is not None:
+        result = shake(files, module_name, app_dir, excluded=[destination])
+        print_report(result, len(files))
+        files = result.files
+
+    output_root = os.path.dirname(os.path.abspath(destination))
+    archive_state = state_path(module_name, archive_paths(module_name, output_root)[0])
+    if archive:
+        modules = {
+            rel_path: source_file
+            for rel_path, source_file in files.items()
+            if rel_path.endswith(".py")
+        }
+        files = {
+            rel_path: source_file
+            for rel_path, source_file in files.items()
+            if rel_path not in modules
+        }
+        sync_archive(
+            module_name,
+            modules,
+            output_root,
+            SortState.load(archive_state),
+            compiled=compiled,
+            force=force,
+            dry_run=dry_run,
+        )
+    else:
+        remove_archive(module_name, output_root, archive_state, dry_run=dry_run)
+
+    if not dry_run:
+        os.makedirs(destination, exist_ok=True)
+    sync_files(
+        files,
+        output_root,
+        SortState.load(state_path(module_name, destination)),
+        force=force,
+        workers=workers,
+        dry_run=dry_run,
+    )
+
+
+def sync_files(
+    files: Dict[str, str],
+    output_root: str,
+    state: SortState,
+    force: bool = False,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+) -> None:
+    """
+    Make `output_root` hold exactly the selected `files` among the ones
+    recorded in `state`, then save the state.
 
-    for pattern in glob_patterns:
-        sorted_files.extend(glob.glob(pattern, recursive=True))
+    The parent directories are created once up front, then the files are
+    checked and copied on a thread pool of `workers` threads, the work
+    being dominated by per-file syscalls.
 
-    os.makedirs(destination, exist_ok=True)
+    Args:
+        files (Dict[str, str]): Source paths keyed by their path relative to `output_root`.
+        output_root (str): Directory the relative paths are copied into.
+        state (SortState): The files copied by the previous sort.
+        force (bool): Copy every file, even unchanged ones.
+        workers (int, optional): Number of copying threads. Defaults to `DEFAULT_WORKERS`.
+        dry_run (bool): List the files to copy and remove instead, leaving the state as is.
+    """
+    started = time.perf_counter()
+    copied: List[str] = []
+    removed: List[str] = []
+    unchanged = 0
+    errors = {}
 
-    for source_file in sorted_files:
+    directories = {
+        os.path.dirname(os.path.join(output_root, rel_path)) for rel_path in files
+    }
+    # Sorted so parents come first and are never created concurrently.
+    for directory in sorted(directories) if not dry_run else ():
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            errors[os.path.relpath(directory, output_root)] = str(e)
+
+    with ThreadPoolExecutor(
+        max_workers=workers or DEFAULT_WORKERS, thread_name_prefix="kvd-sort"
+    ) as executor:
+        futures = {
+            rel_path: executor.submit(
+                _sync_file,
+                source_file,
+                os.path.join(output_root, rel_path),
+                state.files.get(rel_path),
+                force,
+                dry_run,
+            )
+            for rel_path, source_file in sorted(files.items())
+        }
+        for rel_path, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                errors[rel_path] = str(error)
+                continue
+            was_copied, entry = future.result()
+            if was_copied:
+                copied.append(rel_path)
+            else:
+                unchanged += 1
+            state.files[rel_path] = entry
+
+    # Remove the files of previous sorts that are no longer selected
+    for rel_path in sorted(set(state.files) - set(files)):
+        dest_path = os.path.join(output_root, rel_path)
+        if dry_run:
+            if os.path.isfile(dest_path):
+                removed.append(rel_path)
+            continue
+        try:
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+                removed.append(rel_path)
+                _remove_empty_parents(os.path.dirname(dest_path), output_root)
+        except OSError as e:
+            errors[rel_path] = str(e)
+            continue
+        del state.files[rel_path]
+
+    if dry_run:
+        _print_listing(output_root, copied, removed, unchanged, errors)
+        return
+
+    try:
+        state.save()
+    except OSError as e:
+        errors["sort state"] = str(e)
+
+    lines = [
+        f"Copied {len(copied)}, unchanged {unchanged}, removed {len(removed)} files in "
+        f"[bright_white]{output_root}[/bright_white] "
+        f"({time.perf_counter() - started:.2f}s)."
+    ]
+    lines.extend(
+        f"[red]Failed[/red] {rel_path}: {error}"
+        for rel_path, error in sorted(errors.items())
+    )
+    console.print(
+        Panel(
+            "\n".join(lines),
+            title="Sort",
+            border_style="red" if errors else "bright_green",
+            expand=False,
+        )
+    )
+
+
+def _print_listing(
+    output_root: str,
+    copied: List[str],
+    removed: List[str],
+    unchanged: int,
+    errors: Dict[str, str],
+) -> None:
+    lines = [f"[green]copy[/green]    {rel_path}" for rel_path in sorted(copied)]
+    lines.extend(f"[red]remove[/red]  {rel_path}" for rel_path in sorted(removed))
+    lines.append(
+        f"Would copy {len(copied)} and remove {len(removed)} files in "
+        f"[bright_white]{output_root}[/bright_white], {unchanged} unchanged."
+    )
+    lines.extend(
+        f"[red]Failed[/red] {rel_path}: {error}"
+        for rel_path, error in sorted(errors.items())
+    )
+    console.print(
+        Panel(
+            "\n".join(lines),
+            title="Sort (dry run)",
+            border_style="red" if errors else "bright_blue",
+            expand=False,
+        )
+    )
+
+
+def _sync_file(
+    source_file: str,
+    dest_path: str,
+    entry: Optional[SortedFile],
+    force: bool,
+    dry_run: bool = False,
+) -> Tuple[bool, SortedFile]:
+    """
+    Copy one file unless its copy is current. Returns whether it was (or,
+    with `dry_run`, would be) copied and its new state entry.
+    """
+    stat = os.stat(source_file)
+    dest_exists = os.path.isfile(dest_path)
+    if (
+        not force
+        and dest_exists
+        and entry is not None
+        and entry.is_current(source_file, stat)
+    ):
+        return False, entry
+
+    digest = hash_file(source_file)
+    if (
+        not force
+        and dest_exists
+        and entry is not None
+        and entry.digest == digest
+        and os.path.getsize(dest_path) == stat.st_size
+    ):
+        # Touched but not modified
+        copied = False
+    else:
+        if not dry_run:
+            shutil.copy2(source_file, dest_path)
+        copied = True
+    return copied, SortedFile(source_file, stat.st_size, stat.st_mtime_ns, digest)
+
+
+def _remove_empty_parents(directory: str, output_root: str) -> None:
+    """
+    Remove `directory` and its parents below `output_root` while they are
+    empty.
+    """
+    output_root = os.path.abspath(output_root)
+    directory = os.path.abspath(directory)
+    while directory != output_root and directory.startswith(output_root + os.sep):
         try:
-            src = Path(source_file)
-            relative_path = src.relative_to(root)
-            dest_path = Path(destination).parent / relative_path
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(src, dest_path)
-            console.print(f"\nCreated file: [bright_white]{dest_path}[/bright_white]")
-        except Exception as e:
-            print(e)
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
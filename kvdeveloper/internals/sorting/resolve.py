@@ -0,0 +1,128 @@
+import glob
+import hashlib
+import importlib.metadata
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from kvdeveloper.config import CACHE_DIR
+from kvdeveloper.internals.sorting.state import write_json
+from kvdeveloper.utils import toml_parser
+
+INDEX_VERSION = 1
+
+
+def library_version(module_name: str) -> str:
+    """
+    Return the installed version of the distribution providing
+    `module_name`, without importing it.
+    """
+    try:
+        return importlib.metadata.version(module_name)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def package_mtime(package_dir: str) -> int:
+    """
+    Return the latest mtime of `package_dir` and its direct subdirectories,
+    which changes whenever a module or subpackage is added or removed at
+    those levels. Reinstalls and upgrades are caught by the version.
+    """
+    mtime = os.stat(package_dir).st_mtime_ns
+    with os.scandir(package_dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                mtime = max(mtime, entry.stat().st_mtime_ns)
+    return mtime
+
+
+def index_path(module_name: str, sortmapping: str) -> str:
+    location = os.path.normcase(os.path.abspath(sortmapping))
+    key = hashlib.sha1(location.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "sort", f"index-{module_name}-{key}.json")
+
+
+def resolve_member(modules: List[str], extensions: List[str], root: str) -> List[str]:
+    """
+    Expand the modules of a sort map member to the files they select,
+    relative to `root` with forward slashes.
+
+    A module ending in one of the `extensions` is a single file; any other
+    module is a directory whose files matching the `extensions` are
+    selected, recursively when it ends with `.**`.
+    """
+    single_file_extensions = [extension.lstrip("*") for extension in extensions]
+    sorted_files = []
+    glob_patterns = []
+
+    for module in modules:
+        dirs, exts = os.path.splitext(module)
+        if exts in single_file_extensions:
+            file_path = os.path.join(root, f"{dirs.replace('.', os.sep)}{exts}")
+            sorted_files.append(file_path)
+            continue
+        module_path = module.replace(".", os.sep)
+        for ext in extensions:
+            pattern = os.path.join(root, module_path, ext)
+            glob_patterns.append(pattern)
+
+    for pattern in glob_patterns:
+        sorted_files.extend(glob.glob(pattern, recursive=True))
+
+    rel_paths = []
+    for source_file in sorted_files:
+        if os.path.isfile(source_file):
+            rel_paths.append(Path(source_file).relative_to(root).as_posix())
+    return sorted(set(rel_paths))
+
+
+def load_index(
+    module_name: str, root: str, sortmapping: str, refresh: bool = False
+) -> Dict[str, List[str]]:
+    """
+    Return the files selected by every member of the sort map, relative to
+    `root`.
+
+    The index is cached on disk, keyed by the version and mtime of the
+    installed package and by the sort map file, so repeated sorts don't
+    parse the sort map or walk the installed package. Changes deeper in an
+    editable install go unnoticed until `refresh`.
+
+    Args:
+        module_name (str): The root Python package name (e.g., 'carbonkivy').
+        root (str): Directory containing the installed package.
+        sortmapping (str): Path to the TOML file defining available modules and their paths.
+        refresh (bool): Resolve the members again even if the cached index is current.
+    """
+    sortmap_stat = os.stat(sortmapping)
+    key = {
+        "index": INDEX_VERSION,
+        "root": os.path.abspath(root),
+        "version": library_version(module_name),
+        "mtime": package_mtime(os.path.join(root, module_name)),
+        "sortmap": [sortmap_stat.st_size, sortmap_stat.st_mtime_ns],
+    }
+    path = index_path(module_name, sortmapping)
+    if not refresh:
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data["key"] == key:
+                return data["members"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    source = toml_parser(sortmapping)
+    extensions = source["CORE"]["extensions"]
+    members = {
+        member: resolve_member(section["modules"], extensions, root)
+        for member, section in source.items()
+        if isinstance(section, dict) and "modules" in section
+    }
+    try:
+        write_json(path, {"key": key, "members": members})
+    except OSError:
+        pass  # Resolved again next time.
+    return members
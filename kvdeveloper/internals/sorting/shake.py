@@ -0,0 +1,367 @@
+import ast
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from rich.panel import Panel
+
+from kvdeveloper.config import console
+
+# App directories that never hold app code.
+SKIPPED_APP_DIRS = (
+    "__pycache__",
+    "venv",
+    "env",
+    "bin",
+    "build",
+    "dist",
+)
+
+_KV_IMPORT = re.compile(r"^\s*#:import\s+\S+\s+([\w.]+)", re.MULTILINE)
+_KV_RULE = re.compile(r"^\s*<-?([^>]+)>\s*:", re.MULTILINE)
+_KV_WIDGET = re.compile(r"^\s*([A-Z]\w*)\s*:\s*(?:#.*)?$", re.MULTILINE)
+
+
+class ModuleInfo(NamedTuple):
+    # Library modules imported, with the `from` names that may be submodules.
+    imports: Set[str]
+    # Widget names registered to the Factory, mapped to their module.
+    registers: Dict[str, str]
+    # Top level classes.
+    classes: Set[str]
+    # Widget names used by kv rules in string constants.
+    kv_names: Set[str]
+
+
+class ShakeResult(NamedTuple):
+    files: Dict[str, str]
+    modules: Set[str]
+    total_bytes: int
+    kept_bytes: int
+
+
+def kv_references(content: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Return the modules of the `#:import` directives and the widget names
+    used by the rules of kv language `content`.
+    """
+    modules = set(_KV_IMPORT.findall(content))
+    names = set(_KV_WIDGET.findall(content))
+    for rules in _KV_RULE.findall(content):
+        for rule in rules.split(","):
+            names.update(
+                name.strip() for name in re.split(r"[@+]", rule) if name.strip()
+            )
+    return modules, names
+
+
+def module_name_of(rel_path: str) -> str:
+    """
+    Return the dotted module name of a `.py` path relative to the package
+    root, e.g. `kivymd/uix/button/__init__.py` is `kivymd.uix.button`.
+    """
+    parts = rel_path[: -len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def parse_module(
+    source: str, module: str, is_package: bool, package_name: str
+) -> ModuleInfo:
+    """
+    Collect the references of a library module: its imports of
+    `package_name` modules (relative ones resolved), the widgets it
+    registers to the Factory, its classes and the widgets used by kv
+    strings.
+    """
+    tree = ast.parse(source)
+    imports: Set[str] = set()
+    registers: Dict[str, str] = {}
+    classes = {node.name for node in tree.body if isinstance(node, ast.ClassDef)}
+    kv_names: Set[str] = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = module.split(".")
+                if not is_package:
+                    parts.pop()
+                parts = parts[: len(parts) - (node.level - 1)]
+                base = ".".join(parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            imports.add(base)
+            # `from package import name` may import the submodule `name`
+            imports.update(
+                f"{base}.{alias.name}" for alias in node.names if alias.name != "*"
+            )
+        elif isinstance(node, ast.Call) and _is_register(node.func):
+            if not node.args or not _is_string(node.args[0]):
+                continue
+            name = node.args[0].value
+            target = module
+            for keyword in node.keywords:
+                if keyword.arg == "module" and _is_string(keyword.value):
+                    target = keyword.value.value
+            registers[name] = target
+        elif isinstance(node, ast.Attribute):
+            # `Factory.Name`
+            if isinstance(node.value, ast.Name) and node.value.id == "Factory":
+                kv_names.add(node.attr)
+        elif _is_string(node) and "\n" in node.value and ":" in node.value:
+            kv_modules, names = kv_references(node.value)
+            imports.update(kv_modules)
+            kv_names.update(names)
+
+    imports = {
+        name
+        for name in imports
+        if name == package_name or name.startswith(f"{package_name}.")
+    }
+    return ModuleInfo(imports, registers, classes, kv_names)
+
+
+def _is_register(func: ast.expr) -> bool:
+    return (isinstance(func, ast.Attribute) and func.attr == "register") or (
+        isinstance(func, ast.Name) and func.id == "register"
+    )
+
+
+def _is_string(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+def _app_files(app_dir: str, excluded: Iterable[str]) -> Iterable[str]:
+    excluded = {os.path.abspath(path) for path in excluded}
+    for root, dirs, files in os.walk(app_dir):
+        dirs[:] = [
+            name
+            for name in dirs
+            if not name.startswith(".")
+            and name not in SKIPPED_APP_DIRS
+            and os.path.abspath(os.path.join(root, name)) not in excluded
+            and not os.path.isfile(os.path.join(root, name, "pyvenv.cfg"))
+        ]
+        for file_name in files:
+            if file_name.endswith((".py", ".kv")):
+                yield os.path.join(root, file_name)
+
+
+def app_references(
+    app_dir: str, package_name: str, excluded: Iterable[str] = ()
+) -> Tuple[Set[str], Set[str]]:
+    """
+    Return the `package_name` modules imported by the `.py` and `.kv` files
+    of the app in `app_dir`, and the widget names they use. Directories in
+    `excluded`, such as the sorted copy of the library, are not scanned.
+    """
+    modules: Set[str] = set()
+    names: Set[str] = set()
+    for path in _app_files(app_dir, excluded):
+        try:
+            with open(path, encoding="utf-8") as file:
+                content = file.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        if path.endswith(".kv"):
+            kv_modules, kv_names = kv_references(content)
+            modules.update(kv_modules)
+            names.update(kv_names)
+            continue
+        try:
+            info = parse_module(content, "__main__", False, package_name)
+        except SyntaxError:
+            continue
+        modules.update(info.imports)
+        names.update(info.kv_names)
+    modules = {
+        name
+        for name in modules
+        if name == package_name or name.startswith(f"{package_name}.")
+    }
+    return modules, names
+
+
+def shake(
+    files: Dict[str, str],
+    package_name: str,
+    app_dir: str,
+    excluded: Iterable[str] = (),
+    infos: Optional[Dict[str, ModuleInfo]] = None,
+) -> ShakeResult:
+    """
+    Keep the selected `files` the app in `app_dir` can reach.
+
+    Starting from the modules the app imports and the modules providing the
+    widgets its kv rules and `Factory` lookups use, the closure follows the
+    static imports of every reached module, its parent packages and the
+    widgets used in the kv files and strings of its package. Widget names
+    are resolved through the `Factory.register` calls and the top level
+    classes of the library. Other files are kept when the package owning
+    their directory is reached, so kv files, fonts and images follow their
+    modules.
+
+    Args:
+        files (Dict[str, str]): Source paths keyed by their path relative to the package root.
+        package_name (str): The root package name (e.g., 'kivymd').
+        app_dir (str): Directory of the app using the package.
+        excluded (Iterable[str]): Directories of `app_dir` not to scan.
+        infos (Dict[str, ModuleInfo], optional): Parsed modules by relative path, parsed here when omitted.
+    """
+    modules: Dict[str, str] = {}
+    packages: Set[str] = set()
+    for rel_path in files:
+        if rel_path.endswith(".py"):
+            module = module_name_of(rel_path)
+            modules[module] = rel_path
+            if rel_path.endswith("/__init__.py"):
+                packages.add(module)
+
+    if infos is None:
+        infos = parse_modules(files)
+
+    providers: Dict[str, Set[str]] = {}
+    for rel_path, info in infos.items():
+        module = module_name_of(rel_path)
+        for name in info.classes:
+            providers.setdefault(name, set()).add(module)
+        for name, target in info.registers.items():
+            providers.setdefault(name, set()).add(target)
+
+    # kv files by the package owning them
+    owners = {rel_path: _owner(rel_path, packages) for rel_path in files}
+    package_kv: Dict[str, List[str]] = {}
+    for rel_path, owner in owners.items():
+        if rel_path.endswith(".kv") and owner is not None:
+            package_kv.setdefault(owner, []).append(rel_path)
+
+    seed_modules, seed_names = app_references(app_dir, package_name, excluded)
+    queue = deque(seed_modules)
+    queue.append(package_name)
+    used_names: Set[str] = set()
+
+    def use(names: Iterable[str]) -> None:
+        for name in names:
+            if name not in used_names:
+                used_names.add(name)
+                queue.extend(providers.get(name, ()))
+
+    use(seed_names)
+    reached: Set[str] = set()
+    while queue:
+        module = queue.popleft()
+        # `#:import name package.module.attribute` and the names of `from`
+        # imports may be attributes, which belong to their module.
+        while module not in modules and "." in module:
+            module = module.rpartition(".")[0]
+        if module in reached or module not in modules:
+            continue
+        reached.add(module)
+        parent = module.rpartition(".")[0]
+        if parent:
+            queue.append(parent)
+        info = infos.get(modules[module])
+        if info is not None:
+            queue.extend(info.imports)
+            use(info.kv_names)
+        for kv_path in package_kv.get(module, ()):
+            kv_modules, kv_names = _read_kv(files[kv_path])
+            queue.extend(kv_modules)
+            use(kv_names)
+
+    kept = {}
+    total_bytes = kept_bytes = 0
+    for rel_path, source_file in files.items():
+        size = _size(source_file)
+        total_bytes += size
+        if rel_path.endswith(".py"):
+            keep = module_name_of(rel_path) in reached
+        else:
+            owner = owners[rel_path]
+            keep = owner is None or owner in reached
+        if keep:
+            kept[rel_path] = source_file
+            kept_bytes += size
+    return ShakeResult(kept, reached, total_bytes, kept_bytes)
+
+
+def parse_modules(files: Dict[str, str]) -> Dict[str, ModuleInfo]:
+    """
+    Parse every `.py` file of `files`, skipping the ones that do not parse.
+    """
+    infos = {}
+    for rel_path, source_file in files.items():
+        if not rel_path.endswith(".py"):
+            continue
+        package_name = rel_path.split("/", 1)[0]
+        try:
+            with open(source_file, encoding="utf-8") as file:
+                source = file.read()
+            infos[rel_path] = parse_module(
+                source,
+                module_name_of(rel_path),
+                rel_path.endswith("/__init__.py"),
+                package_name,
+            )
+        except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+            continue
+    return infos
+
+
+def _owner(rel_path: str, packages: Set[str]) -> Optional[str]:
+    """
+    Return the nearest package containing `rel_path`, if any.
+    """
+    parts = rel_path.split("/")[:-1]
+    while parts:
+        module = ".".join(parts)
+        if module in packages:
+            return module
+        parts.pop()
+    return None
+
+
+def _read_kv(path: str) -> Tuple[Set[str], Set[str]]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return kv_references(file.read())
+    except (OSError, UnicodeDecodeError):
+        return set(), set()
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def print_report(result: ShakeResult, selected: int) -> None:
+    """
+    Print how much of the sort map selection tree shaking dropped.
+    """
+    saved = result.total_bytes - result.kept_bytes
+    share = saved / result.total_bytes if result.total_bytes else 0
+    console.print(
+        Panel(
+            f"Kept {len(result.files)} of {selected} files from "
+            f"{len(result.modules)} reachable modules.\n"
+            f"Saved [bright_green]{_human(saved)}[/bright_green] of "
+            f"{_human(result.total_bytes)} ({share:.0%}).",
+            title="Tree shaking",
+            border_style="bright_blue",
+            expand=False,
+        )
+    )
+
+
+def _human(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, NamedTuple, Optional
+
+from kvdeveloper.config import CACHE_DIR
+
+HASH_ALGORITHM = "sha256"
+STATE_VERSION = 1
+_CHUNK_SIZE = 1024 * 1024
+
+
+class SortedFile(NamedTuple):
+    source: str
+    size: int
+    mtime_ns: int
+    digest: str
+
+    def is_current(self, source: str, stat: os.stat_result) -> bool:
+        """
+        Whether this copy was made from `source` as it is on disk, judging
+        by size and mtime only.
+        """
+        return (
+            self.source == source
+            and self.size == stat.st_size
+            and self.mtime_ns == stat.st_mtime_ns
+        )
+
+
+def hash_file(path: str) -> str:
+    """
+    Return the hex content hash of the file at `path`.
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_json(path: str, data: object) -> None:
+    """
+    Write `data` as JSON to `path` atomically, creating its directory.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def state_path(module_name: str, destination: str) -> str:
+    """
+    Return the location of the sort state of `module_name` sorted into
+    `destination`. It is kept in the cache directory rather than next to
+    the sorted files, so it is never packaged with the app.
+    """
+    location = os.path.normcase(os.path.abspath(destination))
+    key = hashlib.sha1(location.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "sort", f"{module_name}-{key}.json")
+
+
+class SortState:
+    """
+    The files a previous sort copied into a destination, keyed by their
+    path relative to the output root, with the size, mtime and content hash
+    of the source they were copied from.
+
+    A source whose size and mtime match its entry is unchanged without being
+    read; otherwise it is hashed and only copied when its content changed.
+    Files of the state that are no longer selected are the ones a sort may
+    delete, files it never copied are left alone.
+    """
+
+    def __init__(self, path: str, files: Optional[Dict[str, SortedFile]] = None):
+        self.path = path
+        self.files: Dict[str, SortedFile] = files or {}
+
+    @classmethod
+    def load(cls, path: str) -> "SortState":
+        """
+        Read the state at `path`, starting over when it is missing,
+        unreadable or of another version.
+        """
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != STATE_VERSION:
+                return cls(path)
+            files = {
+                rel_path: SortedFile(*entry)
+                for rel_path, entry in data["files"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls(path)
+        return cls(path, files)
+
+    def save(self) -> None:
+        """
+        Write the state atomically.
+        """
+        write_json(
+            self.path,
+            {
+                "version": STATE_VERSION,
+                "files": {
+                    rel_path: list(entry)
+                    for rel_path, entry in sorted(self.files.items())
+                },
+            },
+        )
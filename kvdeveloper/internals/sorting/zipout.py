@@ -0,0 +1,328 @@
+import os
+import py_compile
+import tempfile
+import time
+import zipfile
+from typing import Dict, Iterable, List, Set, Tuple
+
+from rich.panel import Panel
+
+from kvdeveloper.config import console
+from kvdeveloper.internals.sorting.state import SortedFile, SortState, hash_file
+from kvdeveloper.utils import compile_template
+
+# Imported by the app before the sorted module, see `write_loader`.
+LOADER = '''"""
+Import {{module_name}} from {{archive_name}}, written by `kvd sort --zip`.
+
+Import this module before {{module_name}}. Its modules are read from the
+archive while `__file__` points into the directory of this file, so the kv
+files, fonts and images sorted next to the archive are found as usual.
+"""
+
+import os
+import sys
+import zipimport
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE = os.path.join(ROOT, "{{archive_name}}")
+
+
+class ResourceZipImporter(zipimport.zipimporter):
+    if hasattr(zipimport.zipimporter, "find_spec"):  # Python 3.10+
+
+        def find_spec(self, fullname, target=None):
+            spec = super().find_spec(fullname, target)
+            if spec is not None and spec.has_location:
+                inner = os.path.relpath(spec.origin, self.archive)
+                spec.origin = os.path.join(ROOT, inner)
+            return spec
+
+
+def _path_hook(path):
+    if path == ARCHIVE or path.startswith(ARCHIVE + os.sep):
+        return ResourceZipImporter(path)
+    raise ImportError(path)
+
+
+if _path_hook not in sys.path_hooks:
+    sys.path_hooks.insert(0, _path_hook)
+    sys.path_importer_cache.pop(ARCHIVE, None)
+if ARCHIVE not in sys.path:
+    sys.path.insert(0, ARCHIVE)
+'''
+
+# Fixed timestamp of the archive members, so unchanged sources give the same
+# archive. Zip dates start in 1980.
+_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def archive_paths(module_name: str, output_root: str) -> Tuple[str, str]:
+    """
+    Return the paths of the archive of `module_name` and of its loader in
+    `output_root`.
+    """
+    return (
+        os.path.join(output_root, f"{module_name}.zip"),
+        os.path.join(output_root, f"{module_name}_zip.py"),
+    )
+
+
+def member_name(rel_path: str, compiled: bool) -> str:
+    return f"{rel_path}c" if compiled else rel_path
+
+
+def directory_names(rel_paths: Iterable[str]) -> Set[str]:
+    """
+    Return the archive names of the directories holding `rel_paths`.
+    """
+    names = set()
+    for rel_path in rel_paths:
+        parts = rel_path.split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            names.add("/".join(parts[:depth]) + "/")
+    return names
+
+
+def is_current(
+    files: Dict[str, str], archive: str, state: SortState, compiled: bool
+) -> bool:
+    """
+    Whether `archive` holds exactly the `files` recorded in `state`, built
+    from the sources as they are on disk. Sources that were touched but not
+    modified are rehashed and updated in `state`.
+    """
+    if set(state.files) != set(files):
+        return False
+    try:
+        with zipfile.ZipFile(archive) as zip_file:
+            names = set(zip_file.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return False
+    expected = directory_names(files)
+    expected.update(member_name(rel_path, compiled) for rel_path in files)
+    if names != expected:
+        return False
+
+    for rel_path, source_file in files.items():
+        entry = state.files[rel_path]
+        stat = os.stat(source_file)
+        if entry.is_current(source_file, stat):
+            continue
+        digest = hash_file(source_file)
+        if entry.source != source_file or entry.digest != digest:
+            return False
+        state.files[rel_path] = SortedFile(
+            source_file, stat.st_size, stat.st_mtime_ns, digest
+        )
+    return True
+
+
+def build_archive(
+    files: Dict[str, str], archive: str, state: SortState, compiled: bool
+) -> Dict[str, str]:
+    """
+    Write the `files` into a deflated `archive` in sorted order, each
+    compiled to `.pyc` when `compiled`, and record their sources in
+    `state`. Directories get entries too, which zipimport needs to find
+    namespace packages. The archive is staged next to its target and moved
+    into place once complete. Returns the error of every file left out.
+    """
+    errors: Dict[str, str] = {}
+    entries: Dict[str, SortedFile] = {}
+    directory = os.path.dirname(archive)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".zip.tmp")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(
+            temp_path, "w", compression=zipfile.ZIP_DEFLATED
+        ) as zip_file:
+            for name in sorted(directory_names(files)):
+                info = zipfile.ZipInfo(name, _EPOCH)
+                info.external_attr = (0o40755 << 16) | 0x10
+                zip_file.writestr(info, b"")
+            for rel_path, source_file in sorted(files.items()):
+                try:
+                    stat = os.stat(source_file)
+                    data = (
+                        _compile(source_file, rel_path)
+                        if compiled
+                        else _read(source_file)
+                    )
+                    entries[rel_path] = SortedFile(
+                        source_file,
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        hash_file(source_file),
+                    )
+                except (OSError, py_compile.PyCompileError) as e:
+                    errors[rel_path] = str(e)
+                    continue
+                info = zipfile.ZipInfo(member_name(rel_path, compiled), _EPOCH)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                zip_file.writestr(info, data)
+        os.replace(temp_path, archive)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    state.files = entries
+    return errors
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def _compile(source_file: str, rel_path: str) -> bytes:
+    """
+    Return the bytecode of `source_file` as an unchecked hash-based `.pyc`,
+    which never looks for its source, with `rel_path` as the file name of
+    its code objects.
+    """
+    fd, cfile = tempfile.mkstemp(suffix=".pyc")
+    os.close(fd)
+    try:
+        py_compile.compile(
+            source_file,
+            cfile=cfile,
+            dfile=rel_path,
+            doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        )
+        return _read(cfile)
+    finally:
+        os.remove(cfile)
+
+
+def write_loader(module_name: str, archive: str, loader: str) -> bool:
+    """
+    Write the module importing `module_name` from `archive` to `loader`,
+    unless it is current. Returns whether it was written.
+    """
+    content = compile_template(LOADER).render(
+        {"module_name": module_name, "archive_name": os.path.basename(archive)},
+        strict=True,
+    )
+    try:
+        with open(loader, encoding="utf-8") as file:
+            if file.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(loader, "w", encoding="utf-8") as file:
+        file.write(content)
+    return True
+
+
+def sync_archive(
+    module_name: str,
+    files: Dict[str, str],
+    output_root: str,
+    state: SortState,
+    compiled: bool = False,
+    force: bool = False,
+    dry_run: bool = False,
+) -> None:
+    """
+    Make the archive of `module_name` in `output_root` hold the `.py` files
+    of `files`, rebuilding it only when a source, the selection or
+    `compiled` changed, then write its loader and save the state.
+
+    Args:
+        module_name (str): The root Python package name (e.g., 'kivymd').
+        files (Dict[str, str]): Source paths of the modules keyed by their path relative to `output_root`.
+        output_root (str): Directory of the archive and its loader.
+        state (SortState): The files of the previous archive.
+        compiled (bool): Store the modules compiled to `.pyc` for the running Python version.
+        force (bool): Rebuild the archive even if it is current.
+        dry_run (bool): Print whether the archive would be rebuilt instead.
+    """
+    started = time.perf_counter()
+    archive, loader = archive_paths(module_name, output_root)
+    current = not force and is_current(files, archive, state, compiled)
+    kind = ".pyc" if compiled else ".py"
+
+    if dry_run:
+        action = "Up to date" if current else "Would write"
+        lines = [
+            f"{action} [bright_white]{archive}[/bright_white] "
+            f"with {len(files)} {kind} modules."
+        ]
+        _print_panel("Archive (dry run)", lines, {}, "bright_blue")
+        return
+
+    errors: Dict[str, str] = {}
+    if not current:
+        try:
+            errors = build_archive(files, archive, state, compiled)
+        except OSError as e:
+            errors[archive] = str(e)
+    try:
+        state.save()
+    except OSError as e:
+        errors["sort state"] = str(e)
+    try:
+        write_loader(module_name, archive, loader)
+    except OSError as e:
+        errors[loader] = str(e)
+
+    action = "Unchanged" if current else "Wrote"
+    size = os.path.getsize(archive) if os.path.isfile(archive) else 0
+    lines = [
+        f"{action} [bright_white]{archive}[/bright_white] with {len(files)} "
+        f"{kind} modules, {size / 1024:.1f} KB "
+        f"({time.perf_counter() - started:.2f}s).",
+        f"Import [bright_white]{os.path.splitext(os.path.basename(loader))[0]}"
+        f"[/bright_white] before {module_name} to load it.",
+    ]
+    _print_panel("Archive", lines, errors, "bright_green")
+
+
+def remove_archive(
+    module_name: str, output_root: str, state_file: str, dry_run: bool = False
+) -> None:
+    """
+    Remove the archive of `module_name` in `output_root` and its loader,
+    when a previous sort wrote them, so sorting into a directory again
+    does not leave the archive shadowing the copied modules.
+    """
+    if not os.path.isfile(state_file):
+        return
+    paths = [
+        path for path in archive_paths(module_name, output_root) if os.path.isfile(path)
+    ]
+    if dry_run:
+        lines = [f"[red]remove[/red]  {path}" for path in paths]
+        if lines:
+            _print_panel("Archive (dry run)", lines, {}, "bright_blue")
+        return
+
+    errors: Dict[str, str] = {}
+    for path in paths + [state_file]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            errors[path] = str(e)
+    lines = [f"Removed [bright_white]{path}[/bright_white]." for path in paths]
+    if lines or errors:
+        _print_panel("Archive", lines, errors, "bright_green")
+
+
+def _print_panel(
+    title: str, lines: List[str], errors: Dict[str, str], border_style: str
+) -> None:
+    lines = lines + [
+        f"[red]Failed[/red] {rel_path}: {error}"
+        for rel_path, error in sorted(errors.items())
+    ]
+    console.print(
+        Panel(
+            "\n".join(lines),
+            title=title,
+            border_style="red" if errors else border_style,
+            expand=False,
+        )
+    )
@@ -1,10 +1,11 @@
+import ast
+import functools
 import os  # nosec
 import platform
 import re
 import subprocess
 import sys
-from shutil import rmtree
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import typer
 from rich.panel import Panel
@@ -21,11 +22,17 @@ from kvdeveloper.config import (
     VIEW_BASE,
     console,
 )
-from kvdeveloper.utils import name_parser, name_parser_snake, replace_placeholders
+from kvdeveloper.internals.index import template_index
+from kvdeveloper.internals.scaffold import ScaffoldPlan
+from kvdeveloper.utils import name_parser, name_parser_snake
 
 
 def add_extensions(
-    template_name: str, destination: str, layout_name: str = None, index: str = "1"
+    template_name: str,
+    destination: str,
+    layout_name: str = None,
+    index: str = "1",
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Copies 'extensions.py' files from the specified template or layout directory
@@ -36,10 +43,12 @@ def add_extensions(
     - destination (str): Target directory where files will be copied.
     - layout_name (str, optional): Name of the layout directory to use. Defaults to None.
     - index (str, optional): Subdirectory index within the layout directory. Defaults to "1".
+    - plan (ScaffoldPlan, optional): Plan to add the files to. They are written right away when omitted.
 
     Raises:
     - typer.Exit: If the template or layout path doesn't exist.
     """
+    package_index = template_index()
     # Determine the source directory based on layout or template
     template_path = (
         os.path.join(LAYOUTS_DIR, layout_name, index)
@@ -47,35 +56,34 @@ def add_extensions(
         else os.path.join(TEMPLATES_DIR, template_name)
     )
 
-    if not os.path.isdir(template_path):
+    if not package_index.isdir(template_path):
         typer.echo(f"\nError: Path '{template_path}' not found.")
         raise typer.Exit(code=1)
 
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
+
     # Walk through the source directory
-    for root, _, files in os.walk(template_path):
+    for root, _, files in package_index.walk(template_path):
         relative_path = os.path.relpath(root, template_path)  # Get relative path
         target_dir = os.path.join(destination, relative_path)  # Map to destination path
 
         # Process only 'extensions.py' files
         if "extensions.py" in files:
-            source_file = os.path.join(root, "extensions.py")
-            target_file = os.path.join(target_dir, "extensions.py")
-
-            # Ensure the target directory exists
-            os.makedirs(target_dir, exist_ok=True)
-
-            # Read from the source file and write to the target file
-            with (
-                open(source_file, "r", encoding="utf-8") as src,
-                open(target_file, "w", encoding="utf-8") as dest,
-            ):
-                dest.write(src.read())
+            plan.add_file(
+                os.path.join(target_dir, "extensions.py"),
+                source=os.path.join(root, "extensions.py"),
+            )
 
-            console.print(f"\nCreated file: [bright_white]{target_file}[/bright_white]")
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
 def create_from_template(
-    template_name: str, destination: str, variables: Dict[str, str]
+    template_name: str,
+    destination: str,
+    variables: Dict[str, str],
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Generate project files from a specified template, replacing placeholders
@@ -85,75 +93,55 @@ def create_from_template(
     - template_name (str): Name of the template folder.
     - destination (str): Path to the destination directory.
     - variables (Dict[str, str]): Dictionary of placeholder variables to replace.
+    - plan (ScaffoldPlan, optional): Plan to add the files to. They are written right away when omitted.
 
     Raises:
     - typer.Exit: If the template folder is not found.
     """
+    package_index = template_index()
     # Construct the path to the template
     template_path = os.path.join(TEMPLATES_DIR, template_name)
 
-    if not os.path.isdir(template_path):
+    if not package_index.isdir(template_path):
         typer.echo(f"\nError: Template '{template_name}' not found.")
         raise typer.Exit(code=1)
 
-    # Walk through the template directory and replicate structure in destination
-    for root, _, files in os.walk(template_path):
-        relative_path = os.path.relpath(
-            root, template_path
-        )  # Relative path from the template
-        target_dir = os.path.join(
-            destination, relative_path
-        )  # Corresponding destination path
-
-        os.makedirs(target_dir, exist_ok=True)  # Ensure the target directory exists
-
-        # Process files in the current directory
-        for file_name in files:
-            # Skip unnecessary file types
-            if file_name.endswith((".pyc", ".pyo")):
-                continue
-
-            source_file = os.path.join(root, file_name)  # Full path to the source file
-            target_file = os.path.join(
-                target_dir, file_name
-            )  # Full path to the target file
-
-            # Read and process the content of the template file
-            with open(source_file, "r", encoding="utf-8") as src:
-                content = src.read()
-
-            # Replace placeholders in the content
-            content = replace_placeholders(content, variables)
-
-            # Write the processed content to the target file
-            with open(target_file, "w", encoding="utf-8") as dest:
-                dest.write(content)
+    # Plan the whole project first, then write it concurrently
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
 
-            console.print(f"\nCreated file: [bright_white]{target_file}[/bright_white]")
+    # Replicate the template structure in destination, replacing placeholders
+    plan.add_tree(template_path, destination, variables)
 
     # Create common assets directories
-    _create_asset_directories(destination)
+    _create_asset_directories(destination, plan)
 
     # Update `requirements.txt` if needed
-    update_requirements(template_path, destination)
+    update_requirements(template_path, destination, plan)
+
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
-def _create_asset_directories(destination: str) -> None:
+def _create_asset_directories(destination: str, plan: ScaffoldPlan) -> None:
     """
-    Create common asset directories within the destination folder.
+    Plan common asset directories within the destination folder.
 
     Parameters:
     - destination (str): The base path where assets directories will be created.
+    - plan (ScaffoldPlan): Plan to add the directories to.
     """
     assets_path = os.path.join(destination, "assets")
-    os.makedirs(os.path.join(assets_path, "fonts"), exist_ok=True)
-    os.makedirs(os.path.join(assets_path, "images"), exist_ok=True)
-
-    console.print("\nCreated common assets directories.")
+    plan.add_directory(os.path.join(assets_path, "fonts"))
+    plan.add_directory(os.path.join(assets_path, "images"))
 
 
 def create_from_structure(
-    template_name: str, structure_name: str, destination: str, variables: Dict[str, str]
+    template_name: str,
+    structure_name: str,
+    destination: str,
+    variables: Dict[str, str],
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Create project files from a structure, replacing placeholders with specified variables.
@@ -162,23 +150,25 @@ def create_from_structure(
     :param structure_name: The name of the structure folder.
     :param destination: The destination path where files should be created.
     :param variables: A dictionary of variables to replace in the structure files.
+    :param plan: Plan to add the files to. They are written and the requirements installed right away when omitted.
     """
+    package_index = template_index()
     template_path = os.path.join(TEMPLATES_DIR, template_name)
-    if not os.path.isdir(template_path):
+    if not package_index.isdir(template_path):
         typer.echo(f"\nTemplate '{template_name}' not found.")
         raise typer.Exit(code=1)
 
     structure_path = os.path.join(STRUCTURES_DIR, structure_name)
-    if not os.path.isdir(structure_path):
+    if not package_index.isdir(structure_path):
         typer.echo(f"\nStructure '{structure_name}' not found.")
         raise typer.Exit(code=1)
 
     parsed_screens_list = []
-    dir_list = os.listdir(os.path.join(template_path, "View"))
+    dir_list = package_index.listdir(os.path.join(template_path, "View"))
     for name_view in dir_list:
         if name_view == "__pycache__":
             continue
-        if os.path.isdir(os.path.join(template_path, "View", name_view)):
+        if package_index.isdir(os.path.join(template_path, "View", name_view)):
             # Parse screen name to PascalCase
             parsed_name = name_parser(name_view, "screen")
             parsed_screens_list.append(parsed_name)
@@ -190,30 +180,25 @@ def create_from_structure(
     """
     There is no point of writing MVC implementation from scratch so I used subprocess to run KivyMD's inbuilt create_project script simplifying development workflow.
     """
-    output = subprocess.run(
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
+    # Runs right away, not as part of the plan: the files planned below
+    # override and edit its output, see `ScaffoldPlan.apply`.
+    if not _run_pattern(
         f"{sys.executable} -m kivymd.tools.patterns.create_project MVC . {variables['project_name']} python{python_version} master --use_hotreload yes --name_screen {parsed_screens_string}",
-        shell=True,  # nosec
-    )
-
-    if output.returncode != 0:
+        plan,
+    ):
         raise typer.Exit(code=1)
 
+    # Plan every file the structure overrides, then write them concurrently
+
     """
     Updating base screen components.
     """
-    with open(
-        os.path.join(template_path, "View", "base_screen.kv"), "r", encoding="utf-8"
-    ) as template_file:
-        content = template_file.read()
-
-    with open(
-        os.path.join(destination, "View", "base_screen.kv"), "w", encoding="utf-8"
-    ) as target_file:
-        target_file.write(content)
-
-        console.print(
-            f"\nUpdated file: [bright_white]{destination}/View/base_screen.kv[/bright_white]"
-        )
+    plan.add_file(
+        os.path.join(destination, "View", "base_screen.kv"),
+        source=os.path.join(template_path, "View", "base_screen.kv"),
+    )
 
     """
     Updating screen styles.
@@ -221,72 +206,70 @@ def create_from_structure(
     for name_view in parsed_screens_list:
         parsed_name = name_parser(name_view, "screen")
         snake_name_view = name_parser_snake(parsed_name)
-        with open(
-            os.path.join(template_path, "View", parsed_name, f"{snake_name_view}.kv"),
-            "r",
-            encoding="utf-8",
-        ) as template_file:
-            content = template_file.read()
-
-        with open(
+        plan.add_file(
             os.path.join(destination, "View", parsed_name, f"{snake_name_view}.kv"),
-            "w",
-            encoding="utf-8",
-        ) as target_file:
-            target_file.write(content)
-
-            console.print(
-                f"\nUpdated file: [bright_white]{destination}/View/{parsed_name}/{snake_name_view}.kv[/bright_white]"
-            )
+            source=os.path.join(
+                template_path, "View", parsed_name, f"{snake_name_view}.kv"
+            ),
+        )
 
     """
     Updating main.py.
     """
-    with open(
-        os.path.join(VIEW_BASE, "main.py"), "r", encoding="utf-8"
-    ) as template_file:
-        content = template_file.read()
-
-    content = replace_placeholders(content, variables)
-
-    with open(
-        os.path.join(destination, "main.py"), "w", encoding="utf-8"
-    ) as target_file:
-        target_file.write(content)
-
-        console.print(
-            f"\nUpdated file: [bright_white]{destination}/main.py[/bright_white]"
-        )
+    plan.add_file(
+        os.path.join(destination, "main.py"),
+        source=os.path.join(VIEW_BASE, "main.py"),
+        variables=variables,
+    )
 
     """
     Adding extended functions and classes.
     """
-    add_extensions(template_name, destination)
+    add_extensions(template_name, destination, plan=plan)
 
     """
     Updating README.md.
     """
-    with open(
-        os.path.join(template_path, "README.md"), "r", encoding="utf-8"
-    ) as template_file:
-        content = template_file.read()
+    plan.add_file(
+        os.path.join(destination, "README.md"),
+        source=os.path.join(template_path, "README.md"),
+    )
+
+    """
+    Updating requirements.txt.
+    """
+    update_requirements(template_path, destination, plan)
 
-    with open(
-        os.path.join(destination, "README.md"), "w", encoding="utf-8"
-    ) as target_file:
-        target_file.write(content)
+    if write_now:
+        if plan.apply(destination):
+            raise typer.Exit(code=1)
+        install_requirements(variables["project_name"], destination)
 
-        console.print(
-            f"\nUpdated file: [bright_white]{destination}/README.md[/bright_white]"
-        )
 
+def _run_pattern(command: str, plan: ScaffoldPlan) -> bool:
     """
-    Updating requirements.txt.
+    Run one of KivyMD's pattern scripts, or only show it when planning a dry run.
+
+    :param command: The command line to run.
+    :param plan: The plan of the running command.
+    :return: Whether the script succeeded.
     """
-    update_requirements(template_path, destination)
+    if plan.dry_run:
+        console.print(f"\nWould run: [bright_white]{command}[/bright_white]")
+        return True
+    output = subprocess.run(
+        command,
+        shell=True,  # nosec
+    )
+    return output.returncode == 0
 
+
+def install_requirements(project_name: str, destination: str) -> None:
     """
-    Installing requirements with pip.
+    Install the requirements of a project in its virtual environment with pip.
+
+    :param project_name: The name of the project.
+    :param destination: The destination path where files are created.
     """
     envbin = "bin"
     if os.name == "nt":
@@ -295,7 +278,7 @@ def create_from_structure(
     try:
         subprocess.run(  # nosec
             [
-                os.path.join(variables["project_name"], "venv", envbin, "python"),
+                os.path.join(project_name, "venv", envbin, "python"),
                 "-m",
                 "pip",
                 "install",
@@ -307,45 +290,41 @@ def create_from_structure(
         console.print(f"[bold red]{e}[/bold red]")
 
 
-def setup_build(project_name: str, destination: str, variables: Dict[str, str]) -> None:
+def setup_build(
+    project_name: str,
+    destination: str,
+    variables: Dict[str, str],
+    plan: Optional[ScaffoldPlan] = None,
+) -> None:
     """
     Create buildozer.spec, replacing placeholders with specified variables.
 
     :param project_name: The name of the project.
     :param destination: The destination path where file should be created.
     :param variables: A dictionary of variables to replace in the structure files.
+    :param plan: Plan to add the files to. They are written right away when omitted.
     """
-    spec_file_path = os.path.join(destination, "buildozer.spec")
-    if not os.path.isfile(spec_file_path):
-        with open(
-            os.path.join(VIEW_BASE, "buildozer.spec"), "r", encoding="utf-8"
-        ) as build_file:
-            content = build_file.read()
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
 
-        content = replace_placeholders(content, variables)
-
-        with open(spec_file_path, "w", encoding="utf-8") as target_build_file:
-            target_build_file.write(content)
-
-            console.print(
-                f"\nCreated file: [bold cyan]{destination}/buildozer.spec[/bold cyan]\n"
-            )
+    spec_file_path = os.path.join(destination, "buildozer.spec")
+    if not plan.exists(spec_file_path):
+        plan.add_file(
+            spec_file_path,
+            source=os.path.join(VIEW_BASE, "buildozer.spec"),
+            variables=variables,
+        )
 
     config_file_path = os.path.join(destination, "config.toml")
-    if not os.path.isfile(config_file_path):
-        with open(
-            os.path.join(VIEW_BASE, "config.toml"), "r", encoding="utf-8"
-        ) as template_file:
-            content = template_file.read()
-
-        content = replace_placeholders(content, variables)
-
-        with open(config_file_path, "w", encoding="utf-8") as config_file:
-            config_file.write(content)
+    if not plan.exists(config_file_path):
+        plan.add_file(
+            config_file_path,
+            source=os.path.join(VIEW_BASE, "config.toml"),
+            variables=variables,
+        )
 
-            console.print(
-                f"\nCreated file: [bold cyan]{config_file_path}[/bold cyan]\n"
-            )
+    if write_now and plan.files and plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
 def project_info(
@@ -391,11 +370,14 @@ def project_info(
     console.print(f"\n[bold yellow]Happy Coding![/bold yellow]\n")
 
 
-def update_requirements(template_path: str, destination: str) -> None:
+def update_requirements(
+    template_path: str, destination: str, plan: Optional[ScaffoldPlan] = None
+) -> None:
     """
     Updating requirements.txt.
     :param template_path: The path of the template folder.
     :param destination: The destination path where files are created.
+    :param plan: Plan to add the file to. It is written right away when omitted.
     """
     # from kivymd._version import __version__ as kivymd_version
     # from kivy._version import __version__ as kivy_version
@@ -404,25 +386,23 @@ def update_requirements(template_path: str, destination: str) -> None:
     install_variables = {
         "kvdeveloper_version": kvdeveloper_version,
     }
-    with open(
-        os.path.join(template_path, "requirements.txt"), "r", encoding="utf-8"
-    ) as template_file:
-        content = template_file.read()
-
-    content = replace_placeholders(content, install_variables)
-
-    with open(
-        os.path.join(destination, "requirements.txt"), "w", encoding="utf-8"
-    ) as target_file:
-        target_file.write(content)
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
+    plan.add_file(
+        os.path.join(destination, "requirements.txt"),
+        source=os.path.join(template_path, "requirements.txt"),
+        variables=install_variables,
+    )
 
-        console.print(
-            f"\nUpdated file: [bright_white]{destination}/requirements.txt[/bright_white]"
-        )
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
 def add_from_default(
-    name_screen: List[str], use_template: str, destination: str
+    name_screen: List[str],
+    use_template: str,
+    destination: str,
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Add screens to the project with a specified template and a default structure.
@@ -431,7 +411,11 @@ def add_from_default(
         name_screen (List[str]): A list of screen names to be added.
         use_template (str): The template name to be used for creating the view if it pre-exists.
         destination (str): The destination path where the files will be created.
+        plan (ScaffoldPlan, optional): Plan to add the changes to. They are applied right away when omitted.
     """
+    package_index = template_index()
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
     for name_view in name_screen:
         # Parse screen name to PascalCase
         parsed_name = name_parser(name_view, "screen")
@@ -445,7 +429,7 @@ def add_from_default(
         # Construct the view path
         view_path = os.path.join(destination, parsed_name)
 
-        if not os.path.isdir(view_path):
+        if not plan.exists(view_path):
             variables = {"parsed_name": parsed_name}
             try:
                 # Construct the template path
@@ -453,89 +437,43 @@ def add_from_default(
                     TEMPLATES_DIR, str(use_template), "View", parsed_name
                 )
 
-                if not os.path.isdir(template_path):
+                if not package_index.isdir(template_path):
                     # Template does not exist; create files with a blank template
                     if use_template:
                         typer.echo(
                             f"\nView '{parsed_name}' not found in template '{use_template}'. "
                             f"Creating '{parsed_name}' with a blank template."
                         )
-                    os.makedirs(view_path, exist_ok=True)
+                    plan.add_directory(view_path)
 
                     # Create the .py file using the default template
-                    with open(
-                        os.path.join(VIEW_BASE, "default_screen.py"),
-                        "r",
-                        encoding="utf-8",
-                    ) as view_file:
-                        content = view_file.read()
-                    content = replace_placeholders(content, variables)
-                    with open(
+                    plan.add_file(
                         os.path.join(view_path, f"{snake_name_view}.py"),
-                        "w",
-                        encoding="utf-8",
-                    ) as target_file:
-                        target_file.write(content)
-                    console.print(
-                        f"\nCreated file: [bright_white]{view_path}/{snake_name_view}.py[/bright_white]"
+                        source=os.path.join(VIEW_BASE, "default_screen.py"),
+                        variables=variables,
                     )
 
                     # Create the .kv file using the default template
-                    with open(
-                        os.path.join(VIEW_BASE, "default_screen.kv"),
-                        "r",
-                        encoding="utf-8",
-                    ) as view_file:
-                        content = view_file.read()
-                    content = replace_placeholders(content, variables)
-                    with open(
+                    plan.add_file(
                         os.path.join(view_path, f"{snake_name_view}.kv"),
-                        "w",
-                        encoding="utf-8",
-                    ) as target_file:
-                        target_file.write(content)
-                    console.print(
-                        f"\nCreated file: [bright_white]{view_path}/{snake_name_view}.kv[/bright_white]"
+                        source=os.path.join(VIEW_BASE, "default_screen.kv"),
+                        variables=variables,
                     )
 
                     # Update the screens file
-                    update_screens_file(parsed_name, snake_name_view, destination)
+                    update_screens_file(parsed_name, snake_name_view, destination, plan)
 
                     # Create an empty __init__.py File
-                    with open(
-                        os.path.join(view_path, "__init__.py"), "w", encoding="utf-8"
-                    ) as init_file:
-                        init_file.write("# Empty __init__.py file")
+                    plan.add_file(
+                        os.path.join(view_path, "__init__.py"),
+                        content="# Empty __init__.py file",
+                    )
                 else:
                     # Template exists; copy and process files from the template
-                    for root, _, files in os.walk(template_path):
-                        relative_path = os.path.relpath(root, template_path)
-                        target_dir = os.path.join(view_path, relative_path)
-                        os.makedirs(target_dir, exist_ok=True)
-
-                        for file_name in files:
-                            # Skip .pyc and .pyo files
-                            if file_name.endswith((".pyc", ".pyo")):
-                                continue
-                            template_file_path = os.path.join(root, file_name)
-                            target_file_path = os.path.join(target_dir, file_name)
-
-                            # Read and process each template file
-                            with open(
-                                template_file_path, "r", encoding="utf-8"
-                            ) as template_file:
-                                content = template_file.read()
-                            content = replace_placeholders(content, variables)
-                            with open(
-                                target_file_path, "w", encoding="utf-8"
-                            ) as target_file:
-                                target_file.write(content)
-                            console.print(
-                                f"\nCreated file: [bright_white]{target_file_path}[/bright_white]"
-                            )
-
-                        # Update the screens file
-                        update_screens_file(parsed_name, snake_name_view, destination)
+                    plan.add_tree(template_path, view_path, variables)
+
+                    # Update the screens file
+                    update_screens_file(parsed_name, snake_name_view, destination, plan)
             except Exception as e:
                 typer.secho(f"Error: {e}", err=True)
         else:
@@ -543,9 +481,15 @@ def add_from_default(
                 f"\nScreen with name [green]{parsed_name}[/green] already exists. Try a different name."
             )
 
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
+
 
 def update_screens_file(
-    parsed_name: str, snake_name_view: str, destination: str
+    parsed_name: str,
+    snake_name_view: str,
+    destination: str,
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Updates the screens.py file by adding the import statement and the screen entry.
@@ -553,19 +497,155 @@ def update_screens_file(
     :param parsed_name: The name of the screen class (e.g., 'MyScreen').
     :param snake_name_view: The name of the screen in snake_case (e.g., 'my_screen').
     :param destination: The destination path where the files is located.
+    :param plan: Plan to add the edit to. The file is updated right away when omitted.
     """
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
 
-    # Define the paths and patterns
+    # Screens added by the same plan share one edit of the file
     file_path = os.path.join(destination, "screens.py")
+    edits = plan.edits.get(os.path.normpath(file_path))
+    if edits and isinstance(edits[-1], _ScreenEntries):
+        screen_entries = edits[-1]
+    else:
+        screen_entries = _ScreenEntries()
+        plan.add_edit(file_path, screen_entries)
+    screen_entries.add(parsed_name, snake_name_view)
+
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
+
+
+class _ScreenEntries:
+    """
+    Edit of a screens.py file adding the import statements and the screen
+    entries of several screens. The file is parsed once with `ast` to locate
+    the `View` imports and the `screens` dictionary, then everything is
+    inserted in a single pass. Files that do not parse fall back to
+    `_add_screen_entry` for each screen.
+    """
+
+    def __init__(self) -> None:
+        # Screen class names mapped to their snake_case names, in order.
+        self.screens: Dict[str, str] = {}
+
+    def add(self, parsed_name: str, snake_name_view: str) -> None:
+        self.screens.setdefault(parsed_name, snake_name_view)
+
+    def __call__(self, content: str) -> str:
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            tree = None
+        screens_dict = None
+        if tree is not None:
+            for node in tree.body:
+                if (
+                    isinstance(node, ast.Assign)
+                    and isinstance(node.value, ast.Dict)
+                    and any(
+                        isinstance(target, ast.Name) and target.id == "screens"
+                        for target in node.targets
+                    )
+                ):
+                    screens_dict = node.value
+        if screens_dict is None:
+            for parsed_name, snake_name_view in self.screens.items():
+                content = _add_screen_entry(parsed_name, snake_name_view, content)
+            return content
+
+        imported = {
+            alias.asname or alias.name
+            for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))
+            for alias in node.names
+        }
+        screen_keys = {
+            key.value for key in screens_dict.keys if isinstance(key, ast.Constant)
+        }
+        view_imports = [
+            node
+            for node in tree.body
+            if isinstance(node, ast.ImportFrom)
+            and (node.module or "").startswith("View.")
+        ]
+
+        import_statements = []
+        screen_entries = []
+        for parsed_name, snake_name_view in self.screens.items():
+            if f"{parsed_name}View" in imported:
+                print(f"\nThe import statement for {parsed_name}View already exists.")
+            else:
+                import_statements.append(
+                    f"from View.{parsed_name}.{snake_name_view} import {parsed_name}View\n"
+                )
+            screen_key = snake_name_view.replace("_", " ")
+            if screen_key in screen_keys:
+                print(f"\nThe screen entry for {snake_name_view} already exists.")
+            else:
+                screen_entries.append(
+                    f"\n    '{screen_key}': {{\n        'object': {parsed_name}View,\n        'module': 'View.{parsed_name}'\n    }},"
+                )
+
+        # ast positions are lines and UTF-8 byte columns, map them to offsets
+        lines = content.splitlines(keepends=True)
+        line_starts = [0]
+        for line in lines:
+            line_starts.append(line_starts[-1] + len(line))
+
+        def offset(lineno: int, col: int) -> int:
+            line = lines[lineno - 1].encode("utf-8")[:col]
+            return line_starts[lineno - 1] + len(line.decode("utf-8"))
+
+        insertions = []
+        if screen_entries:
+            # Insert the entries before the line of the closing curly brace
+            close = offset(screens_dict.end_lineno, screens_dict.end_col_offset) - 1
+            if screens_dict.values:
+                last = screens_dict.values[-1]
+                last_end = offset(last.end_lineno, last.end_col_offset)
+                if "," not in content[last_end:close]:
+                    insertions.append((last_end, ","))
+            newline = content.rfind("\n", 0, close)
+            if newline != -1 and not content[newline:close].strip():
+                insertions.append((newline, "".join(screen_entries)))
+            else:
+                insertions.append((close, "".join(screen_entries) + "\n"))
+        if import_statements:
+            if view_imports:
+                # Insert the imports below the last `from View...` import
+                position = line_starts[view_imports[-1].end_lineno]
+                text = "".join(import_statements)
+                if not content[:position].endswith("\n"):
+                    text = "\n" + text
+            else:
+                # Insert the imports at the top of the file
+                position = 0
+                text = "".join(import_statements) + "\n"
+            insertions.append((position, text))
+
+        # From the end, so earlier offsets stay valid; at the same offset the
+        # insertion planned first ends up first
+        for position, text in reversed(sorted(insertions, key=lambda i: i[0])):
+            content = content[:position] + text + content[position:]
+        return content
+
+
+def _add_screen_entry(parsed_name: str, snake_name_view: str, content: str) -> str:
+    """
+    Add the import statement and the screen entry of a screen to the content
+    of a screens.py file.
+
+    :param parsed_name: The name of the screen class (e.g., 'MyScreen').
+    :param snake_name_view: The name of the screen in snake_case (e.g., 'my_screen').
+    :param content: The content of the screens.py file.
+    :return: The updated content.
+    """
     import_statement = (
         f"from View.{parsed_name}.{snake_name_view} import {parsed_name}View\n"
     )
     screen_entry = f"\n    '{snake_name_view.replace('_', ' ')}': {{\n        'object': {parsed_name}View,\n        'module': 'View.{parsed_name}'\n    }},"
 
-    # Read the contents of the screens.py file
-    with open(file_path, "r", encoding="utf-8") as file:
-        content = file.read()
-
     # Check if the import statement already exists
     if re.search(re.escape(import_statement.strip()), content):
         print(f"\nThe import statement for {parsed_name}View already exists.")
@@ -593,13 +673,7 @@ def update_screens_file(
             screen_entry + r"\g<1>",  # Insert the new screen entry before it
             content,
         )
-
-    # Write the updated content back to the screens.py file
-    with open(file_path, "w", encoding="utf-8") as file:
-        file.write(content)
-    console.print(
-        f"\nUpdated file: [green]{destination}/screens.py[/green] with [green]{parsed_name}View[/green]."
-    )
+    return content
 
 
 def add_from_structure(
@@ -607,6 +681,7 @@ def add_from_structure(
     use_template: str,
     layout: str,
     destination: str,
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Add screens to the project using a custom structure.
@@ -614,7 +689,11 @@ def add_from_structure(
     :param name_screen: A list of screen names to be added.
     :param use_template: The template name to be used for creating the view.
     :param destination: The destination path where the files will be created.
+    :param plan: Plan to add the changes to. They are applied right away when omitted.
     """
+    package_index = template_index()
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
     parsed_screens_list = []
     for name_view in name_screen:
         if name_view == "__pycache__":
@@ -623,88 +702,92 @@ def add_from_structure(
         parsed_name = name_parser(name_view, "screen")
         parsed_screens_list.append(parsed_name)
 
+    use_default = False
     for parsed_name in parsed_screens_list:
         console.print(
             f"\nCreating Screen with name [bold cyan]{parsed_name}[/bold cyan]."
         )
-        output = subprocess.run(
+        if _run_pattern(
             f"{sys.executable} -m kivymd.tools.patterns.add_view MVC . {parsed_name}",
-            shell=True,  # nosec
-        )
-        if output.returncode != 0:
-            console.print(
-                f"\nThis project may not be following [green]MVC[/green] architecture.\n"
-            )
-            prompt = Prompt.ask(
-                f"Want to add screen using structure [[green]none: {STRUCTURES['none']}[/green]] ?",
-                choices=["y", "n"],
-                default="n",
-            )
-            if prompt == "y":
-                add_from_default(name_screen, use_template, destination)
-                if layout != None:
-                    apply_layout(name_screen, layout, destination)
-                raise typer.Exit(code=0)
-            else:
-                raise typer.Exit(code=1)
-
-    if layout != None:
-        apply_layout(name_screen, layout, destination)
-        raise typer.Exit(code=0)
+            plan,
+        ):
+            # The view directory created by the pattern script
+            plan.add_directory(os.path.join(destination, parsed_name))
+            continue
 
-    if use_template == None:
-        raise typer.Exit(code=0)
+        console.print(
+            f"\nThis project may not be following [green]MVC[/green] architecture.\n"
+        )
+        prompt = Prompt.ask(
+            f"Want to add screen using structure [[green]none: {STRUCTURES['none']}[/green]] ?",
+            choices=["y", "n"],
+            default="n",
+        )
+        if prompt == "y":
+            add_from_default(name_screen, use_template, destination, plan)
+            if layout != None:
+                apply_layout(name_screen, layout, destination, plan)
+            use_default = True
+            break
+        else:
+            raise typer.Exit(code=1)
 
-    for parsed_name in parsed_screens_list:
-        # Construct the template path
-        template_path = os.path.join(TEMPLATES_DIR, use_template, "View", parsed_name)
+    if use_default:
+        pass
+    elif layout != None:
+        apply_layout(name_screen, layout, destination, plan)
+    elif use_template != None:
+        for parsed_name in parsed_screens_list:
+            # Construct the template path
+            template_path = os.path.join(
+                TEMPLATES_DIR, use_template, "View", parsed_name
+            )
 
-        # Construct the view path
-        view_path = os.path.join(destination, parsed_name)
+            # Construct the view path
+            view_path = os.path.join(destination, parsed_name)
 
-        # A snake that parses a name.
-        snake_name_view = name_parser_snake(parsed_name)
+            # A snake that parses a name.
+            snake_name_view = name_parser_snake(parsed_name)
 
-        variables = {"parsed_name": parsed_name}
+            variables = {"parsed_name": parsed_name}
 
-        if not os.path.isdir(template_path):
-            # Template does not exist;
-            if use_template and (layout == None):
+            if not package_index.isdir(template_path):
+                # Template does not exist;
                 typer.echo(
                     f"\nView '{parsed_name}' not found in template '{use_template}'."
                 )
-            if layout != None:
-                apply_layout(name_screen, layout, destination)
-        elif os.path.isdir(template_path):
-            # Template exists; process files from the template
-            with open(
-                os.path.join(template_path, f"{snake_name_view}.kv"),
-                "r",
-                encoding="utf-8",
-            ) as template_file:
-                content = template_file.read()
-
-            content = replace_placeholders(content, variables)
-
-            with open(
-                os.path.join(view_path, f"{snake_name_view}.kv"), "w", encoding="utf-8"
-            ) as target_file:
-                target_file.write(content)
-
-                console.print(
-                    f"\nUpdated file: [bright_white]{view_path}/{snake_name_view}.kv[/bright_white]"
+            else:
+                # Template exists; process files from the template
+                plan.add_file(
+                    os.path.join(view_path, f"{snake_name_view}.kv"),
+                    source=os.path.join(template_path, f"{snake_name_view}.kv"),
+                    variables=variables,
+                )
+                add_extensions(
+                    os.path.join(use_template, "View"), destination, plan=plan
                 )
-            add_extensions(os.path.join(use_template, "View"), destination)
+
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
 
-def add_from_layout(name_screen: List[str], layout: str, destination: str):
+def add_from_layout(
+    name_screen: List[str],
+    layout: str,
+    destination: str,
+    plan: Optional[ScaffoldPlan] = None,
+):
     """
     Add screens to the project with a specified layout and a default structure.
 
     :param name_screen: A list of screen names to be added.
     :param layout: The layout of the screen.
     :param destination: The destination path where the files will be created.
+    :param plan: Plan to add the changes to. They are applied right away when omitted.
     """
+    package_index = template_index()
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
     for name_view in name_screen:
         # Parse screen name to PascalCase
         parsed_name = name_parser(name_view, "screen")
@@ -717,7 +800,7 @@ def add_from_layout(name_screen: List[str], layout: str, destination: str):
         # Construct the view path
         view_path = os.path.join(destination, parsed_name)
 
-        if not os.path.isdir(view_path):
+        if not plan.exists(view_path):
             variables = {"parsed_name": parsed_name}
             try:
                 # Construct the layout path
@@ -725,87 +808,51 @@ def add_from_layout(name_screen: List[str], layout: str, destination: str):
                 layout, index = re.findall(r"[A-Za-z]+|\d+", layout)
                 layout_path = os.path.join(LAYOUTS_DIR, layout, index)
 
-                os.makedirs(view_path, exist_ok=True)
+                plan.add_directory(view_path)
 
                 # Create the .py file using the default template
-                with open(
-                    os.path.join(VIEW_BASE, "default_screen.py"), "r", encoding="utf-8"
-                ) as view_file:
-                    content = view_file.read()
-                content = replace_placeholders(content, variables)
-                with open(
+                plan.add_file(
                     os.path.join(view_path, f"{snake_name_view}.py"),
-                    "w",
-                    encoding="utf-8",
-                ) as target_file:
-                    target_file.write(content)
-                    console.print(
-                        f"\nCreated file: [bright_white]{view_path}/{snake_name_view}.py[/bright_white]"
-                    )
+                    source=os.path.join(VIEW_BASE, "default_screen.py"),
+                    variables=variables,
+                )
 
                 # Create an empty __init__.py File
-                with open(
-                    os.path.join(view_path, "__init__.py"), "w", encoding="utf-8"
-                ) as init_file:
-                    init_file.write("# Empty __init__.py file")
+                plan.add_file(
+                    os.path.join(view_path, "__init__.py"),
+                    content="# Empty __init__.py file",
+                )
 
-                if not os.path.isdir(layout_path):
+                if not package_index.isdir(layout_path):
                     # Layout does not exist; create files with a blank template
                     # Create the .kv file using the default template
                     console.print(
                         f"\nLayout {layout} not found. Creating screen with a blank layout."
                     )
-                    with open(
-                        os.path.join(VIEW_BASE, "default_screen.kv"),
-                        "r",
-                        encoding="utf-8",
-                    ) as view_file:
-                        content = view_file.read()
-
-                    content = replace_placeholders(content, variables)
-
-                    with open(
+                    plan.add_file(
                         os.path.join(view_path, f"{snake_name_view}.kv"),
-                        "w",
-                        encoding="utf-8",
-                    ) as target_file:
-                        target_file.write(content)
-
-                        console.print(
-                            f"\nCreated file: [bright_white]{view_path}/{snake_name_view}.kv[/bright_white]"
-                        )
+                        source=os.path.join(VIEW_BASE, "default_screen.kv"),
+                        variables=variables,
+                    )
 
-                elif os.path.isdir(layout_path):
+                elif package_index.isdir(layout_path):
                     # Layout exists; copy and process files from the layout
                     # Create the .kv file using the layout
                     name_layout = name_parser(layout, "screen")
                     snake_name_layout = name_parser_snake(name_layout)
-                    with open(
-                        os.path.join(layout_path, f"{snake_name_layout}.kv"),
-                        "r",
-                        encoding="utf-8",
-                    ) as view_file:
-                        content = view_file.read()
-
-                    content = replace_placeholders(content, variables)
-
-                    with open(
+                    plan.add_file(
                         os.path.join(view_path, f"{snake_name_view}.kv"),
-                        "w",
-                        encoding="utf-8",
-                    ) as target_file:
-                        target_file.write(content)
-
-                        console.print(
-                            f"\nCreated file: [bright_white]{view_path}/{snake_name_view}.kv[/bright_white]"
-                        )
+                        source=os.path.join(layout_path, f"{snake_name_layout}.kv"),
+                        variables=variables,
+                    )
                     add_extensions(
                         template_name=None,
                         destination=view_path,
                         layout_name=layout,
                         index=index,
+                        plan=plan,
                     )
-                update_screens_file(parsed_name, snake_name_view, destination)
+                update_screens_file(parsed_name, snake_name_view, destination, plan)
             except Exception as e:
                 typer.secho(f"Error: {e}", err=True)
         else:
@@ -813,22 +860,35 @@ def add_from_layout(name_screen: List[str], layout: str, destination: str):
                 f"\nScreen with name [green]{parsed_name}[/green] already exists. Try a different name."
             )
 
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
-def apply_layout(name_screen: List[str], layout: str, destination: str):
+
+def apply_layout(
+    name_screen: List[str],
+    layout: str,
+    destination: str,
+    plan: Optional[ScaffoldPlan] = None,
+):
     """
     Apply layout to a screen with specified layout type.
 
     :param name_screen: The list containing the names of the screens.
     :param layout: The name of the layout for the screens.
     :param destination: The destination path where the files will be created and updated.
+    :param plan: Plan to add the changes to. They are applied right away when omitted.
     """
+    package_index = template_index()
     layout = name_parser(layout, "screen").replace("Screen", "")
     layout, index = re.findall(r"[A-Za-z]+|\d+", layout)
     layout_path = os.path.join(LAYOUTS_DIR, layout, index)
-    if not os.path.isdir(layout_path):
+    if not package_index.isdir(layout_path):
         typer.echo(f"Layout '{layout}' not found.")
         raise typer.Exit(code=1)
 
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
+
     parsed_screens_list = []
     for name_view in name_screen:
         if name_view == "__pycache__":
@@ -847,33 +907,20 @@ def apply_layout(name_screen: List[str], layout: str, destination: str):
         # A snake that parses a name.
         snake_name_view = name_parser_snake(parsed_name)
 
-        if os.path.isdir(view_path):
+        if plan.exists(view_path):
             variables = {"parsed_name": parsed_name}
             try:
-                with open(
-                    os.path.join(layout_path, f"{snake_name_layout}.kv"),
-                    "r",
-                    encoding="utf-8",
-                ) as view_file:
-                    content = view_file.read()
-
-                content = replace_placeholders(content, variables)
-
-                with open(
+                plan.add_file(
                     os.path.join(view_path, f"{snake_name_view}.kv"),
-                    "w",
-                    encoding="utf-8",
-                ) as target_file:
-                    target_file.write(content)
-
-                    console.print(
-                        f"\nUpdated file: [bright_white]{view_path}/{snake_name_view}.kv[/bright_white]"
-                    )
+                    source=os.path.join(layout_path, f"{snake_name_layout}.kv"),
+                    variables=variables,
+                )
                 add_extensions(
                     template_name=None,
                     destination=view_path,
                     layout_name=layout,
                     index=index,
+                    plan=plan,
                 )
             except Exception as e:
                 typer.secho(f"Error: {e}", err=True)
@@ -882,14 +929,22 @@ def apply_layout(name_screen: List[str], layout: str, destination: str):
                 f"\nScreen with name [green]{parsed_name}[/green] does not exists. Try a different name."
             )
 
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
-def remove_from_default(name_screen: List[str], destination: str) -> None:
+
+def remove_from_default(
+    name_screen: List[str], destination: str, plan: Optional[ScaffoldPlan] = None
+) -> None:
     """
     Remove screen-specific directories and their entries from screens.py.
 
     :param name_screen: List of screen names to remove.
     :param destination: Path where screen files and directories are located.
+    :param plan: Plan to add the changes to. They are applied right away when omitted.
     """
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
     parsed_screens_list = []
 
     # Convert screen names to PascalCase, skipping __pycache__ directories
@@ -899,60 +954,65 @@ def remove_from_default(name_screen: List[str], destination: str) -> None:
         parsed_name = name_parser(name_view, "screen")  # Convert to PascalCase
         parsed_screens_list.append(parsed_name)
 
+    screens_file_path = os.path.join(destination, "screens.py")
     for parsed_name in parsed_screens_list:
         # Construct the view path and remove directory if it exists
         view_path = os.path.join(destination, parsed_name)
         if os.path.isdir(view_path):
-            rmtree(view_path)
-            console.print(f"\nDeleted: [red]{view_path}[/red]")
+            plan.add_deletion(view_path)
+
+        # Remove import statements and dictionary entry from screens.py
+        if plan.exists(screens_file_path):
+            plan.add_edit(
+                screens_file_path,
+                functools.partial(
+                    _remove_screen_entry, parsed_name, name_parser_snake(parsed_name)
+                ),
+            )
+        else:
+            console.print(f"Error: [red]'{screens_file_path}' not found.[/red]")
 
-        # Convert PascalCase to snake_case for import statements
-        snake_name_view = name_parser_snake(parsed_name)
+    if write_now and plan.apply(destination):
+        raise typer.Exit(code=1)
 
-        # Define import statements to remove for the specified screen
-        import_view_statement = (
-            f"from View.{parsed_name}.{snake_name_view} import {parsed_name}View\n"
-        )
-        import_model_statement = (
-            f"from Model.{snake_name_view} import {parsed_name}Model\n"
-        )
-        import_controller_statement = (
-            f"from Controller.{snake_name_view} import {parsed_name}Controller\n"
-        )
 
-        # Regular expression pattern to match the dictionary entry, regardless of content inside
-        screen_entry_pattern = (
-            rf"""    ["']{snake_name_view.replace('_', ' ')}["']: {{.*?}},\n"""
-        )
+def _remove_screen_entry(parsed_name: str, snake_name_view: str, content: str) -> str:
+    """
+    Remove the import statements and the screen entry of a screen from the
+    content of a screens.py file.
 
-        try:
-            # Read content of screens.py
-            with open(
-                os.path.join(destination, "screens.py"), "r", encoding="utf-8"
-            ) as file:
-                content = file.read()
-
-            # Remove import statements and dictionary entry from screens.py
-            content = (
-                content.replace(import_view_statement, "")
-                .replace(import_model_statement, "")
-                .replace(import_controller_statement, "")
-            )
-            content = re.sub(screen_entry_pattern, "", content, flags=re.DOTALL)
+    :param parsed_name: The name of the screen class (e.g., 'MyScreen').
+    :param snake_name_view: The name of the screen in snake_case (e.g., 'my_screen').
+    :param content: The content of the screens.py file.
+    :return: The updated content.
+    """
+    # Define import statements to remove for the specified screen
+    import_view_statement = (
+        f"from View.{parsed_name}.{snake_name_view} import {parsed_name}View\n"
+    )
+    import_model_statement = f"from Model.{snake_name_view} import {parsed_name}Model\n"
+    import_controller_statement = (
+        f"from Controller.{snake_name_view} import {parsed_name}Controller\n"
+    )
 
-            # Write the updated content back to screens.py
-            with open(
-                os.path.join(destination, "screens.py"), "w", encoding="utf-8"
-            ) as file:
-                file.write(content)
+    # Regular expression pattern to match the dictionary entry, regardless of content inside
+    screen_entry_pattern = (
+        rf"""    ["']{snake_name_view.replace('_', ' ')}["']: {{.*?}},\n"""
+    )
 
-            console.print(f"\nUpdated file: [green]{destination}/screens.py[/green]")
-        except Exception as e:
-            console.print(f"Error: [red]{e}[/red]")
+    content = (
+        content.replace(import_view_statement, "")
+        .replace(import_model_statement, "")
+        .replace(import_controller_statement, "")
+    )
+    return re.sub(screen_entry_pattern, "", content, flags=re.DOTALL)
 
 
 def remove_from_structure(
-    name_screen: List[str], destination: str, structure: str
+    name_screen: List[str],
+    destination: str,
+    structure: str,
+    plan: Optional[ScaffoldPlan] = None,
 ) -> None:
     """
     Remove and update files associated with a specified structure (e.g., MVC) for screens.
@@ -960,13 +1020,17 @@ def remove_from_structure(
     :param name_screen: List of screen names to process.
     :param destination: Path where the screen-related files are stored.
     :param structure: Name of the structure folder (e.g., "MVC").
+    :param plan: Plan to add the changes to. They are applied right away when omitted.
     """
+    package_index = template_index()
     # Define structure path and validate existence
     structure_path = os.path.join(STRUCTURES_DIR, structure)
-    if not os.path.isdir(structure_path):
+    if not package_index.isdir(structure_path):
         typer.echo(f"\nStructure '{structure}' not found.")
         raise typer.Exit(code=1)
 
+    write_now = plan is None
+    plan = plan or ScaffoldPlan()
     root_directory = os.path.dirname(destination)
     parsed_screens_list = []
 
@@ -980,21 +1044,19 @@ def remove_from_structure(
     if structure == "MVC":
         for parsed_name in parsed_screens_list:
             snake_name_view = name_parser_snake(parsed_name)
-            try:
-                # Define paths for model and controller files in the MVC structure
-                model_file_path = os.path.join(
-                    root_directory, "Model", f"{snake_name_view}.py"
-                )
-                controller_file_path = os.path.join(
-                    root_directory, "Controller", f"{snake_name_view}.py"
-                )
+            # Define paths for model and controller files in the MVC structure
+            model_file_path = os.path.join(
+                root_directory, "Model", f"{snake_name_view}.py"
+            )
+            controller_file_path = os.path.join(
+                root_directory, "Controller", f"{snake_name_view}.py"
+            )
 
-                # Remove model and controller files if they exist
-                if os.path.isfile(model_file_path):
-                    os.remove(model_file_path)
-                    console.print(f"\nDeleted: [red]{model_file_path}[/red]")
-                if os.path.isfile(controller_file_path):
-                    os.remove(controller_file_path)
-                    console.print(f"\nDeleted: [red]{controller_file_path}[/red]")
-            except Exception as e:
-                console.print(f"Error: [red]{e}[/red]")
+            # Remove model and controller files if they exist
+            if os.path.isfile(model_file_path):
+                plan.add_deletion(model_file_path)
+            if os.path.isfile(controller_file_path):
+                plan.add_deletion(controller_file_path)
+
+    if write_now and plan.apply(root_directory):
+        raise typer.Exit(code=1)
@@ -1,19 +1,122 @@
+import functools
+import os
 import re
 import tarfile
-from typing import Dict, Literal
+import threading
+from typing import Dict, List, Literal, Tuple
+
+# A placeholder is `{{name}}` with no braces or whitespace inside, so GitHub
+# Actions (`${{ runner.os }}`) and Jinja expressions pass through untouched.
+PLACEHOLDER_PATTERN = re.compile(r"\{\{([^{}\s]+)\}\}")
+
+
+class PlaceholderError(KeyError):
+    """
+    Raised by a strict render when placeholders have no value.
+    """
+
+
+class CompiledTemplate:
+    """
+    A template split once into literal text and placeholder names, so that
+    rendering is a single join instead of one scan per variable.
+
+    `literals` always holds one more item than `names`: the text before,
+    between and after the placeholders.
+    """
+
+    __slots__ = ("literals", "names")
+
+    def __init__(self, content: str) -> None:
+        parts = PLACEHOLDER_PATTERN.split(content)
+        self.literals: Tuple[str, ...] = tuple(parts[0::2])
+        self.names: Tuple[str, ...] = tuple(parts[1::2])
+
+    def missing(self, variables: Dict[str, str]) -> List[str]:
+        """
+        Return the placeholders without a value in `variables`, in order of
+        first appearance.
+        """
+        return [name for name in dict.fromkeys(self.names) if name not in variables]
+
+    def render(self, variables: Dict[str, str], strict: bool = False) -> str:
+        """
+        Substitute `variables` into the template. Placeholders without a value
+        are kept as they are, or raise `PlaceholderError` when `strict`.
+        """
+        if strict:
+            missing = self.missing(variables)
+            if missing:
+                raise PlaceholderError(
+                    "Missing values for placeholders: "
+                    + ", ".join(f"{{{{{name}}}}}" for name in missing)
+                )
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = variables.get(name)
+            parts.append(f"{{{{{name}}}}}" if value is None else value)
+            parts.append(literal)
+        return "".join(parts)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_template(content: str) -> CompiledTemplate:
+    """
+    Return the compiled form of a template string, cached by content.
+    """
+    return CompiledTemplate(content)
+
+
+_template_cache: Dict[str, Tuple[int, int, CompiledTemplate]] = {}
+_template_cache_lock = threading.Lock()
+
+
+def load_template(path: str) -> CompiledTemplate:
+    """
+    Return the compiled template stored at `path`, reading and tokenizing it
+    again only when its mtime or size changed since the last call. Packaged
+    templates come from the template index and are never stat'ed.
+
+    :param path: Path of the template file.
+    :return: The compiled template.
+    """
+    from kvdeveloper.internals.index import template_index
+
+    index = template_index()
+    if index.covers(path):
+        with _template_cache_lock:
+            cached = _template_cache.get(path)
+        if cached is None:
+            cached = (0, 0, CompiledTemplate(index.read_text(path)))
+            with _template_cache_lock:
+                _template_cache[path] = cached
+        return cached[2]
+
+    stat = os.stat(path)
+    with _template_cache_lock:
+        cached = _template_cache.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, "r", encoding="utf-8") as template_file:
+        template = CompiledTemplate(template_file.read())
+    with _template_cache_lock:
+        _template_cache[path] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
 
 
 def replace_placeholders(content: str, variables: Dict[str, str]) -> str:
     """
     Replace placeholders in the content with provided variables.
 
+    Every `{{name}}` is replaced in a single pass, so values containing
+    placeholders themselves are inserted verbatim. Placeholders without a
+    variable are left in place.
+
     :param content: The content with placeholders.
     :param variables: A dictionary of variables to replace in the content.
     :return: The content with replaced variables.
     """
-    for placeholder, value in variables.items():
-        content = content.replace(f"{{{{{placeholder}}}}}", value)
-    return content
+    return compile_template(content).render(variables)
 
 
 def name_parser_snake(name: str) -> str:
@@ -104,14 +207,15 @@ def extract_tar_file(tar_file_path: str, extract_to_path: str) -> None:
 def toml_parser(filepath: str) -> dict:
     try:
         import toml  # type: ignore
+
         toml_loader = toml
         with open(filepath, "r", encoding="utf-8") as source_file:
             sortmap = toml_loader.load(source_file)
     except ImportError:
         import tomllib  # type: ignore
+
         toml_loader = tomllib
         with open(filepath, "rb") as source_file:
             sortmap = toml_loader.load(source_file)
 
     return sortmap
-
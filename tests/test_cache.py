@@ -0,0 +1,39 @@
+from kvdeveloper.internals.server.cache import ByteLRUCache
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = ByteLRUCache(10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats() == {
+        "entries": 2,
+        "bytes": 8,
+        "max_bytes": 10,
+        "hits": 3,
+        "misses": 1,
+    }
+
+
+def test_oversized_values_are_not_cached():
+    cache = ByteLRUCache(10)
+    cache.put("a", b"aaaa")
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"aaaa"
+
+
+def test_replaced_and_invalidated_entries_free_their_bytes():
+    cache = ByteLRUCache(10)
+    cache.put("a", b"aaaa")
+    cache.put("a", b"aaaaaaaa")
+    assert cache.stats()["bytes"] == 8
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.stats()["bytes"] == 0
+    assert cache.get("a") is None
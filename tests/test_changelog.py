@@ -0,0 +1,79 @@
+import threading
+import time
+
+from kvdeveloper.internals.server import changelog
+from kvdeveloper.internals.server.changelog import ChangeLog
+
+
+def test_since_returns_events_after_cursor():
+    log = ChangeLog()
+    log.record("main.py")
+    seq = log.record_batch([("a.kv", "modified"), ("b.kv", "created")])
+
+    assert seq == 3
+    assert [event.path for event in log.since(1)] == ["a.kv", "b.kv"]
+    assert log.since(3) == []
+    assert [event.to_dict() for event in log.since(2)] == [
+        {"seq": 3, "path": "b.kv", "event": "created"}
+    ]
+
+
+def test_since_asks_for_resync_when_cursor_is_evicted_or_unknown():
+    log = ChangeLog(max_events=2)
+    for name in ("a.py", "b.py", "c.py"):
+        log.record(name)
+
+    assert log.since(0) is None
+    assert [event.path for event in log.since(1)] == ["b.py", "c.py"]
+    assert log.since(4) is None
+    assert log.since(-1) is None
+
+
+def test_poll_cursors_are_per_client():
+    log = ChangeLog()
+    log.record("before.py")
+    assert log.poll("phone") == []
+    assert log.poll("tablet") == []
+
+    log.record("main.py")
+    log.record("main.py")
+    assert log.poll("phone") == ["main.py"]
+    assert log.poll("phone") == []
+    assert log.poll("tablet") == ["main.py"]
+
+
+def test_wait_returns_as_soon_as_something_changes():
+    log = ChangeLog()
+    timer = threading.Timer(0.05, log.record, args=("main.py",))
+    timer.start()
+    started = time.monotonic()
+    events = log.wait(0, timeout=5)
+    timer.join()
+
+    assert [event.path for event in events] == ["main.py"]
+    assert time.monotonic() - started < 5
+    assert log.wait(1, timeout=0.01) == []
+
+
+def test_poll_cursors_are_evicted_by_count():
+    log = ChangeLog(max_clients=2)
+    for client in ("a", "b", "c"):
+        log.poll(client)
+    log.record("main.py")
+
+    assert list(log._cursors) == ["b", "c"]
+    # An evicted client starts over at the end of the log.
+    assert log.poll("a") == []
+
+
+def test_poll_cursors_are_evicted_by_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(changelog.time, "time", lambda: now[0])
+    log = ChangeLog(max_age=60)
+    log.poll("old")
+    now[0] += 30
+    log.poll("recent")
+    now[0] += 45
+    log.record("main.py")
+
+    assert list(log._cursors) == ["recent"]
@@ -0,0 +1,95 @@
+import queue
+import time
+
+import pytest
+
+from kvdeveloper.internals.server.debounce import Debouncer
+
+
+@pytest.fixture
+def start_debouncer():
+    batches = queue.Queue()
+    started = []
+
+    def start(window=0.05, max_delay=2.0, callback=None):
+        debouncer = Debouncer(
+            callback or batches.put, window=window, max_delay=max_delay
+        )
+        debouncer.start()
+        started.append(debouncer)
+        return debouncer, batches
+
+    yield start
+    for debouncer in started:
+        debouncer.stop()
+
+
+@pytest.mark.parametrize(
+    "events, batch",
+    [
+        ([("a.py", "modified")], [("a.py", "modified")]),
+        ([("a.py", "modified")] * 3, [("a.py", "modified")]),
+        ([("a.py", "created"), ("a.py", "modified")], [("a.py", "created")]),
+        ([("a.py", "created"), ("a.py", "deleted")], []),
+        ([("a.py", "deleted"), ("a.py", "created")], [("a.py", "modified")]),
+        ([("a.py", "deleted"), ("a.py", "modified")], [("a.py", "modified")]),
+        ([("a.py", "modified"), ("a.py", "created")], [("a.py", "modified")]),
+        ([("a.py", "modified"), ("a.py", "deleted")], [("a.py", "deleted")]),
+        # Editor save: write a temp file, then move it over the target.
+        (
+            [
+                ("a.py.tmp", "created"),
+                ("a.py.tmp", "modified"),
+                ("a.py.tmp", "deleted"),
+                ("a.py", "deleted"),
+                ("a.py", "created"),
+            ],
+            [("a.py", "modified")],
+        ),
+        # Move chain a -> b -> c.
+        (
+            [
+                ("a.py", "deleted"),
+                ("b.py", "created"),
+                ("b.py", "deleted"),
+                ("c.py", "created"),
+            ],
+            [("a.py", "deleted"), ("c.py", "created")],
+        ),
+    ],
+)
+def test_events_are_coalesced_per_path(start_debouncer, events, batch):
+    debouncer, batches = start_debouncer()
+    for path, event in events:
+        debouncer.push(path, event)
+    if batch:
+        assert sorted(batches.get(timeout=2)) == batch
+    time.sleep(0.15)
+    assert batches.empty()
+
+
+def test_continuous_events_are_flushed_after_max_delay(start_debouncer):
+    debouncer, batches = start_debouncer(window=0.2, max_delay=0.3)
+    started = time.monotonic()
+    flushed = None
+    while time.monotonic() - started < 1.0:
+        debouncer.push("a.py", "modified")
+        if flushed is None and not batches.empty():
+            flushed = time.monotonic() - started
+        time.sleep(0.02)
+    assert flushed is not None and flushed < 0.6
+    assert batches.get(timeout=2) == [("a.py", "modified")]
+
+
+def test_failing_callback_does_not_stop_the_debouncer(start_debouncer):
+    batches = queue.Queue()
+
+    def callback(batch):
+        batches.put(batch)
+        raise RuntimeError("reload failed")
+
+    debouncer, _ = start_debouncer(callback=callback)
+    debouncer.push("a.py", "modified")
+    assert batches.get(timeout=2) == [("a.py", "modified")]
+    debouncer.push("b.py", "modified")
+    assert batches.get(timeout=2) == [("b.py", "modified")]
@@ -0,0 +1,73 @@
+import pytest
+
+from kvdeveloper.internals.server.filters import PathFilter
+
+
+@pytest.fixture
+def path_filter():
+    return PathFilter(
+        [".py", ".kv", "tar.gz"],
+        ignore_files=["*.tmp.py", "View/old/*.kv"],
+        ignore_dirs=["build", "assets/raw"],
+        noreload_files=["settings.py", "View/*/draft.kv"],
+    )
+
+
+@pytest.mark.parametrize(
+    "path, included",
+    [
+        ("main.py", True),
+        ("View/home.kv", True),
+        ("data/archive.tar.gz", True),
+        ("data/archive.gz", False),
+        ("notes.md", False),
+        (".py", False),
+        ("kv", False),
+    ],
+)
+def test_has_included_extension(path_filter, path, included):
+    assert path_filter.has_included_extension(path) is included
+
+
+@pytest.mark.parametrize(
+    "rel_dir, ignored",
+    [
+        (".git", True),
+        ("lib/__pycache__", True),
+        ("build", True),
+        ("src/build", True),
+        ("assets/raw", True),
+        ("lib/assets/raw", False),
+        ("assets", False),
+        ("View", False),
+    ],
+)
+def test_is_ignored_dir(path_filter, rel_dir, ignored):
+    assert path_filter.is_ignored_dir(rel_dir) is ignored
+
+
+@pytest.mark.parametrize(
+    "path, servable",
+    [
+        ("main.py", True),
+        ("View/home/home.kv", True),
+        ("View/old/home.kv", False),
+        ("scratch.tmp.py", False),
+        ("lib/scratch.tmp.py", False),
+        ("build/main.py", False),
+        (".venv/lib/site.py", False),
+        ("assets/raw/gen.py", False),
+        ("assets/raw/deep/gen.py", False),
+        ("notes.md", False),
+    ],
+)
+def test_is_servable(path_filter, path, servable):
+    assert path_filter.is_servable(path) is servable
+
+
+def test_is_reloadable(path_filter):
+    assert path_filter.is_reloadable("main.py")
+    assert not path_filter.is_reloadable("settings.py")
+    assert not path_filter.is_reloadable("lib/settings.py")
+    assert not path_filter.is_reloadable("View/home/draft.kv")
+    assert path_filter.is_reloadable("draft.kv")
@@ -0,0 +1,98 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from kvdeveloper.internals import index
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """
+    A checkout with a single indexed `templates` directory and its own
+    index location.
+    """
+    root = tmp_path / "kvdeveloper"
+    (root / "templates" / "app").mkdir(parents=True)
+    monkeypatch.setattr(index, "def_dir", root)
+    monkeypatch.setattr(index, "INDEX_ROOTS", (str(root / "templates"),))
+    monkeypatch.setattr(index, "index_path", lambda: str(tmp_path / "cache.idx"))
+    monkeypatch.setattr(index, "_index", None)
+    monkeypatch.delenv("KVDEVELOPER_NO_INDEX", raising=False)
+    return root
+
+
+def reload_index(monkeypatch):
+    monkeypatch.setattr(index, "_index", None)
+    return index.template_index()
+
+
+def test_index_serves_the_package_files(package):
+    (package / "templates" / "app" / "main.py").write_text("x = 1\n")
+    (package / "templates" / "app" / "main.pyc").write_bytes(b"")
+
+    template_index = index.template_index()
+    app = str(package / "templates" / "app")
+    assert template_index.listdir(app) == ["main.py"]
+    assert template_index.read_text(os.path.join(app, "main.py")) == "x = 1\n"
+    assert list(template_index.walk(str(package / "templates"))) == [
+        (str(package / "templates"), ["app"], []),
+        (app, [], ["main.py"]),
+    ]
+
+
+def test_index_is_reused_while_the_files_are_unchanged(package, monkeypatch):
+    (package / "templates" / "app" / "main.py").write_text("x = 1\n")
+    index.template_index()
+
+    def pack_index(stamp=None):
+        raise AssertionError("index rebuilt")
+
+    monkeypatch.setattr(index, "pack_index", pack_index)
+    assert reload_index(monkeypatch).isfile(
+        str(package / "templates" / "app" / "main.py")
+    )
+
+
+def test_edited_checkout_rebuilds_the_index(package, monkeypatch):
+    main = package / "templates" / "app" / "main.py"
+    main.write_text("x = 1\n")
+    index.template_index()
+
+    # Same size, only the modification time tells the edit apart.
+    main.write_text("x = 2\n")
+    stat = main.stat()
+    os.utime(main, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert reload_index(monkeypatch).read_text(str(main)) == "x = 2\n"
+
+    (package / "templates" / "app" / "kv").mkdir()
+    (package / "templates" / "app" / "kv" / "main.kv").write_text("<Main>:\n")
+    assert reload_index(monkeypatch).listdir(str(main.parent)) == ["kv", "main.py"]
+
+
+def test_installed_package_is_stamped_by_its_init(tmp_path, monkeypatch):
+    root = tmp_path / "site-packages" / "kvdeveloper"
+    root.mkdir(parents=True)
+    (root / "__init__.py").write_text("")
+    monkeypatch.setattr(index, "def_dir", Path(root))
+
+    assert index.source_stamp() == str((root / "__init__.py").stat().st_mtime_ns)
+
+
+def test_installed_package_is_not_walked_once_indexed(tmp_path, monkeypatch):
+    root = tmp_path / "site-packages" / "kvdeveloper"
+    (root / "templates" / "app").mkdir(parents=True)
+    (root / "__init__.py").write_text("")
+    main = root / "templates" / "app" / "main.py"
+    main.write_text("x = 1\n")
+    monkeypatch.setattr(index, "def_dir", root)
+    monkeypatch.setattr(index, "INDEX_ROOTS", (str(root / "templates"),))
+    monkeypatch.setattr(index, "index_path", lambda: str(tmp_path / "cache.idx"))
+    monkeypatch.delenv("KVDEVELOPER_NO_INDEX", raising=False)
+    reload_index(monkeypatch)
+
+    def walk(top, *args, **kwargs):
+        raise AssertionError(f"walked {top}")
+
+    monkeypatch.setattr(index.os, "walk", walk)
+    assert reload_index(monkeypatch).read_text(str(main)) == "x = 1\n"
@@ -0,0 +1,80 @@
+import os
+
+from kvdeveloper.internals.server import manifest
+from kvdeveloper.internals.server.filters import PathFilter
+from kvdeveloper.internals.server.manifest import FileIndex, hash_file
+
+
+def make_index(tmp_path, monkeypatch):
+    hashed = []
+    monkeypatch.setattr(
+        manifest, "hash_file", lambda path: hashed.append(path) or hash_file(path)
+    )
+    stale = []
+    index = FileIndex(str(tmp_path), PathFilter([".py", ".kv"]), on_stale=stale.append)
+    return index, hashed, stale
+
+
+def test_build_indexes_servable_files(tmp_path, monkeypatch):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    (tmp_path / "View").mkdir()
+    (tmp_path / "View" / "home.kv").write_text("<Home>:\n")
+    (tmp_path / "notes.md").write_text("")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "hook.py").write_text("")
+    index, _, _ = make_index(tmp_path, monkeypatch)
+    index.build()
+
+    files = index.snapshot()
+    assert sorted(files) == ["View/home.kv", "main.py"]
+    assert files["main.py"].digest == hash_file(str(tmp_path / "main.py"))
+    assert files["main.py"].size == 6
+
+
+def test_files_are_rehashed_only_when_size_or_mtime_change(tmp_path, monkeypatch):
+    path = tmp_path / "main.py"
+    path.write_text("x = 1\n")
+    index, hashed, stale = make_index(tmp_path, monkeypatch)
+    index.build()
+    first = index.get("main.py")
+    assert len(hashed) == 1
+
+    index.update(["main.py", "notes.md"])
+    assert index.get("main.py") is first
+    assert len(hashed) == 1
+
+    path.write_text("x = 2\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, first.mtime_ns + 10**9))
+    index.update(["main.py"])
+    assert len(hashed) == 2
+    assert stale == [first.digest]
+
+    path.unlink()
+    second = index.get("main.py")
+    index.update(["main.py"])
+    assert second is None
+    assert "main.py" not in index.snapshot()
+    assert len(stale) == 2
+
+
+def test_lookups_during_the_build_are_kept(tmp_path, monkeypatch):
+    (tmp_path / "changed.py").write_text("old\n")
+    (tmp_path / "deleted.py").write_text("gone\n")
+    (tmp_path / "same.py").write_text("same\n")
+    index, _, _ = make_index(tmp_path, monkeypatch)
+    walk = os.walk
+
+    def racing_walk(top):
+        yield from walk(top)
+        # The watcher reports changes after the walk hashed the files.
+        (tmp_path / "changed.py").write_text("new content\n")
+        (tmp_path / "deleted.py").unlink()
+        index.update(["changed.py", "deleted.py"])
+
+    monkeypatch.setattr(manifest.os, "walk", racing_walk)
+    index.build()
+
+    files = index.snapshot(timeout=0)
+    assert sorted(files) == ["changed.py", "same.py"]
+    assert files["changed.py"].digest == hash_file(str(tmp_path / "changed.py"))
@@ -0,0 +1,103 @@
+import ast
+
+from kvdeveloper.internals.scaffold import ScaffoldPlan
+from kvdeveloper.module import _ScreenEntries, update_screens_file
+
+SCREENS = """\
+from View.SampleScreen.sample_screen import SampleScreenView
+
+screens = {
+    "sample screen": {
+        "object": SampleScreenView,
+        "module": "View.SampleScreen",
+    },
+}
+"""
+
+
+def edit(content, *screens):
+    screen_entries = _ScreenEntries()
+    for parsed_name, snake_name_view in screens:
+        screen_entries.add(parsed_name, snake_name_view)
+    return screen_entries(content)
+
+
+def parse(content):
+    """
+    Return the names imported from `View` and the screen names of `content`.
+    """
+    tree = ast.parse(content)
+    imports = [
+        alias.name
+        for node in tree.body
+        if isinstance(node, ast.ImportFrom) and node.module.startswith("View.")
+        for alias in node.names
+    ]
+    (screens,) = [node.value for node in tree.body if isinstance(node, ast.Assign)]
+    return imports, [key.value for key in screens.keys]
+
+
+def test_screens_are_added_in_one_pass():
+    content = edit(SCREENS, ("Home", "home_screen"), ("Login", "login_screen"))
+
+    assert parse(content) == (
+        ["SampleScreenView", "HomeView", "LoginView"],
+        ["sample screen", "home screen", "login screen"],
+    )
+    assert content.startswith(
+        "from View.SampleScreen.sample_screen import SampleScreenView\n"
+        "from View.Home.home_screen import HomeView\n"
+        "from View.Login.login_screen import LoginView\n"
+    )
+    assert content.endswith(
+        "    },\n"
+        "    'login screen': {\n"
+        "        'object': LoginView,\n"
+        "        'module': 'View.Login'\n"
+        "    },\n"
+        "}\n"
+    )
+
+
+def test_existing_screens_are_not_added_twice(capsys):
+    once = edit(SCREENS, ("Home", "home_screen"))
+    assert edit(once, ("Home", "home_screen")) == once
+    output = capsys.readouterr().out
+    assert "HomeView already exists" in output
+    assert "home_screen already exists" in output
+
+
+def test_dictionary_without_trailing_comma_or_imports():
+    content = edit(
+        'import os\n\nscreens = {"a": 1}  # écran\n', ("Home", "home_screen")
+    )
+    assert content.startswith("from View.Home.home_screen import HomeView\n\n")
+    assert parse(content) == (["HomeView"], ["a", "home screen"])
+    assert content.endswith("}  # écran\n")
+
+    content = edit("screens = {}\n", ("Home", "home_screen"))
+    assert parse(content) == (["HomeView"], ["home screen"])
+
+
+def test_unparsable_file_falls_back_to_text_edits():
+    content = SCREENS + "def broken(:\n"
+    assert edit(content, ("Home", "home_screen")) == content.replace(
+        "import SampleScreenView\n",
+        "import SampleScreenView\nfrom View.Home.home_screen import HomeView\n",
+    )
+
+
+def test_screens_of_one_plan_share_an_edit(tmp_path):
+    (tmp_path / "screens.py").write_text(SCREENS)
+    plan = ScaffoldPlan()
+    update_screens_file("Home", "home_screen", str(tmp_path), plan)
+    update_screens_file("Login", "login_screen", str(tmp_path), plan)
+
+    (edits,) = plan.edits.values()
+    assert len(edits) == 1
+    assert plan.apply(str(tmp_path)) == {}
+    assert parse((tmp_path / "screens.py").read_text())[1] == [
+        "sample screen",
+        "home screen",
+        "login screen",
+    ]
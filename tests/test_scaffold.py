@@ -0,0 +1,133 @@
+import os
+import stat
+
+import pytest
+
+from kvdeveloper.internals import scaffold
+from kvdeveloper.internals.scaffold import ScaffoldPlan
+
+
+def read(path):
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def listing(path):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), path).replace(os.sep, "/")
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def test_apply_writes_files_edits_and_deletions(tmp_path):
+    (tmp_path / "screens.py").write_text("screens = {}\n")
+    os.chmod(tmp_path / "screens.py", 0o755)
+    (tmp_path / "old").mkdir()
+    (tmp_path / "old" / "home.kv").write_text("<Old>:\n")
+
+    plan = ScaffoldPlan()
+    plan.add_file(
+        str(tmp_path / "View" / "home.py"),
+        content="class {{name}}: # {{other}}\n",
+        variables={"name": "Home"},
+    )
+    plan.add_edit(str(tmp_path / "View" / "home.py"), lambda text: text + "x = 1\n")
+    plan.add_edit(str(tmp_path / "screens.py"), lambda text: text + "a = 1\n")
+    plan.add_edit(str(tmp_path / "screens.py"), lambda text: text + "b = 2\n")
+    plan.add_deletion(str(tmp_path / "old"))
+
+    assert plan.exists(str(tmp_path / "View"))
+    assert not plan.exists(str(tmp_path / "old" / "home.kv"))
+    assert plan.apply(str(tmp_path)) == {}
+
+    assert read(tmp_path / "View" / "home.py") == "class Home: # {{other}}\nx = 1\n"
+    assert read(tmp_path / "screens.py") == "screens = {}\na = 1\nb = 2\n"
+    assert stat.S_IMODE(os.stat(tmp_path / "screens.py").st_mode) == 0o755
+    assert listing(tmp_path) == ["View/home.py", "screens.py"]
+
+
+def test_planning_a_target_twice_keeps_the_last_version(tmp_path):
+    plan = ScaffoldPlan()
+    plan.add_file(str(tmp_path / "main.py"), content="first\n")
+    plan.add_file(str(tmp_path / "main.py"), content="second\n")
+    with pytest.raises(ValueError):
+        plan.add_file(str(tmp_path / "other.py"))
+
+    assert plan.apply(str(tmp_path)) == {}
+    assert read(tmp_path / "main.py") == "second\n"
+
+
+def test_nothing_is_written_when_a_file_fails_to_render(tmp_path):
+    (tmp_path / "keep.py").write_text("keep\n")
+    plan = ScaffoldPlan()
+    plan.add_file(str(tmp_path / "main.py"), content="main\n")
+    plan.add_edit(str(tmp_path / "missing.py"), lambda text: text)
+    plan.add_deletion(str(tmp_path / "keep.py"))
+
+    errors = plan.apply(str(tmp_path))
+    assert list(errors) == [str(tmp_path / "missing.py")]
+    assert listing(tmp_path) == ["keep.py"]
+
+
+def test_staged_files_are_rolled_back_when_staging_fails(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("old a\n")
+    stage = scaffold._stage
+
+    def failing_stage(result, umask):
+        if result.target.endswith("b.py"):
+            raise OSError("disk full")
+        return stage(result, umask)
+
+    monkeypatch.setattr(scaffold, "_stage", failing_stage)
+    plan = ScaffoldPlan()
+    for name in ("a.py", "b.py", "c.py"):
+        plan.add_file(str(tmp_path / name), content=f"new {name}\n")
+
+    assert plan.apply(str(tmp_path)) == {str(tmp_path / "b.py"): "disk full"}
+    assert listing(tmp_path) == ["a.py"]
+    assert read(tmp_path / "a.py") == "old a\n"
+
+
+def test_dry_run_prints_the_plan_without_writing(tmp_path, capsys):
+    (tmp_path / "screens.py").write_text("screens = {}\n")
+    plan = ScaffoldPlan(dry_run=True)
+    plan.add_file(str(tmp_path / "View" / "home.kv"), content="<Home>:\n")
+    plan.add_edit(str(tmp_path / "screens.py"), lambda text: text + "a = 1\n")
+
+    assert plan.apply(str(tmp_path)) == {}
+    assert listing(tmp_path) == ["screens.py"]
+    assert read(tmp_path / "screens.py") == "screens = {}\n"
+    output = capsys.readouterr().out
+    assert "created" in output and "edited" in output
+    assert "+a = 1" in output
+    assert plan.diff(str(tmp_path)) == (
+        "--- a/screens.py\n+++ b/screens.py\n@@ -1 +1,2 @@\n screens = {}\n+a = 1\n"
+    )
+
+
+def test_directories_are_reported_apart_from_files(tmp_path, capsys):
+    for name in ("A", "B"):
+        (tmp_path / "View" / name).mkdir(parents=True)
+        (tmp_path / "View" / name / "a.kv").write_text("")
+    (tmp_path / "old.py").write_text("")
+
+    plan = ScaffoldPlan(dry_run=True)
+    plan.add_deletion(str(tmp_path / "View" / "A"))
+    plan.add_deletion(str(tmp_path / "old.py"))
+    plan.add_file(str(tmp_path / "View" / "C" / "c.kv"), content="")
+    plan.apply(str(tmp_path))
+    output = capsys.readouterr().out
+    assert "deleted  View/A/" in output
+    assert "deleted  old.py" in output
+    assert "created  View/C/" in output
+    assert "created  View/C/c.kv" in output
+
+    plan = ScaffoldPlan()
+    plan.add_deletion(str(tmp_path / "View" / "A"))
+    plan.add_deletion(str(tmp_path / "View" / "B"))
+    assert plan.apply(str(tmp_path)) == {}
+    output = capsys.readouterr().out
+    assert "Deleted 2 directories" in output
+    assert "file" not in output
+    assert os.listdir(tmp_path / "View") == []
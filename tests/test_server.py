@@ -0,0 +1,690 @@
+import functools
+import gzip
+import hashlib
+import http.client
+import importlib.util
+import io
+import json
+import marshal
+import os
+import shutil
+import socket
+import tarfile
+import threading
+import urllib.parse
+
+import pytest
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirMovedEvent,
+    FileModifiedEvent,
+)
+
+from kvdeveloper.internals.server import (
+    MAX_CACHED_FILE_SIZE,
+    ExtensionFilterHandler,
+    LocalFileServer,
+    Mount,
+    ThreadPoolHTTPServer,
+)
+from kvdeveloper.internals.server.filters import PathFilter
+from kvdeveloper.internals.server.precompile import PYTHON_VERSION
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """
+    Start a `LocalFileServer` for `tmp_path` on 127.0.0.1 without the
+    watcher, returning it and its port. `mounts` lists further
+    `(directory, prefix)` pairs to mount.
+    """
+    started = []
+
+    def start(workers=4, mounts=(), **kwargs):
+        kwargs.setdefault("directory", str(tmp_path))
+        file_server = LocalFileServer(**kwargs)
+        for directory, prefix in mounts:
+            file_server.add_mount(str(directory), prefix=prefix)
+        for mount in file_server.mounts:
+            mount.file_index.build()
+        handler = functools.partial(ExtensionFilterHandler, file_server=file_server)
+        httpd = ThreadPoolHTTPServer(("127.0.0.1", 0), handler, workers=workers)
+        for mount in file_server.mounts:
+            mount.change_log.add_listener(httpd.wakeup)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        started.append((file_server, httpd))
+        return file_server, httpd.server_address[1]
+
+    yield start
+    for file_server, httpd in started:
+        for mount in file_server.mounts:
+            mount.change_log.close()
+        httpd.shutdown()
+        httpd.server_close()
+        for mount in file_server.mounts:
+            mount.stop()
+
+
+def get(port, path, headers=None, timeout=5):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    connection.request("GET", path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_idle_keepalive_connections_do_not_hold_workers(tmp_path, serve):
+    (tmp_path / "main.py").write_text("print('hello')\n")
+    _, port = serve(workers=2)
+
+    idle = []
+    for _ in range(4):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        connection.request("GET", "/main.py")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200
+        idle.append(connection)
+
+    response, body = get(port, "/main.py", timeout=2)
+    assert response.status == 200
+    assert body == b"print('hello')\n"
+
+    # Parked connections are served again on their next request.
+    for connection in idle:
+        connection.request("GET", "/main.py")
+        response = connection.getresponse()
+        assert response.read() == b"print('hello')\n"
+        connection.close()
+
+
+def test_pipelined_requests_are_all_answered(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    _, port = serve()
+
+    request = b"GET /main.py HTTP/1.1\r\nHost: test\r\n\r\n"
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        client.sendall(
+            request * 2 + request.replace(b"\r\n\r\n", b"\r\nConnection: close\r\n\r\n")
+        )
+        data = b""
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    assert data.count(b"HTTP/1.1 200") == 3
+
+
+def open_event_stream(port, path="/events"):
+    client = socket.create_connection(("127.0.0.1", port), timeout=5)
+    client.sendall(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    stream = client.makefile("rb")
+    assert stream.readline().startswith(b"HTTP/1.1 200")
+    while stream.readline() not in (b"\r\n", b""):
+        pass
+    return client, stream
+
+
+def test_event_streams_do_not_hold_workers(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    file_server, port = serve(workers=2)
+    mount = file_server.mounts[0]
+
+    streams = [open_event_stream(port) for _ in range(4)]
+    response, _ = get(port, "/main.py", timeout=2)
+    assert response.status == 200
+
+    mount.publish([("main.py", "modified")])
+    for client, stream in streams:
+        lines = [stream.readline() for _ in range(3)]
+        assert lines[0] == b"id: 1\n"
+        assert lines[1] == b"event: change\n"
+        assert b'"path": "main.py"' in lines[2]
+        client.close()
+
+
+def test_long_polls_do_not_hold_workers(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    file_server, port = serve(workers=2)
+    mount = file_server.mounts[0]
+
+    results = []
+    polls = [
+        threading.Thread(
+            target=lambda: results.append(get(port, "/changes.json?since=0&wait=30"))
+        )
+        for _ in range(4)
+    ]
+    for poll in polls:
+        poll.start()
+    response, _ = get(port, "/main.py", timeout=2)
+    assert response.status == 200
+
+    mount.publish([("main.py", "modified")])
+    for poll in polls:
+        poll.join(timeout=5)
+    assert len(results) == 4
+    for response, body in results:
+        assert response.status == 200
+        assert json.loads(body)["changes"] == [
+            {"seq": 1, "path": "main.py", "event": "modified"}
+        ]
+
+
+def test_long_poll_times_out_with_no_changes(tmp_path, serve):
+    _, port = serve()
+    response, body = get(port, "/changes.json?since=0&wait=0.2")
+    assert json.loads(body) == {"seq": 0, "resync": False, "changes": []}
+
+
+def post(port, path, body):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("POST", path, body=body)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response, data
+
+
+@pytest.mark.parametrize(
+    "body", [b'{"paths": "main.py"}', b'{"paths": [1]}', b'{"paths": {}}', b"[]", b"{"]
+)
+def test_bundle_rejects_invalid_paths(tmp_path, serve, body):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    _, port = serve()
+    response, _ = post(port, "/bundle.tar.gz", body)
+    assert response.status == 400
+
+
+def test_bundle_of_requested_paths(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    (tmp_path / "View").mkdir()
+    (tmp_path / "View" / "home.kv").write_text("<Home>:\n")
+    (tmp_path / "notes.md").write_text("not servable\n")
+    _, port = serve()
+
+    response, data = post(
+        port, "/bundle.tar.gz", b'{"paths": ["View/home.kv", "notes.md", "../x.py"]}'
+    )
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        assert tar.getnames() == ["View/home.kv"]
+        assert tar.extractfile("View/home.kv").read() == b"<Home>:\n"
+
+
+def test_bundle_to_http10_client_is_close_delimited(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    _, port = serve()
+
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        client.sendall(b"GET /bundle.tar.gz HTTP/1.0\r\n\r\n")
+        data = b""
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    head, _, body = data.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding" not in head
+    assert b"Connection: close" in head
+    with tarfile.open(fileobj=io.BytesIO(body), mode="r:gz") as tar:
+        assert tar.getnames() == ["main.py"]
+
+
+def test_etag_and_conditional_get(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    _, port = serve()
+
+    response, body = get(port, "/main.py")
+    etag = response.getheader("ETag")
+    assert response.status == 200
+    assert etag == f'"{hashlib.sha256(body).hexdigest()}"'
+
+    response, body = get(port, "/main.py", {"If-None-Match": etag})
+    assert response.status == 304
+    assert body == b""
+    response, _ = get(port, "/main.py", {"If-None-Match": f'"other", W/{etag}'})
+    assert response.status == 304
+    response, _ = get(port, "/main.py", {"If-None-Match": '"other"'})
+    assert response.status == 200
+
+    last_modified = response.getheader("Last-Modified")
+    response, _ = get(port, "/main.py", {"If-Modified-Since": last_modified})
+    assert response.status == 304
+    response, _ = get(
+        port, "/main.py", {"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}
+    )
+    assert response.status == 200
+
+
+def test_gzip_response_and_its_etag(tmp_path, serve):
+    source = "value = 1\n" * 100
+    (tmp_path / "main.py").write_text(source)
+    (tmp_path / "small.py").write_text("x = 1\n")
+    _, port = serve()
+
+    response, body = get(port, "/main.py", {"Accept-Encoding": "gzip"})
+    etag = response.getheader("ETag")
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body) == source.encode()
+    assert etag.endswith('-gz"')
+
+    response, _ = get(port, "/main.py", {"If-None-Match": etag})
+    assert response.status == 304
+    response, _ = get(port, "/main.py", {"Accept-Encoding": "gzip;q=0"})
+    assert response.getheader("Content-Encoding") is None
+    response, _ = get(port, "/small.py", {"Accept-Encoding": "gzip"})
+    assert response.getheader("Content-Encoding") is None
+
+
+def test_changed_file_gets_a_new_etag(tmp_path, serve):
+    path = tmp_path / "main.py"
+    path.write_text("x = 1\n")
+    file_server, port = serve()
+    response, _ = get(port, "/main.py")
+    etag = response.getheader("ETag")
+
+    path.write_text("x = 2\n")
+    file_server.mounts[0].file_index.update(["main.py"])
+    response, body = get(port, "/main.py", {"If-None-Match": etag})
+    assert response.status == 200
+    assert body == b"x = 2\n"
+    assert response.getheader("ETag") != etag
+
+
+@pytest.mark.parametrize("size", [1000, MAX_CACHED_FILE_SIZE + 1000])
+def test_range_requests(tmp_path, serve, size):
+    data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+    (tmp_path / "image.png").write_bytes(data)
+    _, port = serve()
+
+    response, body = get(port, "/image.png")
+    etag = response.getheader("ETag")
+    assert response.getheader("Accept-Ranges") == "bytes"
+    assert body == data
+
+    response, body = get(port, "/image.png", {"Range": "bytes=10-19"})
+    assert response.status == 206
+    assert response.getheader("Content-Range") == f"bytes 10-19/{size}"
+    assert body == data[10:20]
+
+    response, body = get(port, "/image.png", {"Range": "bytes=-5"})
+    assert response.status == 206
+    assert body == data[-5:]
+
+    response, body = get(port, "/image.png", {"Range": f"bytes={size - 3}-"})
+    assert body == data[-3:]
+
+    response, body = get(port, "/image.png", {"Range": "bytes=0-1", "If-Range": etag})
+    assert response.status == 206
+    assert body == data[:2]
+
+
+def test_range_fallbacks(tmp_path, serve):
+    data = b"0123456789"
+    (tmp_path / "notes.txt").write_bytes(data)
+    _, port = serve()
+
+    response, body = get(port, "/notes.txt", {"Range": "bytes=20-"})
+    assert response.status == 416
+    assert response.getheader("Content-Range") == "bytes */10"
+
+    # Stale If-Range, several ranges and other units get the whole file.
+    for headers in (
+        {"Range": "bytes=0-1", "If-Range": '"stale"'},
+        {"Range": "bytes=0-1,4-5"},
+        {"Range": "items=0-1"},
+    ):
+        response, body = get(port, "/notes.txt", headers)
+        assert response.status == 200
+        assert body == data
+
+
+class FakeObserver:
+    def __init__(self):
+        self.watches = {}
+        self.handlers = {}
+
+    def schedule(self, handler, path, recursive=False):
+        assert not recursive
+        self.watches[path] = handler
+        return path
+
+    def add_handler_for_watch(self, handler, watch):
+        self.handlers.setdefault(watch, []).append(handler)
+
+    def unschedule(self, watch):
+        del self.watches[watch]
+        self.handlers.pop(watch, None)
+
+
+def watched(observer, root):
+    return sorted(
+        os.path.relpath(path, root).replace(os.sep, "/") for path in observer.watches
+    )
+
+
+def test_watches_skip_ignored_trees_at_any_depth(tmp_path):
+    for path in ("View/home", "View/build/out", ".git/objects", "lib/.venv/bin"):
+        (tmp_path / path).mkdir(parents=True)
+    observer = FakeObserver()
+    mount = Mount("/", str(tmp_path), PathFilter([".py"], ignore_dirs=["build"]))
+    mount.start(observer, debounce=0.01)
+    try:
+        assert watched(observer, tmp_path) == [".", "View", "View/home", "lib"]
+
+        (tmp_path / "View/new/.git").mkdir(parents=True)
+        (tmp_path / "View/new/inner").mkdir()
+        (tmp_path / "View/new/inner/main.py").write_text("x = 1\n")
+        mount.event_handler.dispatch(DirCreatedEvent(str(tmp_path / "View/new")))
+        assert watched(observer, tmp_path) == [
+            ".",
+            "View",
+            "View/home",
+            "View/new",
+            "View/new/inner",
+            "lib",
+        ]
+        # Files written before the new directory was watched are reported.
+        events = mount.change_log.wait(0, timeout=5)
+        assert [event.path for event in events] == ["View/new/inner/main.py"]
+
+        os.rename(tmp_path / "View/new", tmp_path / "lib/moved")
+        shutil.rmtree(tmp_path / "View")
+        mount.event_handler.dispatch(
+            DirMovedEvent(str(tmp_path / "View/new"), str(tmp_path / "lib/moved"))
+        )
+        mount.event_handler.dispatch(DirDeletedEvent(str(tmp_path / "View")))
+        assert watched(observer, tmp_path) == [
+            ".",
+            "lib",
+            "lib/moved",
+            "lib/moved/inner",
+        ]
+    finally:
+        mount.stop()
+
+
+@pytest.mark.parametrize("dashboard", [False, True])
+def test_changes_are_logged_without_the_dashboard(tmp_path, capsys, dashboard):
+    (tmp_path / "View").mkdir()
+    file_server = LocalFileServer(directory=str(tmp_path), dashboard=dashboard)
+    mount = file_server.mounts[0]
+    observer = FakeObserver()
+    mount.start(observer, debounce=0.01)
+    try:
+        loggers = [
+            handler
+            for handlers in observer.handlers.values()
+            for handler in handlers
+            if handler is mount.change_logger
+        ]
+        assert len(loggers) == (0 if dashboard else 2)
+        if not dashboard:
+            for path in ("View/home.kv", "notes.md"):
+                mount.change_logger.dispatch(FileModifiedEvent(str(tmp_path / path)))
+            out = capsys.readouterr().out
+            assert "[MODIFIED]" in out and "home.kv" in out
+            assert "notes.md" not in out
+    finally:
+        mount.stop()
+
+
+def test_ranged_head_does_not_leak_into_the_next_request(tmp_path, serve):
+    (tmp_path / "big.png").write_bytes(b"x" * (MAX_CACHED_FILE_SIZE + 100))
+    (tmp_path / "small.png").write_bytes(b"small")
+    _, port = serve()
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("HEAD", "/big.png", headers={"Range": "bytes=50-"})
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 206
+    connection.request("GET", "/small.png")
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.read() == b"small"
+    connection.close()
+
+
+def make_project(path, content):
+    path.mkdir(parents=True)
+    (path / "main.py").write_text(content)
+    return path
+
+
+def test_requests_go_to_the_longest_matching_prefix(tmp_path, serve):
+    root = make_project(tmp_path / "root", "root\n")
+    app = make_project(tmp_path / "app", "app\n")
+    nested = make_project(tmp_path / "nested", "nested\n")
+    _, port = serve(
+        directory=str(root), mounts=[(app, "/app"), (nested, "app/nested/")]
+    )
+
+    for path, body in (
+        ("/main.py", b"root\n"),
+        ("/app/main.py", b"app\n"),
+        ("/app/nested/main.py", b"nested\n"),
+    ):
+        response, data = get(port, path)
+        assert response.status == 200
+        assert data == body
+    response, _ = get(port, "/apps/main.py")
+    assert response.status == 404
+
+    response, data = get(port, "/mounts.json")
+    assert json.loads(data) == {
+        "/app/nested": str(nested),
+        "/app": str(app),
+        "/": str(root),
+    }
+
+
+def test_changes_are_per_mount_and_stats_server_wide(tmp_path, serve):
+    root = make_project(tmp_path / "root", "root\n")
+    app = make_project(tmp_path / "app", "app\n")
+    file_server, port = serve(directory=str(root), mounts=[(app, "/app")])
+    (app_mount,) = [mount for mount in file_server.mounts if mount.prefix == "/app"]
+    app_mount.publish([("main.py", "modified")])
+
+    _, data = get(port, "/app/changes.json?since=0")
+    assert json.loads(data)["changes"] == [
+        {"seq": 1, "path": "main.py", "event": "modified"}
+    ]
+    _, data = get(port, "/changes.json?since=0")
+    assert json.loads(data)["changes"] == []
+
+    get(port, "/main.py")
+    get(port, "/app/main.py")
+    _, data = get(port, "/stats.json")
+    stats = json.loads(data)
+    assert set(stats) == {"file_cache", "gzip_cache"}
+    assert stats["file_cache"]["entries"] == 2
+    # Only served at the root, not as a mount endpoint.
+    response, _ = get(port, "/app/stats.json")
+    assert response.status == 403
+
+
+def test_default_prefix_with_spaces_and_non_ascii(tmp_path, serve):
+    app = make_project(tmp_path / "my app é", "app\n")
+    file_server, port = serve(directory=None, mounts=[(app, None)])
+    assert [mount.prefix for mount in file_server.mounts] == ["/my app é"]
+
+    prefix = urllib.parse.quote("/my app é")
+    response, data = get(port, f"{prefix}/main.py")
+    assert response.status == 200
+    assert data == b"app\n"
+    response, data = get(port, f"{prefix}/changes.json?since=0")
+    assert json.loads(data)["changes"] == []
+    response, _ = get(port, "/my%20app/main.py")
+    assert response.status == 404
+
+
+def test_manifest_lists_servable_files_with_the_log_cursor(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    (tmp_path / "View").mkdir()
+    (tmp_path / "View" / "home.kv").write_text("<Home>:\n")
+    (tmp_path / "notes.md").write_text("not servable\n")
+    file_server, port = serve()
+    file_server.mounts[0].publish([("main.py", "modified")])
+
+    response, body = get(port, "/manifest.json")
+    manifest = json.loads(body)
+    assert manifest["seq"] == 1
+    assert manifest["algorithm"] == "sha256"
+    assert sorted(manifest["files"]) == ["View/home.kv", "main.py"]
+    entry = manifest["files"]["main.py"]
+    assert entry["hash"] == hashlib.sha256(b"x = 1\n").hexdigest()
+    assert entry["size"] == 6
+    assert entry["mtime"] == pytest.approx((tmp_path / "main.py").stat().st_mtime)
+
+
+def test_edited_file_is_not_served_from_the_cache(tmp_path, serve):
+    path = tmp_path / "main.py"
+    path.write_text("x = 1\n")
+    file_server, port = serve()
+
+    def file_cache():
+        return json.loads(get(port, "/stats.json")[1])["file_cache"]
+
+    assert get(port, "/main.py")[1] == b"x = 1\n"
+    assert get(port, "/main.py")[1] == b"x = 1\n"
+    assert file_cache()["hits"] == 1
+    assert file_cache()["misses"] == 1
+
+    # What the watcher does once the save is debounced.
+    path.write_text("x = 22\n")
+    file_server.mounts[0].on_changes([("main.py", "modified")])
+    stats = file_cache()
+    assert stats["entries"] == 0
+    assert stats["bytes"] == 0
+
+    assert get(port, "/main.py")[1] == b"x = 22\n"
+    stats = file_cache()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+def parse_metrics(text):
+    """
+    Return the samples of a Prometheus text exposition by name and labels,
+    and the declared type of every metric family.
+    """
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+        elif line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples, types
+
+
+def test_metrics_count_requests_and_delivery_lag(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    file_server, port = serve()
+    for _ in range(3):
+        get(port, "/main.py")
+    get(port, "/missing.py")
+    file_server.mounts[0].publish([("main.py", "modified")])
+    get(port, "/changes.json?since=0")
+
+    response, body = get(port, "/metrics")
+    assert response.getheader("Content-Type").startswith("text/plain")
+    samples, types = parse_metrics(body.decode("utf-8"))
+
+    name = "kvd_http_request_duration_seconds"
+    assert types[name] == "histogram"
+    assert samples[f'{name}_count{{route="file"}}'] == 4
+    buckets = [
+        value
+        for series, value in samples.items()
+        if series.startswith(f'{name}_bucket{{route="file",')
+    ]
+    assert len(buckets) > 2
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == samples[f'{name}_bucket{{route="file",le="+Inf"}}'] == 4
+
+    requests = "kvd_http_requests_total"
+    assert samples[f'{requests}{{mount="/",route="file",code="200"}}'] == 3
+    assert samples[f'{requests}{{mount="/",route="file",code="404"}}'] == 1
+    assert samples['kvd_changes_published_total{mount="/"}'] == 1
+
+    lag = "kvd_change_delivery_lag_seconds"
+    assert types[lag] == "histogram"
+    assert samples[f'{lag}_count{{client="127.0.0.1"}}'] == 1
+    assert samples[f'{lag}_bucket{{client="127.0.0.1",le="+Inf"}}'] == 1
+    assert 0 <= samples[f'{lag}_sum{{client="127.0.0.1"}}'] < 5
+
+
+def test_precompiled_bytecode_is_served(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 40 + 2\n")
+    _, port = serve(precompile=True)
+
+    response, body = get(port, "/main.pyc")
+    assert response.status == 200
+    assert response.getheader("X-Python-Version") == PYTHON_VERSION
+    assert body[:4] == importlib.util.MAGIC_NUMBER
+    namespace = {}
+    exec(marshal.loads(body[16:]), namespace)
+    assert namespace["x"] == 42
+
+    etag = response.getheader("ETag")
+    response, _ = get(port, "/main.pyc", {"If-None-Match": etag})
+    assert response.status == 304
+    response, _ = get(port, "/missing.pyc")
+    assert response.status == 404
+
+
+def test_bytecode_is_only_served_when_precompiling(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    _, port = serve()
+    response, _ = get(port, "/main.pyc")
+    assert response.status == 403
+    _, body = get(port, "/precompile.json")
+    assert json.loads(body)["enabled"] is False
+
+
+def test_syntax_errors_are_reported_and_not_published(tmp_path, serve):
+    (tmp_path / "main.py").write_text("x = 1\n")
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    file_server, port = serve(precompile=True)
+    mount = file_server.mounts[0]
+
+    response, body = get(port, "/broken.pyc")
+    assert response.status == 422
+    _, body = get(port, "/precompile.json")
+    status = json.loads(body)
+    assert status["enabled"] is True
+    assert status["python"] == PYTHON_VERSION
+    assert list(status["errors"]) == ["broken.py"]
+
+    mount.on_changes([("main.py", "modified"), ("broken.py", "modified")])
+    events = mount.change_log.wait(0, timeout=5)
+    assert [event.path for event in events] == ["main.py"]
+
+    (tmp_path / "broken.py").write_text("def fixed():\n    pass\n")
+    mount.on_changes([("broken.py", "modified")])
+    events = mount.change_log.wait(1, timeout=5)
+    assert [event.path for event in events] == ["broken.py"]
+    _, body = get(port, "/precompile.json")
+    assert json.loads(body)["errors"] == {}
+
+
+def test_invalid_kv_files_are_not_published(tmp_path, serve):
+    pytest.importorskip("kivy")
+    (tmp_path / "good.kv").write_text("<Good@Widget>:\n    size_hint: None, None\n")
+    # Indented by a number of spaces that is not a multiple of the first.
+    (tmp_path / "bad.kv").write_text("<Bad@Widget>:\n    x: 1\n      y: 2\n")
+    file_server, port = serve(precompile=True)
+    mount = file_server.mounts[0]
+
+    mount.on_changes([("good.kv", "modified"), ("bad.kv", "modified")])
+    events = mount.change_log.wait(0, timeout=5)
+    assert [event.path for event in events] == ["good.kv"]
+    _, body = get(port, "/precompile.json")
+    assert list(json.loads(body)["errors"]) == ["bad.kv"]
@@ -0,0 +1,124 @@
+import pytest
+
+from kvdeveloper.internals.sorting.shake import (
+    kv_references,
+    module_name_of,
+    parse_module,
+    shake,
+)
+
+LIBRARY = {
+    "pkg/__init__.py": "",
+    "pkg/icons.py": "md_icons = {'python': 'x'}\n",
+    "pkg/factory_registers.py": (
+        "from kivy.factory import Factory\n"
+        "register = Factory.register\n"
+        "register('MDLabel', module='pkg.uix.label')\n"
+    ),
+    "pkg/uix/__init__.py": "",
+    "pkg/uix/button/__init__.py": "from .button import *\n",
+    "pkg/uix/button/button.py": "from pkg.theming import ThemableBehavior\n\n"
+    "class MDButton:\n    pass\n",
+    "pkg/uix/button/button.kv": "<MDButton>:\n    MDIcon:\n",
+    "pkg/uix/icon.py": "class MDIcon:\n    pass\n",
+    "pkg/uix/label/__init__.py": "class MDLabel:\n    pass\n",
+    "pkg/uix/label/label.kv": "<MDLabel>:\n",
+    "pkg/theming.py": "class ThemableBehavior:\n    pass\n",
+    "pkg/unused/__init__.py": "import pkg.icons\n",
+    "pkg/unused/unused.kv": "<Unused>:\n",
+    "pkg/fonts/Roboto.ttf": "",
+}
+
+
+@pytest.fixture
+def library(tmp_path):
+    files = {}
+    for rel_path, content in LIBRARY.items():
+        path = tmp_path / "lib" / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        files[rel_path] = str(path)
+    return files
+
+
+def shake_app(tmp_path, files, app_files):
+    app_dir = tmp_path / "app"
+    app_dir.mkdir()
+    for name, content in app_files.items():
+        (app_dir / name).write_text(content)
+    return shake(files, "pkg", str(app_dir))
+
+
+def test_module_name_of():
+    assert module_name_of("pkg/uix/button/__init__.py") == "pkg.uix.button"
+    assert module_name_of("pkg/uix/icon.py") == "pkg.uix.icon"
+
+
+def test_kv_references():
+    modules, names = kv_references(
+        "#:import md_icons pkg.icons.md_icons\n"
+        "<Root@MDButton+Other>:\n"
+        "    MDLabel:\n"
+        "        text: 'x'\n"
+    )
+    assert modules == {"pkg.icons.md_icons"}
+    assert names == {"Root", "MDButton", "Other", "MDLabel"}
+
+
+def test_parse_module_resolves_relative_imports():
+    info = parse_module(
+        "from . import icon\nfrom ..theming import Theme\nimport os\n",
+        "pkg.uix.button",
+        True,
+        "pkg",
+    )
+    assert info.imports == {
+        "pkg.uix.button",
+        "pkg.uix.button.icon",
+        "pkg.uix.theming",
+        "pkg.uix.theming.Theme",
+    }
+
+
+def test_shake_keeps_what_the_app_reaches(tmp_path, library):
+    result = shake_app(
+        tmp_path,
+        library,
+        {
+            "main.py": "from pkg.uix.button import MDButton\n",
+            "main.kv": "<Root>:\n    MDLabel:\n",
+        },
+    )
+    assert result.modules == {
+        "pkg",
+        "pkg.uix",
+        "pkg.uix.button",
+        "pkg.uix.button.button",
+        "pkg.uix.icon",
+        "pkg.uix.label",
+        "pkg.theming",
+    }
+    assert sorted(result.files) == [
+        "pkg/__init__.py",
+        "pkg/fonts/Roboto.ttf",
+        "pkg/theming.py",
+        "pkg/uix/__init__.py",
+        "pkg/uix/button/__init__.py",
+        "pkg/uix/button/button.kv",
+        "pkg/uix/button/button.py",
+        "pkg/uix/icon.py",
+        "pkg/uix/label/__init__.py",
+        "pkg/uix/label/label.kv",
+    ]
+    assert result.kept_bytes < result.total_bytes
+
+
+def test_kv_import_of_a_module_attribute_keeps_its_module(tmp_path, library):
+    result = shake_app(
+        tmp_path,
+        library,
+        {"main.kv": "#:import md_icons pkg.icons.md_icons\n\n<Root>:\n"},
+    )
+    assert "pkg.icons" in result.modules
+    assert "pkg/icons.py" in result.files
+    assert "pkg.unused" not in result.modules
@@ -0,0 +1,244 @@
+import os
+import shutil
+
+import pytest
+
+from kvdeveloper.internals import sorting
+from kvdeveloper.internals.sorting import resolve, sort_modules, state, sync_files
+from kvdeveloper.internals.sorting.state import SortedFile, SortState
+
+SORTMAP = """[CORE]
+modules = ["fakemd"]
+extensions = ["*.py", "*.kv"]
+[BUTTON]
+modules = ["fakemd.uix.button"]
+[LABEL]
+modules = ["fakemd.uix.label.py"]
+"""
+
+
+def make_sources(root, files):
+    sources = {}
+    for rel_path, content in files.items():
+        path = root / "src" / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        sources[rel_path] = str(path)
+    return sources
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = SortState(path, {"a.py": SortedFile("/src/a.py", 3, 42, "ff")})
+    state.save()
+    assert SortState.load(path).files == state.files
+
+    (tmp_path / "state.json").write_text('{"version": 0, "files": {}}')
+    assert SortState.load(path).files == {}
+    (tmp_path / "state.json").write_text("not json")
+    assert SortState.load(path).files == {}
+
+
+def test_sync_copies_only_changed_files(tmp_path, monkeypatch):
+    sources = make_sources(tmp_path, {"pkg/a.py": "a = 1\n", "pkg/b.kv": "<B>:\n"})
+    output = tmp_path / "out"
+    state = SortState(str(tmp_path / "state.json"))
+    sync_files(sources, str(output), state)
+    assert (output / "pkg" / "a.py").read_text() == "a = 1\n"
+    assert SortState.load(state.path).files == state.files
+
+    # Touched but not modified: rehashed, not copied, the entry updated.
+    a_source = tmp_path / "src" / "pkg" / "a.py"
+    stat = a_source.stat()
+    os.utime(a_source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    copied = []
+    copy2 = shutil.copy2
+    monkeypatch.setattr(
+        sorting.shutil,
+        "copy2",
+        lambda source, dest: copied.append(source) or copy2(source, dest),
+    )
+    sync_files(sources, str(output), state)
+    assert copied == []
+    assert state.files["pkg/a.py"].mtime_ns == stat.st_mtime_ns + 10**9
+
+    # Modified, and a copy deleted from the output, are copied again.
+    (tmp_path / "src" / "pkg" / "b.kv").write_text("<B>:\n    x: 1\n")
+    (output / "pkg" / "a.py").unlink()
+    sync_files(sources, str(output), state)
+    assert sorted(copied) == sorted(sources.values())
+    assert (output / "pkg" / "b.kv").read_text() == "<B>:\n    x: 1\n"
+
+    copied.clear()
+    sync_files(sources, str(output), state, force=True)
+    assert len(copied) == 2
+
+
+def test_sync_prunes_files_no_longer_selected(tmp_path):
+    sources = make_sources(
+        tmp_path, {"main.py": "", "pkg/deep/a.py": "", "pkg/keep.py": ""}
+    )
+    output = tmp_path / "out"
+    (output / "pkg").mkdir(parents=True)
+    (output / "pkg" / "mine.txt").write_text("not from a sort\n")
+    state = SortState(str(tmp_path / "state.json"))
+    sync_files(sources, str(output), state)
+
+    del sources["pkg/deep/a.py"]
+    del sources["pkg/keep.py"]
+    sync_files(sources, str(output), state, dry_run=True)
+    assert (output / "pkg" / "deep" / "a.py").exists()
+
+    sync_files(sources, str(output), state)
+    assert sorted(state.files) == ["main.py"]
+    # Emptied directories go, files the sort never copied stay.
+    assert not (output / "pkg" / "deep").exists()
+    assert sorted(os.listdir(output / "pkg")) == ["mine.txt"]
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """
+    An importable `fakemd` package with a sort map, the sort cache kept
+    under `tmp_path`.
+    """
+    for rel_path in (
+        "__init__.py",
+        "uix/__init__.py",
+        "uix/button/__init__.py",
+        "uix/button/button.kv",
+        "uix/label.py",
+    ):
+        path = tmp_path / "lib" / "fakemd" / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+    (tmp_path / "sortmap.toml").write_text(SORTMAP)
+    (tmp_path / "sort.toml").write_text(
+        '[FAKEMD]\nmembers = ["CORE", "BUTTON", "MISSING"]\n'
+    )
+    monkeypatch.syspath_prepend(str(tmp_path / "lib"))
+    monkeypatch.setattr(resolve, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(state, "CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path
+
+
+def count_resolves(monkeypatch):
+    calls = []
+    resolve_member = resolve.resolve_member
+    monkeypatch.setattr(
+        resolve,
+        "resolve_member",
+        lambda *args: calls.append(args) or resolve_member(*args),
+    )
+    return calls
+
+
+def test_load_index_is_cached_until_the_sortmap_changes(package, monkeypatch):
+    calls = count_resolves(monkeypatch)
+    root = str(package / "lib")
+    sortmap = package / "sortmap.toml"
+    members = resolve.load_index("fakemd", root, str(sortmap))
+    assert members == {
+        "CORE": ["fakemd/__init__.py"],
+        "BUTTON": ["fakemd/uix/button/__init__.py", "fakemd/uix/button/button.kv"],
+        "LABEL": ["fakemd/uix/label.py"],
+    }
+    assert len(calls) == 3
+
+    assert resolve.load_index("fakemd", root, str(sortmap)) == members
+    assert len(calls) == 3
+
+    # Same size, later mtime.
+    stat = sortmap.stat()
+    os.utime(sortmap, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    resolve.load_index("fakemd", root, str(sortmap))
+    assert len(calls) == 6
+
+    # Same mtime, another size.
+    stat = sortmap.stat()
+    sortmap.write_text(SORTMAP.replace('"fakemd.uix.label.py"', '"fakemd.uix"'))
+    os.utime(sortmap, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    members = resolve.load_index("fakemd", root, str(sortmap))
+    assert len(calls) == 9
+    assert members["LABEL"] == ["fakemd/uix/__init__.py", "fakemd/uix/label.py"]
+
+    resolve.load_index("fakemd", root, str(sortmap), refresh=True)
+    assert len(calls) == 12
+
+
+def test_force_sort_resolves_again(package, monkeypatch):
+    calls = count_resolves(monkeypatch)
+    monkeypatch.chdir(package)
+    sort_modules("fakemd", "sortmap.toml", "sort.toml", "fakemd")
+    sort_modules("fakemd", "sortmap.toml", "sort.toml", "fakemd")
+    assert len(calls) == 3
+    sort_modules("fakemd", "sortmap.toml", "sort.toml", "fakemd", force=True)
+    assert len(calls) == 6
+
+
+def test_dry_run_sort_changes_nothing(package, monkeypatch, capsys):
+    monkeypatch.chdir(package)
+    destination = package / "app" / "fakemd"
+    sort_modules("fakemd", "sortmap.toml", "sort.toml", str(destination), dry_run=True)
+    output = capsys.readouterr().out
+    assert "No member MISSING in sortmap.toml." in output
+    assert "fakemd/uix/button/button.kv" in output
+    assert "Would copy 3 and remove 0 files" in output
+    assert not (package / "app").exists()
+    assert not os.path.exists(state.state_path("fakemd", str(destination)))
+
+    sort_modules("fakemd", "sortmap.toml", "sort.toml", str(destination))
+    assert "No member MISSING in sortmap.toml." in capsys.readouterr().out
+    saved = SortState.load(state.state_path("fakemd", str(destination))).files
+    assert sorted(saved) == [
+        "fakemd/__init__.py",
+        "fakemd/uix/button/__init__.py",
+        "fakemd/uix/button/button.kv",
+    ]
+
+    # Dropping a member is only listed.
+    (package / "sort.toml").write_text('[FAKEMD]\nmembers = ["CORE"]\n')
+    sort_modules("fakemd", "sortmap.toml", "sort.toml", str(destination), dry_run=True)
+    assert "Would copy 0 and remove 2 files" in capsys.readouterr().out
+    assert (destination / "uix" / "button" / "button.kv").exists()
+    assert SortState.load(state.state_path("fakemd", str(destination))).files == saved
+
+
+def test_sync_collects_failures_per_file(tmp_path, monkeypatch, capsys):
+    sources = make_sources(tmp_path, {"pkg/a.py": "a = 1\n", "pkg/b.py": "b = 1\n"})
+    output = tmp_path / "out"
+    state = SortState(str(tmp_path / "state.json"))
+    sync_files(sources, str(output), state)
+    capsys.readouterr()
+    b_entry = state.files["pkg/b.py"]
+
+    # One copy fails, one source is missing, the others still copy.
+    (tmp_path / "src" / "pkg" / "b.py").write_text("b = 2\n")
+    sources.update(make_sources(tmp_path, {"pkg/d.py": "d = 1\n"}))
+    sources["pkg/c.py"] = str(tmp_path / "src" / "pkg" / "c.py")
+    copy2 = shutil.copy2
+
+    def failing_copy2(source, dest):
+        if source.endswith("b.py"):
+            raise PermissionError("denied")
+        return copy2(source, dest)
+
+    monkeypatch.setattr(sorting.shutil, "copy2", failing_copy2)
+    sync_files(sources, str(output), state)
+    output_text = capsys.readouterr().out
+    assert "Copied 1, unchanged 1, removed 0 files" in output_text
+    assert "Failed pkg/b.py: denied" in output_text
+    assert "Failed pkg/c.py" in output_text
+    assert (output / "pkg" / "d.py").read_text() == "d = 1\n"
+    assert (output / "pkg" / "b.py").read_text() == "b = 1\n"
+
+    # The failed files keep their previous entry, or get none.
+    saved = SortState.load(state.path).files
+    assert sorted(saved) == ["pkg/a.py", "pkg/b.py", "pkg/d.py"]
+    assert saved["pkg/b.py"] == b_entry
+
+    monkeypatch.setattr(sorting.shutil, "copy2", copy2)
+    del sources["pkg/c.py"]
+    sync_files(sources, str(output), state)
+    assert "Copied 1, unchanged 2" in capsys.readouterr().out
+    assert (output / "pkg" / "b.py").read_text() == "b = 2\n"
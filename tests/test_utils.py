@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from kvdeveloper.config import def_dir
+from kvdeveloper.utils import (
+    PLACEHOLDER_PATTERN,
+    PlaceholderError,
+    compile_template,
+    load_template,
+    replace_placeholders,
+)
+
+
+def old_replace_placeholders(content, variables):
+    for placeholder, value in variables.items():
+        content = content.replace(f"{{{{{placeholder}}}}}", value)
+    return content
+
+
+def package_texts():
+    for root, dirs, files in os.walk(def_dir):
+        dirs[:] = [name for name in dirs if name != "__pycache__"]
+        for name in files:
+            try:
+                with open(os.path.join(root, name), encoding="utf-8") as file:
+                    yield file.read()
+            except UnicodeDecodeError:
+                continue
+
+
+def test_output_matches_the_old_replacement_on_packaged_files():
+    checked = 0
+    for content in package_texts():
+        names = PLACEHOLDER_PATTERN.findall(content)
+        variables = {name: f"<{name} value>" for name in names[::2]}
+        variables["unused"] = "x"
+        assert replace_placeholders(content, variables) == old_replace_placeholders(
+            content, variables
+        )
+        checked += bool(names)
+    assert checked
+
+
+def test_values_are_inserted_verbatim():
+    assert replace_placeholders("{{a}} {{b}}", {"a": "{{b}}", "b": "x"}) == "{{b}} x"
+
+
+def test_unknown_and_non_placeholder_braces_are_kept():
+    content = "${{ runner.os }} {{ name }} {{missing}} {{{name}}}"
+    assert replace_placeholders(content, {"name": "app"}) == (
+        "${{ runner.os }} {{ name }} {{missing}} {app}"
+    )
+
+
+def test_strict_render_raises_for_missing_values():
+    template = compile_template("{{a}} {{b}} {{a}}")
+    assert template.missing({"b": "x"}) == ["a"]
+    with pytest.raises(PlaceholderError, match=r"\{\{a\}\}"):
+        template.render({"b": "x"}, strict=True)
+    assert template.render({"a": "1", "b": "2"}, strict=True) == "1 2 1"
+
+
+def test_load_template_is_reloaded_when_mtime_or_size_change(tmp_path):
+    path = tmp_path / "main.py"
+    path.write_text("{{name}} = 1\n")
+    template = load_template(str(path))
+    assert load_template(str(path)) is template
+
+    # Same size, newer mtime.
+    path.write_text("{{name}} = 2\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_template(str(path)).render({"name": "x"}) == "x = 2\n"
+
+    # Same mtime, other size.
+    mtime_ns = path.stat().st_mtime_ns
+    path.write_text("{{name}} = 30\n")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    assert load_template(str(path)).render({"name": "x"}) == "x = 30\n"
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+from kvdeveloper.internals.sorting.state import SortState
+from kvdeveloper.internals.sorting.zipout import (
+    archive_paths,
+    remove_archive,
+    sync_archive,
+)
+
+SOURCES = {
+    "pkg/__init__.py": "import os\nDATA = os.path.join(os.path.dirname(__file__), 'data')\n",
+    "pkg/uix/__init__.py": "from pkg.uix.button import MDButton\n",
+    "pkg/uix/button.py": "class MDButton:\n    pass\n",
+    "pkg/ns/module.py": "VALUE = 42\n",
+}
+
+APP = """\
+import os
+import pkg_zip
+import pkg
+from pkg.uix import MDButton
+from pkg.ns.module import VALUE
+
+print(type(pkg.__loader__).__name__)
+print(pkg.__file__)
+print(open(os.path.join(pkg.DATA, "font.txt")).read())
+print(VALUE, MDButton.__module__)
+"""
+
+
+@pytest.fixture
+def sources(tmp_path):
+    files = {}
+    for rel_path, content in SOURCES.items():
+        path = tmp_path / "src" / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        files[rel_path] = str(path)
+    return files
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_archive_is_importable_with_resources_beside_it(tmp_path, sources, compiled):
+    output = tmp_path / "out"
+    (output / "pkg" / "data").mkdir(parents=True)
+    (output / "pkg" / "data" / "font.txt").write_text("font")
+    state = SortState(str(tmp_path / "state.json"))
+    sync_archive("pkg", sources, str(output), state, compiled=compiled)
+
+    archive, loader = archive_paths("pkg", str(output))
+    with zipfile.ZipFile(archive) as zip_file:
+        assert "pkg/ns/" in zip_file.namelist()
+        assert ("pkg/__init__.pyc" in zip_file.namelist()) is compiled
+    (output / "app.py").write_text(APP)
+    lines = subprocess.run(
+        [sys.executable, "-E", "-s", "app.py"],
+        cwd=str(output),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.splitlines()
+
+    member = os.path.join("pkg", "__init__.pyc" if compiled else "__init__.py")
+    assert lines[0] == "ResourceZipImporter"
+    # Python 3.9 has no `find_spec` to override and keeps the archive path.
+    assert lines[1] in (
+        os.path.join(str(output), member),
+        os.path.join(archive, member),
+    )
+    assert lines[2:] == ["font", "42 pkg.uix.button"]
+
+
+def test_archive_is_rebuilt_only_when_sources_change(tmp_path, sources):
+    output = tmp_path / "out"
+    state = SortState(str(tmp_path / "state.json"))
+    sync_archive("pkg", sources, str(output), state)
+    archive, loader = archive_paths("pkg", str(output))
+    with open(archive, "rb") as file:
+        first = file.read()
+    mtime_ns = os.stat(archive).st_mtime_ns
+
+    state = SortState.load(state.path)
+    sync_archive("pkg", sources, str(output), state)
+    assert os.stat(archive).st_mtime_ns == mtime_ns
+
+    # Rebuilding unchanged sources gives the same archive.
+    sync_archive("pkg", sources, str(output), state, force=True)
+    with open(archive, "rb") as file:
+        assert file.read() == first
+
+    with open(sources["pkg/uix/button.py"], "a") as file:
+        file.write("VALUE = 1\n")
+    sync_archive("pkg", sources, str(output), state)
+    with open(archive, "rb") as file:
+        assert file.read() != first
+
+    remove_archive("pkg", str(output), state.path)
+    assert not os.path.exists(archive)
+    assert not os.path.exists(loader)
+    assert not os.path.exists(state.path)